@@ -0,0 +1,85 @@
+"""
+Crawl bookkeeping benchmark
+
+Measures the cost of the orchestrator's frontier dedup (register_links) and the link processor's per-page dedup
+(collect_link) as the number of known URLs grows, no network is involved.
+The cost per link should stay flat as the site grows.
+
+Usage (from src):
+    python -m benchmark.bookkeeping [--sizes 1000 10000 100000] [--links-per-page 50]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from frontier.frontier import MemoryFrontier
+from link_processor.processor import LinkProcessor, LinkProcessorConfiguration
+from orchestrator.orchestrator import Orchestrator
+
+_host = "example-domain.com"
+
+
+def make_site(page_count: int, links_per_page: int) -> tuple[list[str], list[list[str]]]:
+    # every page links to its successor (so the whole site is discovered) plus random pages that are mostly known already
+    urls = [f"www.{_host}/section-{index % 97}/page-{index}" for index in range(page_count)]
+    randomiser = random.Random(page_count)
+
+    site = []
+    for index in range(page_count):
+        links = [urls[(index + 1) % page_count]]
+        links.extend(randomiser.choice(urls) for _ in range(links_per_page - 1))
+        site.append(links)
+
+    return urls, site
+
+
+async def time_register_links(urls: list[str], site: list[list[str]]) -> float:
+    orchestrator = Orchestrator("www", _host, -1)
+    orchestrator.frontier = MemoryFrontier()
+
+    started = time.perf_counter()
+    for url, links in zip(urls, site):
+        await orchestrator.register_links(url, links, links, 1)
+    elapsed = time.perf_counter() - started
+
+    assert len(orchestrator.registered_links) == len(urls)
+    return elapsed
+
+
+def time_collect_links(urls: list[str], site: list[list[str]]) -> float:
+    link_processor = LinkProcessor(LinkProcessorConfiguration(None, "www", _host))
+
+    # one large page holding every link of the site, the worst case for per-page dedup
+    all_links = {}
+    local_links = []
+
+    started = time.perf_counter()
+    for links in site:
+        for link in links:
+            link_processor.collect_link(urls[0], link, all_links, local_links)
+    elapsed = time.perf_counter() - started
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Krawler - crawl bookkeeping benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--links-per-page', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'urls':>10} {'links':>12} {'register ns/link':>18} {'collect ns/link':>18}")
+
+    for size in args.sizes:
+        urls, site = make_site(size, args.links_per_page)
+        link_count = size * args.links_per_page
+
+        register_seconds = asyncio.run(time_register_links(urls, site))
+        collect_seconds = time_collect_links(urls, site)
+
+        print(f"{size:>10} {link_count:>12} {register_seconds / link_count * 1e9:>18.1f} {collect_seconds / link_count * 1e9:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
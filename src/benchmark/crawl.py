@@ -0,0 +1,244 @@
+"""
+Crawl benchmark
+
+Runs full Orchestrator krawls against local synthetic sites (benchmark.site) and reports pages/sec, MB/sec,
+peak RSS and p50/p99 latencies. No internet is involved and the same scenario always krawls the same site, so runs
+can be compared between commits - results are saved to a json file that a later run can be compared against.
+
+The site is served from its own process and every krawl runs in a fresh process, so the server's cpu isn't
+counted against the krawl and each krawl's peak RSS is its own.
+
+Usage (from src):
+    python -m benchmark.crawl [--scenario baseline ...] [--repeat 3] [--compare benchmark_results/<earlier>.json]
+    python -m benchmark.crawl --scenario baseline --pages 20000 --concurrency 50 --workers 2
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark.site import SyntheticSiteConfiguration, add_site_arguments, serve, site_overrides
+from crawl_metrics.metrics import PAGE, TTFB
+from http_transport.transport import TransportConfiguration
+from orchestrator.orchestrator import Orchestrator
+from politeness.scheduler import PolitenessConfiguration
+from result_writer.writer import ResultWriterConfiguration
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+_results_directory = "benchmark_results"
+
+# seconds between checks that the krawl process is still running while waiting for its results
+_poll_interval = 1.0
+
+# site parameters by scenario - anything not given is the SyntheticSiteConfiguration default
+SCENARIOS = {
+    # the krawler's own overhead - small pages served instantly
+    "baseline": {"pages": 2000, "fan_out": 10, "page_size": 16 * 1024},
+    # download and ripping throughput
+    "large-pages": {"pages": 500, "page_size": 256 * 1024},
+    # dedup and link evaluation - every page links to a hundred others
+    "wide": {"pages": 2000, "fan_out": 100},
+    # concurrency - latency dominates, so pages/sec is bounded by concurrency / latency
+    "slow": {"pages": 500, "latency": 0.05, "latency_jitter": 0.04},
+    # the unhappy paths - errors, redirect chains and links to assets
+    "faulty": {"pages": 1000, "error_rate": 0.1, "redirect_rate": 0.2, "asset_rate": 0.3},
+}
+
+
+class CrawlProcessException(Exception):
+    pass
+
+
+class CrawlOptions:
+    def __init__(self, concurrency: int = 10, max_connections_per_host: int = 10, workers: int = 0):
+        # the krawler's defaults
+        self.concurrency = concurrency
+        self.max_connections_per_host = max_connections_per_host
+        self.workers = workers
+
+
+def run_site(site_config: SyntheticSiteConfiguration, started):
+    try:
+        asyncio.run(serve(site_config, "127.0.0.1", 0, started))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_crawl(base_link: str, options: CrawlOptions, results):
+    with tempfile.TemporaryDirectory() as directory:
+        # the default output - one json file written when the krawl finishes
+        writer_config = ResultWriterConfiguration(os.path.join(directory, "krawl.json"))
+
+        orchestrator = Orchestrator("", "127.0.0.1", -1, TransportConfiguration(connection_limit_per_host=options.max_connections_per_host),
+                                    options.concurrency, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                                    writer_config=writer_config, politeness_config=PolitenessConfiguration(0, max_retries=0),
+                                    workers=options.workers)
+
+        started = time.perf_counter()
+        asyncio.run(orchestrator.crawl(base_link))
+        elapsed = time.perf_counter() - started
+
+    snapshot = orchestrator.metrics.snapshot()
+    # kilobytes on linux, bytes on macos
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+    results.put({
+        "pages": snapshot["counters"].get("pages", 0),
+        "seconds": elapsed,
+        "pages_per_second": snapshot["counters"].get("pages", 0) / elapsed,
+        "mb_per_second": snapshot["counters"].get("bytes", 0) / 1e6 / elapsed,
+        "peak_rss_mb": peak_rss / 1e6,
+        "page_p50_ms": milliseconds(snapshot["timings"][PAGE]["p50"]),
+        "page_p99_ms": milliseconds(snapshot["timings"][PAGE]["p99"]),
+        "ttfb_p50_ms": milliseconds(snapshot["timings"][TTFB]["p50"]),
+        "ttfb_p99_ms": milliseconds(snapshot["timings"][TTFB]["p99"]),
+        "responses": snapshot["responses"],
+    })
+
+
+def milliseconds(seconds: float | None) -> float | None:
+    return seconds * 1000 if seconds is not None else None
+
+
+def wait_for_result(name: str, crawl: multiprocessing.Process, results) -> dict:
+    # a krawl that raises never queues its results, so the process is checked on rather than waiting forever
+    while True:
+        try:
+            return results.get(timeout=_poll_interval)
+        except queue.Empty:
+            if crawl.is_alive():
+                continue
+
+        # the results may have been queued just before the process exited
+        try:
+            return results.get(timeout=_poll_interval)
+        except queue.Empty:
+            raise CrawlProcessException(f"{name}: the krawl process exited with code {crawl.exitcode} without reporting results") from None
+
+
+def run_scenario(name: str, site_config: SyntheticSiteConfiguration, options: CrawlOptions) -> dict:
+    # spawned rather than forked so neither process inherits the other's state
+    context = multiprocessing.get_context("spawn")
+
+    started = context.Queue()
+    site = context.Process(target=run_site, args=(site_config, started), daemon=True)
+    site.start()
+
+    try:
+        port = started.get(timeout=30)
+
+        results = context.Queue()
+        crawl = context.Process(target=run_crawl, args=(f"http://127.0.0.1:{port}/", options, results))
+        crawl.start()
+
+        # read before joining - a process with something queued doesn't exit until it has been read
+        result = wait_for_result(name, crawl, results)
+        crawl.join()
+
+        return result
+    finally:
+        site.terminate()
+        site.join()
+
+
+def current_commit() -> tuple[str | None, bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout != ""
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def default_output(commit: str | None) -> str:
+    name = datetime.now().strftime("crawl_%Y-%m-%d_%H-%M-%S") + (f"_{commit}" if commit is not None else "") + ".json"
+    return os.path.join(_results_directory, name)
+
+
+def change(current: float | None, earlier: float | None) -> str:
+    if current is None or not earlier:
+        return ""
+    return f"{(current - earlier) / earlier * 100:+.1f}%"
+
+
+def print_result(name: str, result: dict, earlier: dict = None):
+    print(f"{name:>12} {result['pages']:>7} {result['pages_per_second']:>10.1f} {result['mb_per_second']:>8.1f} "
+          f"{result['peak_rss_mb']:>9.1f} {result['page_p50_ms'] or 0:>9.1f} {result['page_p99_ms'] or 0:>9.1f} "
+          f"{result['ttfb_p50_ms'] or 0:>9.1f} {result['ttfb_p99_ms'] or 0:>9.1f}")
+
+    if earlier is not None:
+        print(f"{'':>12} {'':>7} {change(result['pages_per_second'], earlier['pages_per_second']):>10} "
+              f"{change(result['mb_per_second'], earlier['mb_per_second']):>8} {change(result['peak_rss_mb'], earlier['peak_rss_mb']):>9} "
+              f"{change(result['page_p50_ms'], earlier['page_p50_ms']):>9} {change(result['page_p99_ms'], earlier['page_p99_ms']):>9} "
+              f"{change(result['ttfb_p50_ms'], earlier['ttfb_p50_ms']):>9} {change(result['ttfb_p99_ms'], earlier['ttfb_p99_ms']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Krawler - crawl benchmark against local synthetic sites")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help="Scenario to run (repeatable, default: all)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs of each scenario, the fastest is kept (default: 1)")
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--max-connections-per-host', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('-o', '--output', default=None, help=f"File to save results to (default: {_results_directory}/crawl_<time>_<commit>.json)")
+    parser.add_argument('--compare', default=None, help="Results saved by an earlier run to compare against")
+    # site arguments override every scenario's site
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    options = CrawlOptions()
+    options.concurrency = args.concurrency if args.concurrency is not None else options.concurrency
+    options.max_connections_per_host = args.max_connections_per_host if args.max_connections_per_host is not None else options.max_connections_per_host
+    options.workers = args.workers if args.workers is not None else options.workers
+
+    earlier = None
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as file:
+            earlier = json.load(file)
+        print(f"comparing against {args.compare} (commit {earlier.get('commit')})")
+
+    commit, dirty = current_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": vars(options),
+        "scenarios": {},
+    }
+
+    print(f"{'scenario':>12} {'pages':>7} {'pages/sec':>10} {'MB/sec':>8} {'peak MB':>9} "
+          f"{'page p50':>9} {'page p99':>9} {'ttfb p50':>9} {'ttfb p99':>9}")
+
+    for name in args.scenario or list(SCENARIOS):
+        site_config = SyntheticSiteConfiguration(**{**SCENARIOS[name], **site_overrides(args)})
+
+        runs = [run_scenario(name, site_config, options) for _ in range(args.repeat)]
+        result = max(runs, key=lambda run: run["pages_per_second"])
+        result["site"] = vars(site_config)
+        report["scenarios"][name] = result
+
+        print_result(name, result, earlier["scenarios"].get(name) if earlier is not None else None)
+
+    output = args.output if args.output is not None else default_output(commit)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    print(f"\nsaved to {output}")
+
+
+if __name__ == '__main__':
+    main()
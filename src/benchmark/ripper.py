@@ -0,0 +1,94 @@
+"""
+Link ripper benchmark
+
+Rips links from a corpus of saved pages with each available backend and reports pages/sec and MB/sec.
+`legacy` is the original approach (decode every line, then re.findall) for comparison.
+Without --corpus a synthetic corpus is generated: ordinary multi-line pages plus minified single-line pages.
+
+Usage (from src):
+    python -m benchmark.ripper [--corpus DIR] [--chunk-size 65536] [--repeat 3]
+"""
+import argparse
+import pathlib
+import random
+import re
+import time
+
+from link_ripper import ripper
+
+_legacy_pattern = r'href=["\']([^"\']+)["\']'
+
+
+def synthetic_corpus(page_count: int = 200) -> list[bytes]:
+    randomiser = random.Random(page_count)
+    pages = []
+
+    for index in range(page_count):
+        links = [f"<li><a href='/section-{randomiser.randint(0, 50)}/page-{randomiser.randint(0, 5000)}'>link</a></li>" for _ in range(randomiser.randint(20, 400))]
+        filler = ["<p>" + "lorem ipsum dolor sit amet " * randomiser.randint(1, 20) + "</p>" for _ in range(randomiser.randint(20, 200))]
+
+        body = links + filler
+        randomiser.shuffle(body)
+
+        # every fourth page is minified onto a single line
+        separator = "" if index % 4 == 0 else "\n"
+        pages.append(f"<html><head><title>page {index}</title></head><body>{separator.join(body)}</body></html>".encode("utf-8"))
+
+    return pages
+
+
+def load_corpus(directory: str) -> list[bytes]:
+    return [path.read_bytes() for path in sorted(pathlib.Path(directory).rglob("*.htm*"))]
+
+
+def rip_legacy(page: bytes, _: int) -> int:
+    count = 0
+    for line in page.splitlines(keepends=True):
+        count += len(re.findall(_legacy_pattern, line.decode("utf-8", errors="replace")))
+    return count
+
+
+def rip_with_backend(backend: str):
+    config = ripper.LinkRipperConfiguration(backend)
+
+    def rip(page: bytes, chunk_size: int) -> int:
+        link_ripper = ripper.construct_link_ripper(config, "utf-8")
+
+        count = 0
+        for start in range(0, len(page), chunk_size):
+            count += len(link_ripper.feed(page[start:start + chunk_size]))
+        count += len(link_ripper.close())
+
+        return count
+
+    return rip
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Krawler - link ripper benchmark")
+    parser.add_argument('--corpus', default=None, help="Directory of saved .html pages (default: synthetic corpus)")
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus is not None else synthetic_corpus()
+    megabytes = sum(len(page) for page in pages) / (1024 * 1024)
+    print(f"corpus: {len(pages)} pages, {megabytes:.1f} MB\n")
+
+    rippers = {"legacy": rip_legacy}
+    rippers.update({backend: rip_with_backend(backend) for backend in ripper.available_backends()})
+
+    print(f"{'backend':>10} {'pages/sec':>12} {'MB/sec':>10} {'links':>10}")
+
+    for name, rip in rippers.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            link_count = sum(rip(page, args.chunk_size) for page in pages)
+            best = min(best, time.perf_counter() - started)
+
+        print(f"{name:>10} {len(pages) / best:>12.1f} {megabytes / best:>10.1f} {link_count:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Synthetic site
+
+A local aiohttp server generating a site from a handful of parameters, so crawls can be measured without the
+internet and repeated exactly - the same configuration always serves the same link graph and the same pages.
+
+    /                   page 0
+    /page/<n>           a page linking to fan_out others - page n + 1 always, so every page is reachable
+    /r/<n>/<hops>       a redirect chain ending at /page/<n>
+    /assets/<k>.<ext>   stylesheets and images, never requested by a krawl
+    /files/<k>          downloads without an extension, dropped by their Content-Type
+
+benchmark.crawl starts one for each scenario it runs. To serve one by hand (from src):
+    python -m benchmark.site [--pages 1000] [--fan-out 10] [--port 8080]
+"""
+import argparse
+import asyncio
+
+from aiohttp import web
+
+_filler = ("<p>" + "lorem ipsum dolor sit amet, consectetur adipiscing elit " * 8 + "</p>\n") * 64
+
+
+def fraction(index: int, salt: int) -> float:
+    # cheap deterministic pseudo random number in [0, 1) per page - decides which pages are errors, redirects...
+    return ((index * 2654435761 + salt * 40503) % 4294967296) / 4294967296
+
+
+class SyntheticSiteConfiguration:
+    def __init__(self, pages: int = 1000, fan_out: int = 10, page_size: int = 16 * 1024, latency: float = 0.0,
+                 latency_jitter: float = 0.0, error_rate: float = 0.0, redirect_rate: float = 0.0, redirect_hops: int = 2,
+                 asset_rate: float = 0.1, seed: int = 0):
+        self.pages = pages
+        # links on each page
+        self.fan_out = fan_out
+        # bytes in each page's body, links included
+        self.page_size = page_size
+        # seconds before each response is sent, spread evenly over latency +- latency_jitter
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        # share of pages that respond 500 or 404
+        self.error_rate = error_rate
+        # share of pages linked through a chain of redirect_hops redirects
+        self.redirect_rate = redirect_rate
+        self.redirect_hops = redirect_hops
+        # share of links that point at stylesheets, images and downloads rather than pages
+        self.asset_rate = asset_rate
+        self.seed = seed
+
+
+class SyntheticSite:
+    def __init__(self, config: SyntheticSiteConfiguration):
+        self.config = config
+        self.runner: web.AppRunner | None = None
+        self.port: int | None = None
+
+    def is_error(self, index: int) -> bool:
+        return index != 0 and fraction(index, self.config.seed + 1) < self.config.error_rate
+
+    def is_redirect(self, index: int) -> bool:
+        return index != 0 and fraction(index, self.config.seed + 2) < self.config.redirect_rate
+
+    def page_link(self, index: int) -> str:
+        if self.is_redirect(index):
+            return f"/r/{index}/{self.config.redirect_hops}"
+        return f"/page/{index}"
+
+    def links(self, index: int) -> list[str]:
+        config = self.config
+        links = [self.page_link((index + 1) % config.pages)]
+
+        for offset in range(1, config.fan_out):
+            salt = config.seed + 3 + offset
+            if fraction(index, salt + 1000) < config.asset_rate:
+                asset = int(fraction(index, salt) * 500)
+                links.append(["/assets/{}.css", "/assets/{}.png", "/files/{}"][asset % 3].format(asset))
+            else:
+                links.append(self.page_link(int(fraction(index, salt) * config.pages)))
+
+        return links
+
+    def page(self, index: int) -> bytes:
+        anchors = "".join(f"<li><a href='{link}'>link</a></li>\n" for link in self.links(index))
+        head = f"<html><head><title>page {index}</title></head><body><ul>\n{anchors}</ul>\n"
+        tail = "</body></html>"
+
+        filler_size = max(0, self.config.page_size - len(head) - len(tail))
+        filler = (_filler * (filler_size // len(_filler) + 1))[:filler_size]
+
+        return (head + filler + tail).encode("utf-8")
+
+    async def delay(self, index: int):
+        config = self.config
+        if config.latency > 0 or config.latency_jitter > 0:
+            spread = (fraction(index, config.seed + 4) * 2 - 1) * config.latency_jitter
+            await asyncio.sleep(max(0.0, config.latency + spread))
+
+    async def serve_page(self, request: web.Request) -> web.Response:
+        index = int(request.match_info.get("index", 0))
+        await self.delay(index)
+
+        if index >= self.config.pages:
+            raise web.HTTPNotFound()
+        if self.is_error(index):
+            # half the errors are transient, half are missing pages
+            raise web.HTTPInternalServerError() if index % 2 else web.HTTPNotFound()
+
+        return web.Response(body=self.page(index), content_type="text/html", charset="utf-8")
+
+    async def serve_redirect(self, request: web.Request) -> web.Response:
+        index = int(request.match_info["index"])
+        hops = int(request.match_info["hops"])
+
+        raise web.HTTPFound(f"/r/{index}/{hops - 1}" if hops > 1 else f"/page/{index}")
+
+    async def serve_asset(self, request: web.Request) -> web.Response:
+        content_type = "text/css" if request.path.endswith(".css") else "image/png"
+        return web.Response(body=b"\0" * 1024, content_type=content_type)
+
+    async def serve_file(self, _: web.Request) -> web.Response:
+        return web.Response(body=b"\0" * 64 * 1024, content_type="application/pdf")
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.serve_page)
+        app.router.add_get("/page/{index}", self.serve_page)
+        app.router.add_get("/r/{index}/{hops}", self.serve_redirect)
+        app.router.add_get("/assets/{name}", self.serve_asset)
+        app.router.add_get("/files/{name}", self.serve_file)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self.runner = web.AppRunner(self.build_app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        # port 0 picks a free port
+        self.port = self.runner.addresses[0][1]
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+async def serve(config: SyntheticSiteConfiguration, host: str, port: int, started=None):
+    site = SyntheticSite(config)
+    await site.start(host, port)
+
+    if started is not None:
+        # i.e. a multiprocessing queue the parent is waiting on for the port
+        started.put(site.port)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await site.close()
+
+
+def add_site_arguments(parser: argparse.ArgumentParser):
+    defaults = SyntheticSiteConfiguration()
+    parser.add_argument('--pages', type=int, default=None, help=f"Pages on the site (default: {defaults.pages})")
+    parser.add_argument('--fan-out', type=int, default=None, help=f"Links on each page (default: {defaults.fan_out})")
+    parser.add_argument('--page-size', type=int, default=None, help=f"Bytes in each page (default: {defaults.page_size})")
+    parser.add_argument('--latency', type=float, default=None, help="Seconds before each response (default: 0)")
+    parser.add_argument('--latency-jitter', type=float, default=None, help="Latency is spread over latency +- this (default: 0)")
+    parser.add_argument('--error-rate', type=float, default=None, help="Share of pages that respond 500 or 404 (default: 0)")
+    parser.add_argument('--redirect-rate', type=float, default=None, help="Share of pages linked through redirects (default: 0)")
+    parser.add_argument('--redirect-hops', type=int, default=None, help=f"Redirects in each chain (default: {defaults.redirect_hops})")
+    parser.add_argument('--asset-rate', type=float, default=None, help=f"Share of links to assets (default: {defaults.asset_rate})")
+    parser.add_argument('--seed', type=int, default=None, help="Changes the link graph (default: 0)")
+
+
+def site_overrides(args: argparse.Namespace) -> dict:
+    # the site arguments that were given, by SyntheticSiteConfiguration parameter
+    names = ["pages", "fan_out", "page_size", "latency", "latency_jitter", "error_rate", "redirect_rate", "redirect_hops", "asset_rate", "seed"]
+    return {name: getattr(args, name) for name in names if getattr(args, name) is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Krawler - synthetic site server")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8080)
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    config = SyntheticSiteConfiguration(**site_overrides(args))
+    print(f"serving {config.pages} pages on http://{args.host}:{args.port}/")
+
+    try:
+        asyncio.run(serve(config, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Visited set benchmark
+
+Measures memory per url and add/lookup cost of each visited set mode, and of the orchestrator's original
+registered_links dict, at a given number of synthetic urls - no network is involved.
+Memory is the growth in traced allocations while the urls are added, so it includes the url strings an exact set
+keeps alive and excludes them for the compact modes, which only keep fingerprints or bits.
+
+Usage (from src):
+    python -m benchmark.visited [--urls 1000000] [--error-rate 1e-6]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from visited_set.visited import BLOOM, EXACT, FINGERPRINT, VisitedSetConfiguration, construct_visited_set
+
+_host = "www.example-domain.com"
+
+
+def make_url(index: int) -> str:
+    return f"https://{_host}/section-{index % 97}/article-{index}?page={index % 7}"
+
+
+def measure_memory(mode: str, url_count: int, error_rate: float) -> float:
+    gc.collect()
+    tracemalloc.start()
+    started, _ = tracemalloc.get_traced_memory()
+
+    if mode == "dict":
+        # the original registered_links - a url string key with a list of contained links per page
+        visited = {}
+        for index in range(url_count):
+            visited[make_url(index)] = None
+    else:
+        visited = construct_visited_set(VisitedSetConfiguration(mode, error_rate=error_rate))
+        for index in range(url_count):
+            visited.add(make_url(index))
+
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del visited
+    return (current - started) / url_count
+
+
+def measure_time(mode: str, url_count: int, error_rate: float) -> tuple[float, float, float]:
+    urls = [make_url(index) for index in range(url_count)]
+    visited = construct_visited_set(VisitedSetConfiguration(mode, error_rate=error_rate))
+
+    started = time.perf_counter()
+    for url in urls:
+        visited.add(url)
+    add_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for url in urls:
+        _ = url in visited
+    lookup_seconds = time.perf_counter() - started
+
+    # urls that were never added - any hit is a false positive
+    unseen = [make_url(index) + "&unseen" for index in range(min(url_count, 100000))]
+    false_positive_rate = sum(url in visited for url in unseen) / len(unseen)
+
+    return add_seconds / url_count, lookup_seconds / url_count, false_positive_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Krawler - visited set benchmark")
+    parser.add_argument('--urls', type=int, default=1000000)
+    parser.add_argument('--error-rate', type=float, default=1e-6, help="bloom filter error rate")
+    args = parser.parse_args()
+
+    print(f"{args.urls} urls")
+    print(f"{'mode':>12} {'bytes/url':>10} {'add ns':>8} {'lookup ns':>10} {'false +':>10}")
+
+    bytes_per_url = measure_memory("dict", args.urls, args.error_rate)
+    print(f"{'dict':>12} {bytes_per_url:>10.1f} {'-':>8} {'-':>10} {'-':>10}")
+
+    for mode in [EXACT, FINGERPRINT, BLOOM]:
+        bytes_per_url = measure_memory(mode, args.urls, args.error_rate)
+        add_seconds, lookup_seconds, false_positive_rate = measure_time(mode, args.urls, args.error_rate)
+
+        print(f"{mode:>12} {bytes_per_url:>10.1f} {add_seconds * 1e9:>8.0f} {lookup_seconds * 1e9:>10.0f} {false_positive_rate:>10.2e}")
+
+
+if __name__ == '__main__':
+    main()
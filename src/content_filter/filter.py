@@ -0,0 +1,112 @@
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# link classifications
+ALLOW = "allow"
+DENY = "deny"
+# the extension doesn't say whether the link is a page - only a request can tell
+PROBE = "probe"
+
+_default_allow_extensions = [
+    ".html", ".htm", ".xhtml", ".shtml", ".php", ".asp", ".aspx", ".jsp", ".jspx", ".cfm", ".cgi", ".pl",
+]
+
+_default_deny_extensions = [
+    # styles, scripts and data
+    ".css", ".js", ".mjs", ".map", ".json", ".xml", ".rss", ".atom", ".txt", ".csv",
+    # images
+    ".ico", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".bmp", ".tif", ".tiff",
+    # fonts
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    # audio and video
+    ".mp3", ".wav", ".ogg", ".flac", ".m4a", ".mp4", ".m4v", ".webm", ".mov", ".avi", ".mkv",
+    # documents
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt", ".ods", ".epub",
+    # archives and binaries
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".exe", ".msi", ".dmg", ".apk", ".iso", ".bin",
+]
+
+# substrings of links that are never pages i.e. cloudflare's email protection
+_default_deny_patterns = ["cdn-cgi"]
+
+_default_html_types = ["text/html", "application/xhtml+xml"]
+
+# longer "extensions" are part of the name i.e. /releases/version-1.2.3-final
+_max_extension_length = 6
+
+
+class ContentFilterConfiguration:
+    def __init__(self, allow_extensions: list[str] = None, deny_extensions: list[str] = None, deny_patterns: list[str] = None,
+                 html_types: list[str] = None, head_probe: bool = False, cache_size: int = 1 << 16):
+        # extensions are added to the defaults, taking them out of the other list i.e. allowing `.xml`
+        allow_extensions = {normalise_extension(extension) for extension in allow_extensions or []}
+        deny_extensions = {normalise_extension(extension) for extension in deny_extensions or []}
+
+        self.allow_extensions = (set(_default_allow_extensions) - deny_extensions) | allow_extensions
+        self.deny_extensions = (set(_default_deny_extensions) - allow_extensions) | deny_extensions
+        self.deny_patterns = deny_patterns if deny_patterns is not None else list(_default_deny_patterns)
+        # Content-Type values that are parsed for links
+        self.html_types = html_types if html_types is not None else list(_default_html_types)
+        # links with an unknown extension are checked with a HEAD request before they are queued
+        self.head_probe = head_probe
+        self.cache_size = cache_size
+
+
+class ContentFilter:
+    """
+    Decides from a link alone whether it is worth downloading, so assets are never queued or requested.
+    Links without an extension or with a page extension are allowed, known asset extensions are denied and
+    anything else is left to a HEAD probe (when enabled) or to the Content-Type of the GET.
+    """
+    def __init__(self, config: ContentFilterConfiguration = None):
+        self.config = config if config is not None else ContentFilterConfiguration()
+        self.head_probe = self.config.head_probe
+        # results of HEAD probes - links are often found on many pages, they are only probed once
+        self.probed: dict[str, bool] = {}
+
+        self.classify = lru_cache(maxsize=self.config.cache_size)(self._classify)
+
+    def _classify(self, link: str) -> str:
+        for pattern in self.config.deny_patterns:
+            if pattern in link:
+                return DENY
+
+        extension = link_extension(link)
+        if extension is None or extension in self.config.allow_extensions:
+            return ALLOW
+        if extension in self.config.deny_extensions:
+            return DENY
+
+        return PROBE
+
+    def allows(self, link: str) -> bool:
+        return self.classify(link) != DENY
+
+    def is_html(self, content_type: str) -> bool:
+        # the header may carry parameters i.e. `text/html; charset=utf-8`
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        return media_type in self.config.html_types
+
+
+def normalise_extension(extension: str) -> str:
+    # `pdf`, `.pdf` and `.PDF` are the same extension
+    extension = extension.lower()
+    return extension if extension.startswith(".") else f".{extension}"
+
+
+def link_extension(link: str) -> str | None:
+    try:
+        path = urlsplit(link).path
+    except ValueError:
+        return None
+
+    name = path.rsplit("/", 1)[-1]
+    dot = name.rfind(".")
+    if dot <= 0 or len(name) - dot > _max_extension_length + 1:
+        return None
+
+    return name[dot:].lower()
+
+
+def construct_content_filter(config: ContentFilterConfiguration) -> ContentFilter:
+    return ContentFilter(config)
@@ -0,0 +1,202 @@
+"""
+Library API
+
+Runs krawls from inside an existing event loop, without the command line and without writing files - any number
+of krawls can share one loop:
+
+    from contextlib import aclosing
+    from crawl_api.api import CrawlOptions, crawl, crawl_iter
+
+    result = await crawl(CrawlOptions("example.com", recursion_limit=3))
+    result.pages    # {link: contained links}, like the json output
+
+    async with aclosing(crawl_iter(CrawlOptions("example.com", max_pages=500))) as pages:
+        async for page in pages:
+            page.url, page.links, page.status
+
+Pages can also be handed to hooks (plain functions or coroutines) as they are fetched, with either call.
+"""
+import asyncio
+import inspect
+from typing import AsyncIterator, Callable
+
+from crawl_metrics.metrics import MetricsConfiguration
+from crawl_scope.scope import ScopeConfiguration
+from frontier.frontier import FrontierConfiguration
+from frontier.priority import default_scorers
+from http_transport.transport import TimeoutConfiguration, Transport, TransportConfiguration
+from link_ripper.ripper import LinkRipperConfiguration
+from orchestrator.orchestrator import CrawlBudgetConfiguration, Orchestrator
+from politeness.scheduler import PolitenessConfiguration
+from result_writer.writer import ResultWriterConfiguration
+from robots_txt.robots import RobotsConfiguration
+from sitemap.sitemap import SitemapConfiguration
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+
+class CrawlOptions:
+    def __init__(self, host: str, subdomain: str = "www", path: str = "/", scheme: str = "http", port: int = None,
+                 recursion_limit: int = 5, max_pages: int = None, max_duration: float = None, max_page_size: int = 10 * 1024 * 1024,
+                 concurrency: int = 10, rate_limit: float = 10.0, burst: int = 10, max_retries: int = 3,
+                 max_connections: int = 100, max_connections_per_host: int = 10, workers: int = 0,
+                 respect_robots: bool = True, sitemap: bool = False, strip_query_params: list[str] = None,
+                 ripper: str = "regex", capture_sources: bool = False, priority: bool = False,
+                 path_weights: list[tuple[str, float]] = None, output: ResultWriterConfiguration = None,
+                 on_page: list[Callable] = None, deadline: float = None, timeouts: TimeoutConfiguration = None,
+                 seeds: list[str] = None, allow: list[str] = None, deny: list[str] = None):
+        # scope - the krawl starts at scheme://subdomain.host:port/path and stays on subdomain.host, "" for no subdomain
+        self.host = host
+        self.subdomain = subdomain
+        self.path = path
+        self.scheme = scheme
+        self.port = port
+        # more links to start from, whose hosts are krawled too, and allow / deny rules - see crawl_scope.scope
+        self.seeds = seeds if seeds is not None else []
+        self.allow = allow if allow is not None else []
+        self.deny = deny if deny is not None else []
+        self.strip_query_params = strip_query_params if strip_query_params is not None else []
+        self.respect_robots = respect_robots
+        # seed with the pages listed in the site's sitemaps
+        self.sitemap = sitemap
+
+        # limits - -1 for no recursion limit, None for no page or time budget or deadline, None for no page size limit
+        self.recursion_limit = recursion_limit
+        self.max_pages = max_pages
+        self.max_duration = max_duration
+        self.deadline = deadline
+        self.max_page_size = max_page_size
+        # connect, first byte, stall, page and watchdog limits - None for the defaults
+        self.timeouts = timeouts
+
+        # concurrency and politeness - 0 for no rate limit or connection limit
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.workers = workers
+
+        self.ripper = ripper
+        self.capture_sources = capture_sources
+        # krawl the most valuable links first, see frontier.priority
+        self.priority = priority or bool(path_weights)
+        self.path_weights = path_weights
+
+        # None keeps results in memory only
+        self.output = output
+        # called with a CrawledPage as each page is fetched, coroutines are awaited - the krawl waits for them
+        self.on_page = on_page if on_page is not None else []
+
+    def base_link(self) -> str:
+        netloc = f"{self.subdomain}.{self.host}" if self.subdomain else self.host
+        if self.port is not None:
+            netloc += f":{self.port}"
+
+        return f"{self.scheme}://{netloc}{self.path}"
+
+
+class CrawledPage:
+    """
+    A fetched page - failed pages have a status and no links
+    """
+    __slots__ = ("url", "links", "depth", "status", "bytes", "latency")
+
+    def __init__(self, url: str, links: list[str], depth: int = None, status: int = None, bytes: int = None, latency: float = None):
+        self.url = url
+        # every link on the page, canonical and in page order
+        self.links = links
+        self.depth = depth
+        self.status = status
+        self.bytes = bytes
+        # seconds from the request to the response headers
+        self.latency = latency
+
+    def __repr__(self) -> str:
+        return f"CrawledPage({self.url!r}, {len(self.links)} links, status={self.status})"
+
+
+class CrawlResult:
+    def __init__(self, pages: dict, stats: dict):
+        # {link: contained links}, like the json output - pages beyond the recursion limit have a string instead
+        self.pages = pages
+        # counters, timings and gauges, see crawl_metrics.metrics
+        self.stats = stats
+
+
+def construct_orchestrator(options: CrawlOptions, page_hooks: list = None, keep_page_links: bool = True,
+                           transport: Transport = None, fetch_slots=None) -> Orchestrator:
+    # a shared transport and fetch slots put the krawl under limits shared with other krawls, see crawl_service
+    transport_config = TransportConfiguration(options.max_connections, options.max_connections_per_host, timeouts=options.timeouts)
+    normaliser_config = UrlNormaliserConfiguration(default_scheme=options.scheme, strip_query_params=options.strip_query_params)
+    ripper_config = LinkRipperConfiguration(options.ripper, options.capture_sources)
+    politeness_config = PolitenessConfiguration(options.rate_limit, options.burst, max_retries=options.max_retries)
+    robots_config = RobotsConfiguration() if options.respect_robots else None
+    sitemap_config = SitemapConfiguration() if options.sitemap else None
+    frontier_config = FrontierConfiguration(scorers=default_scorers(options.path_weights)) if options.priority else None
+    budget_config = CrawlBudgetConfiguration(options.max_pages, options.max_duration, options.deadline)
+    scope_config = ScopeConfiguration(options.seeds, options.allow, options.deny)
+
+    return Orchestrator(options.subdomain, options.host, options.recursion_limit, transport_config, options.concurrency,
+                        options.max_page_size, normaliser_config, ripper_config, writer_config=options.output,
+                        politeness_config=politeness_config, robots_config=robots_config, sitemap_config=sitemap_config,
+                        workers=options.workers, frontier_config=frontier_config, metrics_config=MetricsConfiguration(),
+                        budget_config=budget_config, page_hooks=page_hooks, keep_page_links=keep_page_links,
+                        transport=transport, fetch_slots=fetch_slots, scope_config=scope_config)
+
+
+def page_hook(callback: Callable) -> Callable:
+    # the orchestrator's hooks take (link, contained links, metadata) and are awaited
+    async def hook(link: str, contained_links: list, metadata: dict):
+        page = CrawledPage(link, contained_links, metadata.get("depth"), metadata.get("status"), metadata.get("bytes"), metadata.get("latency"))
+
+        result = callback(page)
+        if inspect.isawaitable(result):
+            await result
+
+    return hook
+
+
+async def crawl(options: CrawlOptions) -> CrawlResult:
+    """
+    Krawls to the end and returns every page - a hook that raises stops the krawl and the error is raised here
+    """
+    orchestrator = construct_orchestrator(options, [page_hook(callback) for callback in options.on_page])
+    await orchestrator.crawl(options.base_link())
+
+    return CrawlResult(orchestrator.registered_links, orchestrator.metrics.snapshot())
+
+
+async def crawl_iter(options: CrawlOptions, buffer: int = 100) -> AsyncIterator[CrawledPage]:
+    """
+    Yields pages as they are fetched. Pages aren't kept once yielded, and the krawl waits while buffer pages are
+    waiting to be taken. Closing the iterator stops the krawl - wrap it in contextlib.aclosing to stop as soon as
+    the loop is left, rather than when the iterator is garbage collected.
+    """
+    pages: asyncio.Queue[CrawledPage] = asyncio.Queue(buffer)
+
+    hooks = [page_hook(callback) for callback in options.on_page] + [page_hook(pages.put)]
+    orchestrator = construct_orchestrator(options, hooks, keep_page_links=False)
+    krawl = asyncio.create_task(orchestrator.crawl(options.base_link()))
+
+    try:
+        while True:
+            getter = asyncio.ensure_future(pages.get())
+            await asyncio.wait([getter, krawl], return_when=asyncio.FIRST_COMPLETED)
+
+            if getter.done():
+                yield getter.result()
+                continue
+
+            getter.cancel()
+
+            # finished - pages queued before the end are still handed out, then any error is raised
+            while not pages.empty():
+                yield pages.get_nowait()
+
+            krawl.result()
+            return
+    finally:
+        if not krawl.done():
+            krawl.cancel()
+            await asyncio.gather(krawl, return_exceptions=True)
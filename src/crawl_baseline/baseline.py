@@ -0,0 +1,121 @@
+import json
+import os
+
+from result_writer.writer import read_output, read_records
+
+# sidecar files written next to a krawl's output
+HASHES = ".hashes.ndjson"
+DIFF = ".diff.json"
+
+
+def sidecar_path(output_path: str, suffix: str) -> str:
+    # krawl.json.gz -> krawl.hashes.ndjson
+    base = output_path.removesuffix(".gz")
+    for extension in (".json", ".ndjson", ".graph"):
+        base = base.removesuffix(extension)
+    return base + suffix
+
+
+class BaselineConfiguration:
+    def __init__(self, path: str, diff_path: str = None):
+        # output of an earlier krawl of the same site in any output format - its hashes are read from the sidecar next to it
+        self.path = path
+        # None writes the diff next to the new output
+        self.diff_path = diff_path
+
+
+class Baseline:
+    """
+    An earlier krawl to recrawl against: the links found on each page, the content hash of each page and the
+    pages that had changed when it was krawled. Outputs written before hashes were recorded have no sidecar - every
+    page is then ripped again, but the diff still works.
+    """
+    def __init__(self, config: BaselineConfiguration):
+        self.path = config.path
+        self.diff_path = config.diff_path
+
+        # pages beyond the recursion limit weren't krawled, so have nothing to compare against
+        self.links: dict[str, list] = {link: links for link, links in read_output(self.path).items() if isinstance(links, list)}
+        self.hashes: dict[str, str] = {}
+        # pages that were new or had changed content when the baseline was krawled - likely to change again
+        self.changed: set[str] = set()
+
+        hashes_path = sidecar_path(self.path, HASHES)
+        if os.path.isfile(hashes_path):
+            for record in read_records(hashes_path):
+                self.hashes[record["url"]] = record["hash"]
+                if record.get("changed"):
+                    self.changed.add(record["url"])
+
+
+class PageHashes:
+    """
+    Content hash of every page a krawl downloads, streamed to a sidecar ({"url", "hash", "changed"} per line) so
+    the krawl can be the baseline of a later one. Shared by the link processors, which ask it for the baseline's
+    hash and links so that unchanged pages aren't ripped again.
+    """
+    def __init__(self, baseline: Baseline = None):
+        self.baseline = baseline
+        self.file = None
+        # pages in the baseline whose content has changed since
+        self.changed_pages: set[str] = set()
+
+    def open(self, path: str, append: bool = False):
+        # a resumed krawl adds to the hashes recorded by the interrupted one
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def hashing(self) -> bool:
+        return self.file is not None or self.baseline is not None
+
+    def previous_hash(self, link: str) -> str | None:
+        return self.baseline.hashes.get(link) if self.baseline is not None else None
+
+    def previous_links(self, link: str) -> list:
+        return self.baseline.links.get(link, []) if self.baseline is not None else []
+
+    def record(self, link: str, content_hash: str):
+        previous_hash = self.previous_hash(link)
+        changed = previous_hash != content_hash
+
+        if changed and previous_hash is not None:
+            self.changed_pages.add(link)
+
+        if self.file is not None:
+            self.file.write(json.dumps({"url": link, "hash": content_hash, "changed": changed}) + "\n")
+
+
+def diff_krawls(previous: dict, current: dict, changed_pages: set = frozenset()) -> dict:
+    """
+    Pages and links added and removed between two krawls' {link: contained links} - links are only listed for pages
+    in both, pages that are new or gone are listed on their own. Pages beyond the recursion limit are left out.
+    """
+    previous = {link: links for link, links in previous.items() if isinstance(links, list)}
+    current = {link: links for link, links in current.items() if isinstance(links, list)}
+
+    links_added = {}
+    links_removed = {}
+
+    for link, links in current.items():
+        if link not in previous:
+            continue
+
+        previous_links = set(previous[link])
+        current_links = set(links)
+
+        if added := [found for found in links if found not in previous_links]:
+            links_added[link] = added
+        if removed := [found for found in previous[link] if found not in current_links]:
+            links_removed[link] = removed
+
+    return {
+        "pages_added": [link for link in current if link not in previous],
+        "pages_removed": [link for link in previous if link not in current],
+        "pages_changed": [link for link in current if link in changed_pages and link in previous],
+        "links_added": links_added,
+        "links_removed": links_removed,
+    }
@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import time
+
+# link states
+QUEUED = "queued"
+DONE = "done"
+SKIPPED = "skipped"
+RECURSION_LIMIT = "recursion-limit"
+
+# crawl values
+OUTPUT_PATH = "output-path"
+
+
+class CrawlJournalConfiguration:
+    def __init__(self, path: str, commit_interval: float = 1.0):
+        self.path = path
+        # seconds between commits - a crash loses at most this much progress, which is simply re-fetched on resume
+        self.commit_interval = commit_interval
+
+
+class CrawlJournal:
+    """
+    Running record of a crawl's state, kept in SQLite so that an interrupted crawl can be resumed.
+
+    Every link is recorded once when it is queued (so the row order is the discovery order of the output) and
+    updated when a worker finishes with it:
+        queued          - in the frontier, not yet processed (or in flight when the crawl stopped)
+        done            - processed, contained links stored as json
+        skipped         - not a html page
+        recursion-limit - discovered beyond the recursion limit
+
+    Values that apply to the whole crawl are kept alongside - the output path, so that a resumed crawl writes to
+    the same output as the interrupted one.
+    """
+    def __init__(self, config: CrawlJournalConfiguration):
+        self.path = config.path
+        self.commit_interval = config.commit_interval
+        self.last_commit = time.monotonic()
+
+        self.connection = sqlite3.connect(self.path)
+        # WAL + NORMAL keeps writes cheap, a crash can lose the last transaction but never corrupts the journal
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS crawl (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS links (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT UNIQUE NOT NULL,
+                depth INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                contained TEXT
+            );
+        """)
+        self.connection.commit()
+
+    def has_entries(self) -> bool:
+        return self.connection.execute("SELECT 1 FROM links LIMIT 1").fetchone() is not None
+
+    def set_value(self, key: str, value: str):
+        self.connection.execute("INSERT OR REPLACE INTO crawl (key, value) VALUES (?, ?)", (key, value))
+        self.maybe_commit()
+
+    def get_value(self, key: str) -> str | None:
+        row = self.connection.execute("SELECT value FROM crawl WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def record_queued(self, url: str, depth: int):
+        self.connection.execute("INSERT OR IGNORE INTO links (url, depth, state) VALUES (?, ?, ?)", (url, depth, QUEUED))
+        self.maybe_commit()
+
+    def record_done(self, url: str, contained_links: list):
+        self.update_state(url, DONE, json.dumps(contained_links))
+
+    def record_skipped(self, url: str):
+        self.update_state(url, SKIPPED)
+
+    def record_recursion_limit(self, url: str):
+        self.update_state(url, RECURSION_LIMIT)
+
+    def update_state(self, url: str, state: str, contained: str = None):
+        self.connection.execute("UPDATE links SET state = ?, contained = ? WHERE url = ?", (state, contained, url))
+        self.maybe_commit()
+
+    def load(self):
+        """
+        Returns:
+        registered_links, skip_links, frontier: (tuple[dict, set, list[tuple[str, int]]])
+            the orchestrator's state - frontier holds every link that hadn't finished, in discovery order
+        """
+        registered_links = {}
+        skip_links = set()
+        frontier = []
+
+        for url, depth, state, contained in self.connection.execute("SELECT url, depth, state, contained FROM links ORDER BY id"):
+            if state == DONE:
+                registered_links[url] = json.loads(contained)
+            elif state == RECURSION_LIMIT:
+                registered_links[url] = "not processed - recursion limit reached"
+            elif state == SKIPPED:
+                skip_links.add(url)
+            else:
+                registered_links[url] = None
+                frontier.append((url, depth))
+
+        return registered_links, skip_links, frontier
+
+    def maybe_commit(self):
+        if time.monotonic() - self.last_commit >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        self.connection.commit()
+        self.last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+
+def journal_has_entries(path: str) -> bool:
+    # an existing journal with links in it is an interrupted crawl
+    if not os.path.isfile(path):
+        return False
+
+    journal = CrawlJournal(CrawlJournalConfiguration(path))
+    try:
+        return journal.has_entries()
+    finally:
+        journal.close()
+
+
+def construct_crawl_journal(config: CrawlJournalConfiguration) -> CrawlJournal:
+    return CrawlJournal(config)
@@ -0,0 +1,390 @@
+import asyncio
+import bisect
+import heapq
+import json
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Callable, TextIO
+
+import aiohttp
+from aiohttp import web
+
+# upper bounds in seconds - from a cached dns lookup up to a page that takes a minute to download
+_default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# timings recorded by a crawl
+DNS = "dns"
+CONNECT = "connect"
+POOL_WAIT = "pool_wait"
+TTFB = "ttfb"
+DOWNLOAD = "download"
+PARSE = "parse"
+PAGE = "page"
+
+# pages that ran into a timeout are listed, slowest first, up to this many
+_timed_out_pages = 100
+
+# metrics of the crawl running in the current task and the tasks it starts - see construct_trace_config
+current_metrics: ContextVar["CrawlMetrics | None"] = ContextVar("current_metrics", default=None)
+
+_timing_help = {
+    DNS: "dns resolution, cache misses only",
+    CONNECT: "opening a connection (tcp + tls), excluding dns",
+    POOL_WAIT: "waiting for a free connection in the transport's pool",
+    TTFB: "request sent to response headers received",
+    DOWNLOAD: "response headers to the end of the body",
+    PARSE: "ripping and normalising the links of a page",
+    PAGE: "a worker taking a link to finishing with it",
+}
+
+
+class MetricsConfiguration:
+    def __init__(self, summary_interval: float = 0, stats_path: str = None, prometheus_port: int = None,
+                 prometheus_host: str = "127.0.0.1", summary_stream: TextIO = None):
+        # seconds between one line summaries of the crawl's progress, 0 turns them off
+        self.summary_interval = summary_interval
+        self.summary_stream = summary_stream if summary_stream is not None else sys.stderr
+        # a json report of every metric is written here once the crawl finishes, None doesn't write one
+        self.stats_path = stats_path
+        # GET /metrics on this port serves the metrics in the prometheus text format while the crawl runs, None doesn't
+        self.prometheus_port = prometheus_port
+        self.prometheus_host = prometheus_host
+
+
+class Histogram:
+    """
+    Fixed bucket histogram (prometheus style) - observing is a bisect and an increment however many values are
+    observed, quantiles are estimated by interpolating within the bucket they fall in
+    """
+    def __init__(self, buckets: tuple = _default_buckets):
+        self.buckets = buckets
+        # the last count is everything above the largest bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float | None:
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                if index == len(self.buckets):
+                    return self.max
+
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index]
+                estimate = lower + (upper - lower) * (rank - cumulative) / bucket_count
+                return min(estimate, self.max)
+
+            cumulative += bucket_count
+
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max if self.count else None,
+        }
+
+
+class CrawlMetrics:
+    """
+    Counters, timing histograms and gauges for a crawl, shared by every component that records to it.
+    Everything runs on the event loop, so recording is a dict increment with no locking.
+
+    Counters:
+        requests, retries, bytes       - made by the transport and page loaders
+        pages                          - links processed, including pages_failed
+        pages_failed, pages_skipped, pages_beyond_limit, not_modified, links_found, links_queued
+        responses by status, errors by exception type, timeouts by the limit that was hit (and the slowest pages that hit one)
+    Gauges are read when a snapshot is taken i.e. the frontier's queue depth and the size of the instance pools.
+    """
+    def __init__(self):
+        self.counters = Counter()
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.timeouts = Counter()
+        # (seconds, url, kind) - a min heap, so the quickest is dropped once it is full
+        self.timed_out: list[tuple[float, str, str]] = []
+        self.timings: dict[str, Histogram] = {name: Histogram() for name in _timing_help}
+        self.gauges: dict[str, Callable[[], float | None]] = {}
+        self.started = time.monotonic()
+
+    def start(self):
+        self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def increment(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def observe(self, name: str, seconds: float):
+        self.timings[name].observe(seconds)
+
+    def record_status(self, status: int):
+        self.statuses[status] += 1
+
+    def record_error(self, error: BaseException):
+        self.errors[type(error).__name__] += 1
+
+    def record_timeout(self, kind: str, url: str, seconds: float):
+        self.timeouts[kind] += 1
+
+        entry = (seconds, url, kind)
+        if len(self.timed_out) < _timed_out_pages:
+            heapq.heappush(self.timed_out, entry)
+        elif entry > self.timed_out[0]:
+            heapq.heapreplace(self.timed_out, entry)
+
+    def register_gauge(self, name: str, read: Callable[[], float | None]):
+        # read returns None while the value isn't known i.e. the queue depth of a shared frontier
+        self.gauges[name] = read
+
+    def read_gauges(self) -> dict:
+        values = {}
+        for name, read in self.gauges.items():
+            value = read()
+            if value is not None:
+                values[name] = value
+        return values
+
+    def pages_per_second(self) -> float:
+        elapsed = self.elapsed()
+        return self.counters["pages"] / elapsed if elapsed > 0 else 0.0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Hooks into every request made through a session, so dns, connect, pool wait and ttfb are timed
+        by aiohttp itself rather than around the calls that make requests
+        """
+        return construct_trace_config(lambda: self)
+
+    def snapshot(self) -> dict:
+        return {
+            "elapsed_seconds": self.elapsed(),
+            "pages_per_second": self.pages_per_second(),
+            "counters": dict(self.counters),
+            "responses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "errors": dict(self.errors),
+            "timeouts": dict(self.timeouts),
+            "timed_out": [{"url": url, "kind": kind, "seconds": seconds} for seconds, url, kind in sorted(self.timed_out, reverse=True)],
+            "timings": {name: histogram.summary() for name, histogram in self.timings.items()},
+            "gauges": self.read_gauges(),
+        }
+
+    def summary(self) -> str:
+        """
+        One line of the numbers that matter while tuning i.e.
+        `12s pages 340 (28.3/s) failed 2 queued 1200 in flight 10 | 4.1 MB | ttfb p50 45ms p99 310ms | parse p50 2ms`
+        """
+        gauges = self.read_gauges()
+        parts = [
+            f"{self.elapsed():.0f}s pages {self.counters['pages']} ({self.pages_per_second():.1f}/s)",
+            f"failed {self.counters['pages_failed']}",
+        ]
+        if "queue_depth" in gauges:
+            parts.append(f"queued {gauges['queue_depth']}")
+        parts.append(f"in flight {gauges.get('in_flight', 0)}")
+
+        line = " ".join(parts) + f" | {self.counters['bytes'] / 1e6:.1f} MB"
+        if self.errors:
+            line += f" | errors {sum(self.errors.values())}"
+        if self.timeouts:
+            line += f" | timeouts {sum(self.timeouts.values())}"
+
+        for name in (TTFB, DOWNLOAD, PARSE):
+            histogram = self.timings[name]
+            if histogram.count:
+                line += f" | {name} p50 {histogram.quantile(0.5) * 1000:.0f}ms p99 {histogram.quantile(0.99) * 1000:.0f}ms"
+
+        return line
+
+    def prometheus(self) -> str:
+        # text exposition format 0.0.4
+        lines = []
+
+        def metric(name: str, metric_type: str, help_text: str):
+            lines.append(f"# HELP krawler_{name} {help_text}")
+            lines.append(f"# TYPE krawler_{name} {metric_type}")
+
+        for name, value in sorted(self.counters.items()):
+            metric(f"{name}_total", "counter", name.replace("_", " "))
+            lines.append(f"krawler_{name}_total {value}")
+
+        metric("responses_total", "counter", "responses by status code")
+        for status, count in sorted(self.statuses.items()):
+            lines.append(f'krawler_responses_total{{status="{status}"}} {count}')
+
+        metric("errors_total", "counter", "failed requests by exception type")
+        for error, count in sorted(self.errors.items()):
+            lines.append(f'krawler_errors_total{{error="{error}"}} {count}')
+
+        metric("timeouts_total", "counter", "requests and pages that ran into a timeout by limit")
+        for kind, count in sorted(self.timeouts.items()):
+            lines.append(f'krawler_timeouts_total{{kind="{kind}"}} {count}')
+
+        for name, histogram in self.timings.items():
+            metric(f"{name}_seconds", "histogram", _timing_help[name])
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'krawler_{name}_seconds_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'krawler_{name}_seconds_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"krawler_{name}_seconds_sum {histogram.sum}")
+            lines.append(f"krawler_{name}_seconds_count {histogram.count}")
+
+        for name, value in sorted(self.read_gauges().items()):
+            metric(name, "gauge", name.replace("_", " "))
+            lines.append(f"krawler_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def construct_trace_config(get_metrics: Callable[[], CrawlMetrics | None]) -> aiohttp.TraceConfig:
+    """
+    Records each request to the metrics get_metrics returns when the request starts, None doesn't record it.
+    A session shared by several crawls traces to current_metrics - the metrics of the crawl making the request.
+    """
+    trace_config = aiohttp.TraceConfig()
+    clock = time.monotonic
+
+    async def on_request_start(_, context: SimpleNamespace, __):
+        # later callbacks of the request record to the same metrics
+        context.metrics = get_metrics()
+        context.dns = 0.0
+        context.headers_sent = None
+        if context.metrics is not None:
+            context.metrics.increment("requests")
+
+    async def on_connection_queued_start(_, context: SimpleNamespace, __):
+        context.queued = clock()
+
+    async def on_connection_queued_end(_, context: SimpleNamespace, __):
+        if context.metrics is not None:
+            context.metrics.observe(POOL_WAIT, clock() - context.queued)
+
+    async def on_dns_resolvehost_start(_, context: SimpleNamespace, __):
+        context.dns_started = clock()
+
+    async def on_dns_resolvehost_end(_, context: SimpleNamespace, __):
+        context.dns = clock() - context.dns_started
+        if context.metrics is not None:
+            context.metrics.observe(DNS, context.dns)
+
+    async def on_connection_create_start(_, context: SimpleNamespace, __):
+        context.connect_started = clock()
+        context.dns = 0.0
+
+    async def on_connection_create_end(_, context: SimpleNamespace, __):
+        # dns is resolved while the connection is being created
+        if context.metrics is not None:
+            context.metrics.observe(CONNECT, clock() - context.connect_started - context.dns)
+
+    async def on_request_headers_sent(_, context: SimpleNamespace, __):
+        # the last request sent when redirects are followed
+        context.headers_sent = clock()
+
+    async def on_request_end(_, context: SimpleNamespace, params: aiohttp.TraceRequestEndParams):
+        if context.metrics is None:
+            return
+        if context.headers_sent is not None:
+            context.metrics.observe(TTFB, clock() - context.headers_sent)
+        context.metrics.record_status(params.response.status)
+
+    async def on_request_exception(_, context: SimpleNamespace, params: aiohttp.TraceRequestExceptionParams):
+        if context.metrics is not None:
+            context.metrics.record_error(params.exception)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_queued_start.append(on_connection_queued_start)
+    trace_config.on_connection_queued_end.append(on_connection_queued_end)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_headers_sent.append(on_request_headers_sent)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+
+    return trace_config
+
+
+class MetricsReporter:
+    """
+    Reports a crawl's metrics while it runs (periodic summary, prometheus endpoint) and once it finishes (final
+    summary, json stats). Opened and closed around the crawl - with the default configuration it does nothing.
+    """
+    def __init__(self, config: MetricsConfiguration, metrics: CrawlMetrics):
+        self.config = config
+        self.metrics = metrics
+        self.summary_task: asyncio.Task | None = None
+        self.runner: web.AppRunner | None = None
+        # port the prometheus endpoint is listening on - differs from the configured port when that is 0
+        self.port: int | None = None
+
+    async def open(self):
+        self.metrics.start()
+
+        if self.config.summary_interval > 0:
+            self.summary_task = asyncio.create_task(self.print_summaries())
+
+        if self.config.prometheus_port is not None:
+            app = web.Application()
+            app.router.add_get("/metrics", self.serve_metrics)
+
+            self.runner = web.AppRunner(app)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, self.config.prometheus_host, self.config.prometheus_port).start()
+            self.port = self.runner.addresses[0][1]
+
+    async def close(self):
+        if self.summary_task is not None:
+            self.summary_task.cancel()
+            self.summary_task = None
+            self.print_summary()
+
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+            self.port = None
+
+        if self.config.stats_path is not None:
+            with open(self.config.stats_path, "w", encoding="utf-8") as file:
+                json.dump(self.metrics.snapshot(), file, indent=2)
+
+    def print_summary(self):
+        print(self.metrics.summary(), file=self.config.summary_stream, flush=True)
+
+    async def print_summaries(self):
+        while True:
+            await asyncio.sleep(self.config.summary_interval)
+            self.print_summary()
+
+    async def serve_metrics(self, _: web.Request) -> web.Response:
+        return web.Response(text=self.metrics.prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
@@ -0,0 +1,213 @@
+import ipaddress
+import re
+from urllib.parse import urlsplit
+
+# a rule that is a regular expression over the whole canonical url, i.e. "re:\?page=\d{3,}"
+_regex_prefix = "re:"
+
+_schemes = ("http", "https")
+
+
+def is_domain_name(host: str) -> bool:
+    # ip addresses and single label hosts (localhost) have no www form
+    try:
+        ipaddress.ip_address(host)
+        return False
+    except ValueError:
+        return "." in host
+
+
+def link_host(link: str) -> str:
+    # the host of a link that may not have a scheme yet, i.e. a seed as given on the command line
+    return urlsplit(link if "//" in link else f"//{link}").hostname or ""
+
+
+def seed_hosts(host: str) -> list[str]:
+    # a domain and its www subdomain are treated as the same site - www.example.com covers example.com and back
+    host = host.lower()
+    if not is_domain_name(host):
+        return [host]
+    if host.startswith("www."):
+        return [host, host[len("www."):]]
+    return [host, f"www.{host}"]
+
+
+class ScopeConfiguration:
+    def __init__(self, seeds: list[str] = None, allow: list[str] = None, deny: list[str] = None):
+        # links the krawl starts from as well as the base link - the host of each is in scope
+        self.seeds = seeds if seeds is not None else []
+        # rules, see parse_rule - allowed links are krawled as well as the seeds' hosts, denied links never are
+        self.allow = allow if allow is not None else []
+        self.deny = deny if deny is not None else []
+
+
+class InvalidScopeRuleException(Exception):
+    pass
+
+
+class PathTrie:
+    """
+    Path prefixes split into segments - `/blog/` covers /blog and everything below it but not /blogroll.
+    A lookup walks at most one node per segment of the path, however many prefixes there are.
+    """
+    def __init__(self):
+        self.root: dict = {}
+
+    @staticmethod
+    def segments(path: str) -> list[str]:
+        return [segment for segment in path.split("/") if segment]
+
+    def add(self, prefix: str):
+        node = self.root
+        for segment in self.segments(prefix):
+            node = node.setdefault(segment, {})
+        # None marks the end of a prefix
+        node[None] = True
+
+    def matches(self, path: str) -> bool:
+        node = self.root
+        if None in node:
+            return True
+
+        for segment in self.segments(path):
+            node = node.get(segment)
+            if node is None:
+                return False
+            if None in node:
+                return True
+
+        return False
+
+    def __bool__(self) -> bool:
+        return bool(self.root)
+
+
+class RuleSet:
+    """
+    Rules of one kind (allow or deny) compiled for lookups - exact hosts and host suffixes in sets, path prefixes in
+    a trie per host (and one for every host), and every regular expression joined into one pattern
+    """
+    def __init__(self, rules: list[str]):
+        self.hosts: set[str] = set()
+        self.host_suffixes: set[str] = set()
+        # host -> paths, None for paths on any host
+        self.paths: dict[str | None, PathTrie] = {}
+        regexes = []
+
+        for rule in rules:
+            kind, host, value = parse_rule(rule)
+            if kind == "regex":
+                regexes.append(f"(?:{value})")
+            elif kind == "host":
+                self.hosts.add(host)
+            elif kind == "suffix":
+                self.host_suffixes.add(host)
+            else:
+                self.paths.setdefault(host, PathTrie()).add(value)
+
+        self.regex = re.compile("|".join(regexes)) if regexes else None
+
+    def matches_host(self, host: str) -> bool:
+        if host in self.hosts:
+            return True
+        if not self.host_suffixes:
+            return False
+
+        # example.com, then the domains it is a subdomain of - one set lookup per label
+        while True:
+            if host in self.host_suffixes:
+                return True
+            _, dot, host = host.partition(".")
+            if not dot:
+                return False
+
+    def matches_path(self, host: str, path: str) -> bool:
+        for key in (None, host):
+            trie = self.paths.get(key)
+            if trie is not None and trie.matches(path):
+                return True
+        return False
+
+    def matches_regex(self, link: str) -> bool:
+        return self.regex is not None and self.regex.search(link) is not None
+
+
+def parse_rule(rule: str) -> tuple[str, str | None, str]:
+    """
+    (kind, host, value) of a scope rule:
+        re:PATTERN          regex       the canonical url matches the pattern anywhere (re.search)
+        .example.com        suffix      example.com and all of its subdomains
+        /blog/              path        paths under /blog/ on any host in scope
+        example.com/blog/   path        example.com, limited to paths under /blog/
+        www.example.com     host        that host exactly
+    """
+    if rule.startswith(_regex_prefix):
+        pattern = rule[len(_regex_prefix):]
+        try:
+            re.compile(pattern)
+        except re.error as error:
+            raise InvalidScopeRuleException(f"{rule}: {error}")
+        return "regex", None, pattern
+
+    if rule.startswith("/"):
+        return "path", None, rule
+
+    host, slash, path = rule.partition("/")
+    host = host.lower()
+    if host in ("", ".") or ":" in host:
+        raise InvalidScopeRuleException(f"{rule}: expected a host, .suffix, /path, host/path or re:pattern")
+
+    if slash:
+        if host.startswith("."):
+            raise InvalidScopeRuleException(f"{rule}: paths can only be limited to an exact host")
+        return "path", host, "/" + path
+    if host.startswith("."):
+        return "suffix", host[1:], host[1:]
+    return "host", host, host
+
+
+class CrawlScope:
+    """
+    Decides which links a krawl follows, compiled once and checked for every link found. A canonical http(s) link is in
+    scope if no deny rule matches it, and either:
+    - its host is the host of a seed or is allowed by a host or host/path rule, and its path is under one of the paths
+      allowed on any host or on its own host - a host without either krawls every path
+    - it matches an allowed regular expression
+    """
+    def __init__(self, config: ScopeConfiguration, hosts: list[str] = ()):
+        self.hosts: set[str] = set(hosts)
+        for seed in config.seeds:
+            self.hosts.update(seed_hosts(link_host(seed)))
+        self.hosts.discard("")
+
+        self.allow = RuleSet(config.allow)
+        self.deny = RuleSet(config.deny)
+
+    def in_scope(self, link: str) -> bool:
+        parts = urlsplit(link)
+        # mailto:, ftp: etc. links can't be fetched whatever their host
+        if parts.scheme not in _schemes:
+            return False
+
+        host = parts.hostname or ""
+        path = parts.path or "/"
+
+        if self.deny.matches_host(host) or self.deny.matches_path(host, path) or self.deny.matches_regex(link):
+            return False
+
+        # a host/path rule lets its host in, limited to its paths
+        host_paths = host in self.allow.paths
+        if host in self.hosts or host_paths or self.allow.matches_host(host):
+            if not (host_paths or None in self.allow.paths) or self.allow.matches_path(host, path):
+                return True
+
+        return self.allow.matches_regex(link)
+
+
+def construct_scope(subdomain: str, host: str, config: ScopeConfiguration = None) -> CrawlScope:
+    # the original single host krawl - subdomain.host, and host itself for the www (or no) subdomain
+    hosts = []
+    if host:
+        hosts = seed_hosts(host) if subdomain in ("", "www") else [f"{subdomain}.{host}".lower()]
+
+    return CrawlScope(config if config is not None else ScopeConfiguration(), hosts)
@@ -0,0 +1,102 @@
+import asyncio
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+
+class FairScheduler:
+    """
+    A global limit on in-flight page loads, shared fairly by the tenants of the crawl service.
+
+    `async with scheduler.acquire(tenant):` takes a slot while fewer than total are taken, and otherwise waits. Each
+    tenant waits in its own queue and a freed slot goes to the next tenant in turn that is waiting, so a tenant with
+    many workers (or many krawls) can't crowd out the others - while every tenant is waiting each gets an equal share
+    of the slots. Within a tenant slots are handed out in the order they were asked for.
+    """
+    def __init__(self, total: int):
+        self.total = max(1, total)
+        self.in_use = 0
+        # tenant -> waiting futures, in turn order - a tenant served moves to the back
+        self.queues: dict[str, deque[asyncio.Future]] = {}
+        self.tenant_in_use = Counter()
+
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def take(self, tenant: str):
+        if self.in_use < self.total and not self.queues:
+            self.in_use += 1
+            self.tenant_in_use[tenant] += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(tenant, deque()).append(waiter)
+
+        try:
+            # counted in use by whoever handed the slot over
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # handed a slot just as the wait was cancelled - pass it on
+                self.give_back(tenant)
+            else:
+                self.forget(tenant, waiter)
+            raise
+
+    def forget(self, tenant: str, waiter: asyncio.Future):
+        queue = self.queues.get(tenant)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self.queues[tenant]
+
+    def give_back(self, tenant: str):
+        self.tenant_in_use[tenant] -= 1
+        if self.tenant_in_use[tenant] <= 0:
+            del self.tenant_in_use[tenant]
+
+        # the next tenant in turn - the first in the dict - is moved to the back once it is served
+        while self.queues:
+            next_tenant = next(iter(self.queues))
+            queue = self.queues.pop(next_tenant)
+            waiter = queue.popleft()
+            if queue:
+                self.queues[next_tenant] = queue
+
+            if not waiter.done():
+                self.tenant_in_use[next_tenant] += 1
+                waiter.set_result(None)
+                return
+
+        self.in_use -= 1
+
+    @asynccontextmanager
+    async def acquire(self, tenant: str) -> AsyncIterator[None]:
+        await self.take(tenant)
+        try:
+            yield
+        finally:
+            self.give_back(tenant)
+
+    def share(self, tenant: str) -> "TenantSlots":
+        return TenantSlots(self, tenant)
+
+    def stats(self) -> dict:
+        return {
+            "total": self.total,
+            "in_use": self.in_use,
+            "waiting": self.waiting(),
+            "tenants": dict(self.tenant_in_use),
+        }
+
+
+class TenantSlots:
+    """
+    A tenant's view of a FairScheduler - handed to an orchestrator as its fetch_slots
+    """
+    def __init__(self, scheduler: FairScheduler, tenant: str):
+        self.scheduler = scheduler
+        self.tenant = tenant
+
+    def acquire(self):
+        return self.scheduler.acquire(self.tenant)
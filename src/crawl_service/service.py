@@ -0,0 +1,417 @@
+"""
+Crawl service - runs krawls for any number of clients in one long lived process
+
+Usage (from src):
+    python -m crawl_service.service [--host 127.0.0.1] [--port 8080] [--concurrency 50] [--max-connections 200]
+
+Every krawl shares one connection pool (and dns cache) and one limit on the pages being fetched at once, handed
+out fairly between tenants - see crawl_service.scheduler.
+
+    POST   /krawler/crawl              {"host": "example.com", ...}  ->  202 {"id": ..., "status": "running", ...}
+    GET    /krawler/crawl              every krawl's status and the scheduler's state
+    GET    /krawler/crawl/{id}         a krawl's status, progress and metrics
+    GET    /krawler/crawl/{id}/events  the krawl's pages, progress and end, from the oldest kept, streamed as it runs
+    DELETE /krawler/crawl/{id}         cancels the krawl
+
+Events are streamed as json lines, or as server sent events when the request accepts text/event-stream:
+    {"event": "page", "url": ..., "links": [...], "depth": 1, "status": 200, "bytes": 18213, "latency": 0.08}
+    {"event": "progress", "pages": 120, "queued": 431, "in_flight": 10, "elapsed_seconds": 4.2}
+    {"event": "done", "status": "finished", "error": null, "pages": 500}
+    {"event": "truncated", "skipped": 2000}  events dropped from the replay buffer before the stream reached them
+A POST that accepts either is answered with the krawl's events rather than its status.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+
+from aiohttp import web
+
+from crawl_api.api import CrawlOptions, construct_orchestrator
+from crawl_scope.scope import InvalidScopeRuleException, parse_rule
+from crawl_service.scheduler import FairScheduler
+from http_transport.transport import SharedTransport, TimeoutConfiguration, TransportConfiguration
+from link_ripper.ripper import available_backends
+from orchestrator.orchestrator import Orchestrator
+
+RUNNING = "running"
+FINISHED = "finished"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+
+# CrawlOptions a request can set, and the json types each takes - None when it can be null
+_option_types = {
+    "host": (str,),
+    "subdomain": (str,),
+    "path": (str,),
+    "scheme": (str,),
+    "port": (int, None),
+    "recursion_limit": (int,),
+    "max_pages": (int, None),
+    "max_duration": (float, None),
+    "deadline": (float, None),
+    "max_page_size": (int, None),
+    "concurrency": (int,),
+    "rate_limit": (float,),
+    "burst": (int,),
+    "max_retries": (int,),
+    "respect_robots": (bool,),
+    "sitemap": (bool,),
+    "strip_query_params": (list,),
+    "ripper": (str,),
+    "capture_sources": (bool,),
+    "priority": (bool,),
+    "path_weights": (list,),
+    "seeds": (list,),
+    "allow": (list,),
+    "deny": (list,),
+}
+
+
+class CrawlServiceConfiguration:
+    def __init__(self, concurrency: int = 50, max_connections: int = 200, max_connections_per_host: int = 10,
+                 max_jobs: int = 100, finished_jobs: int = 100, progress_interval: float = 1.0,
+                 timeouts: TimeoutConfiguration = None, replay_events: int = 10000):
+        # pages fetched at once across every krawl - a krawl's own concurrency caps its share
+        self.concurrency = concurrency
+        # the shared connection pool, 0 removes a limit
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        # every krawl's requests go through the shared transport, so are bound by the same timeouts
+        self.timeouts = timeouts
+        # krawls running at once, more are turned away with 503
+        self.max_jobs = max_jobs
+        # finished krawls kept for their status and events, the oldest are dropped first
+        self.finished_jobs = finished_jobs
+        # seconds between progress events in a stream
+        self.progress_interval = progress_interval
+        # events kept per krawl for streams opened later, the oldest are dropped first - page events carry every link
+        # on the page, so this bounds the memory each krawl (and each finished krawl) holds on to
+        self.replay_events = replay_events
+
+
+class InvalidCrawlRequestException(Exception):
+    pass
+
+
+def is_type(value, types: tuple) -> bool:
+    if value is None:
+        return None in types
+    # json has no separate bool, and true shouldn't pass as 1
+    if isinstance(value, bool):
+        return bool in types
+    if isinstance(value, int):
+        return int in types or float in types
+    return any(isinstance(value, json_type) for json_type in types if json_type is not None)
+
+
+def parse_options(body: dict) -> tuple[CrawlOptions, str | None]:
+    """
+    CrawlOptions and the tenant from a request body. Takes the host, or the domain and extension as in the original
+    design i.e. {"subdomain": "www", "domain": "example-domain", "extension": ".co.uk"}.
+    """
+    if not isinstance(body, dict):
+        raise InvalidCrawlRequestException("expected a json object")
+
+    body = dict(body)
+    tenant = body.pop("tenant", None)
+    if tenant is not None and not isinstance(tenant, str):
+        raise InvalidCrawlRequestException("tenant: expected a string")
+
+    if "domain" in body and "host" not in body:
+        domain, extension = body.pop("domain"), body.pop("extension", "")
+        if not isinstance(domain, str) or not isinstance(extension, str):
+            raise InvalidCrawlRequestException("domain, extension: expected strings")
+        body["host"] = domain + extension
+
+    for name, value in body.items():
+        if name not in _option_types:
+            raise InvalidCrawlRequestException(f"unknown option: {name}")
+        if not is_type(value, _option_types[name]):
+            raise InvalidCrawlRequestException(f"{name}: unexpected value {value!r}")
+
+    if not body.get("host"):
+        raise InvalidCrawlRequestException("host is required")
+    if body.get("scheme", "http") not in ("http", "https"):
+        raise InvalidCrawlRequestException("scheme: expected http or https")
+    if body.get("ripper", "regex") not in available_backends():
+        raise InvalidCrawlRequestException(f"ripper: expected one of {', '.join(available_backends())}")
+    if body.get("concurrency", 1) < 1:
+        raise InvalidCrawlRequestException("concurrency: expected at least 1")
+
+    try:
+        if "path_weights" in body:
+            body["path_weights"] = [(str(pattern), float(weight)) for pattern, weight in body["path_weights"]]
+    except (TypeError, ValueError):
+        raise InvalidCrawlRequestException("path_weights: expected [[pattern, weight], ...]")
+
+    for name in ("seeds", "allow", "deny"):
+        if not all(isinstance(value, str) for value in body.get(name, [])):
+            raise InvalidCrawlRequestException(f"{name}: expected a list of strings")
+    for name in ("allow", "deny"):
+        for rule in body.get(name, []):
+            try:
+                parse_rule(rule)
+            except InvalidScopeRuleException as error:
+                raise InvalidCrawlRequestException(f"{name}: {error}")
+
+    return CrawlOptions(**body), tenant
+
+
+class CrawlJob:
+    """
+    A krawl run by the service. The latest events are kept, so a stream opened at any point starts from the oldest
+    one still kept - the links found are held here rather than by the orchestrator, which is dropped once the krawl ends.
+    """
+    def __init__(self, job_id: str, tenant: str, options: CrawlOptions, replay_events: int = None):
+        self.id = job_id
+        self.tenant = tenant
+        self.options = options
+        # set by the service - the krawl's pages are published to this job by the orchestrator's hooks
+        self.orchestrator: Orchestrator | None = None
+        self.task: asyncio.Task | None = None
+
+        self.status = RUNNING
+        self.error: str | None = None
+        self.created = time.time()
+        self.finished: float | None = None
+        # the orchestrator's metrics once the krawl has ended
+        self.stats: dict | None = None
+
+        self.events: deque[dict] = deque(maxlen=replay_events)
+        # events ever published - events[0] is event number published - len(events)
+        self.published = 0
+        # set and replaced each time an event is published, streams wait on it
+        self.updated = asyncio.Event()
+
+    def done(self) -> bool:
+        return self.status != RUNNING
+
+    def first_event(self) -> int:
+        return self.published - len(self.events)
+
+    def publish(self, event: dict):
+        self.events.append(event)
+        self.published += 1
+        self.updated.set()
+        self.updated = asyncio.Event()
+
+    async def publish_page(self, link: str, contained_links: list, metadata: dict):
+        self.publish({"event": "page", "url": link, "links": contained_links, **metadata})
+
+    def end(self, status: str, error: str = None):
+        self.status = status
+        self.error = error
+        self.finished = time.time()
+        self.stats = self.orchestrator.metrics.snapshot()
+        self.orchestrator = None
+        self.publish({"event": "done", "status": status, "error": error, "pages": self.stats["counters"].get("pages", 0)})
+
+    def progress(self) -> dict:
+        if self.orchestrator is None:
+            return {"pages": self.stats["counters"].get("pages", 0), "queued": 0, "in_flight": 0,
+                    "elapsed_seconds": self.stats["elapsed_seconds"]}
+
+        metrics = self.orchestrator.metrics
+        frontier = self.orchestrator.frontier
+        return {
+            "pages": metrics.counters["pages"],
+            "queued": frontier.depth() if frontier is not None else 0,
+            "in_flight": self.orchestrator.in_flight,
+            "elapsed_seconds": metrics.elapsed(),
+        }
+
+    def describe(self, stats: bool = False) -> dict:
+        description = {
+            "id": self.id,
+            "tenant": self.tenant,
+            "status": self.status,
+            "base_link": self.options.base_link(),
+            "created": self.created,
+            "finished": self.finished,
+            "error": self.error,
+            **self.progress(),
+        }
+        if stats:
+            description["stats"] = self.stats if self.stats is not None else self.orchestrator.metrics.snapshot()
+        return description
+
+
+class CrawlService:
+    def __init__(self, config: CrawlServiceConfiguration = None):
+        self.config = config if config is not None else CrawlServiceConfiguration()
+        # opened with the app and closed once every krawl has been cancelled
+        self.transport = SharedTransport(TransportConfiguration(self.config.max_connections, self.config.max_connections_per_host,
+                                                                timeouts=self.config.timeouts))
+        self.scheduler = FairScheduler(self.config.concurrency)
+        # oldest first
+        self.jobs: dict[str, CrawlJob] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/krawler/crawl", self.post_crawl)
+        app.router.add_get("/krawler/crawl", self.get_crawls)
+        app.router.add_get("/krawler/crawl/{id}", self.get_crawl)
+        app.router.add_get("/krawler/crawl/{id}/events", self.get_events)
+        app.router.add_delete("/krawler/crawl/{id}", self.delete_crawl)
+        app.on_startup.append(self.open)
+        app.on_cleanup.append(self.close)
+        return app
+
+    async def open(self, _=None):
+        await self.transport.open()
+
+    async def close(self, _=None):
+        await asyncio.gather(*(self.cancel_job(job) for job in list(self.jobs.values())))
+        await self.transport.close()
+
+    def running_jobs(self) -> int:
+        return sum(1 for job in self.jobs.values() if not job.done())
+
+    def start_job(self, options: CrawlOptions, tenant: str = None) -> CrawlJob:
+        job_id = uuid.uuid4().hex
+        # without a tenant each krawl gets its own share
+        tenant = tenant if tenant is not None else job_id
+        # a krawl never has more workers than there are slots to go round
+        options.concurrency = min(options.concurrency, self.config.concurrency)
+
+        job = CrawlJob(job_id, tenant, options, self.config.replay_events)
+        job.orchestrator = construct_orchestrator(options, [job.publish_page], keep_page_links=False,
+                                                  transport=self.transport, fetch_slots=self.scheduler.share(tenant))
+
+        self.jobs[job_id] = job
+        job.task = asyncio.create_task(self.run_job(job))
+        return job
+
+    async def run_job(self, job: CrawlJob):
+        try:
+            await job.orchestrator.crawl(job.options.base_link())
+        except asyncio.CancelledError:
+            job.end(CANCELLED)
+        except Exception as e:
+            job.end(FAILED, f"{type(e).__name__}: {e}")
+        else:
+            job.end(FINISHED)
+        finally:
+            self.drop_finished_jobs()
+
+    async def cancel_job(self, job: CrawlJob):
+        if job.done():
+            return
+
+        job.task.cancel()
+        await asyncio.gather(job.task, return_exceptions=True)
+
+        # cancelled before it started, so it never got to end itself
+        if not job.done():
+            job.end(CANCELLED)
+
+    def drop_finished_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done()]
+        for job_id in finished[:max(0, len(finished) - self.config.finished_jobs)]:
+            del self.jobs[job_id]
+
+    def find_job(self, request: web.Request) -> CrawlJob:
+        job = self.jobs.get(request.match_info["id"])
+        if job is None:
+            raise web.HTTPNotFound(text=json.dumps({"error": "no such krawl"}), content_type="application/json")
+        return job
+
+    async def post_crawl(self, request: web.Request) -> web.StreamResponse:
+        try:
+            options, tenant = parse_options(await request.json())
+        except (ValueError, InvalidCrawlRequestException) as e:
+            return web.json_response({"error": str(e) or "invalid json"}, status=400)
+
+        if self.running_jobs() >= self.config.max_jobs:
+            return web.json_response({"error": "too many krawls running"}, status=503)
+
+        job = self.start_job(options, tenant)
+
+        accept = request.headers.get("Accept", "")
+        if NDJSON in accept or SSE in accept:
+            return await self.stream_events(request, job)
+
+        return web.json_response(job.describe(), status=202, headers={"Location": f"/krawler/crawl/{job.id}"})
+
+    async def get_crawls(self, _: web.Request) -> web.Response:
+        return web.json_response({"jobs": [job.describe() for job in self.jobs.values()], "scheduler": self.scheduler.stats()})
+
+    async def get_crawl(self, request: web.Request) -> web.Response:
+        return web.json_response(self.find_job(request).describe(stats=True))
+
+    async def get_events(self, request: web.Request) -> web.StreamResponse:
+        return await self.stream_events(request, self.find_job(request))
+
+    async def delete_crawl(self, request: web.Request) -> web.Response:
+        job = self.find_job(request)
+        await self.cancel_job(job)
+
+        return web.json_response(job.describe())
+
+    async def stream_events(self, request: web.Request, job: CrawlJob) -> web.StreamResponse:
+        sse = SSE in request.headers.get("Accept", "")
+        response = web.StreamResponse(headers={"Content-Type": SSE if sse else NDJSON, "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(event: dict):
+            data = json.dumps(event)
+            await response.write(f"event: {event['event']}\ndata: {data}\n\n".encode() if sse else data.encode() + b"\n")
+
+        sent = 0
+        next_progress = time.monotonic() + self.config.progress_interval
+
+        while True:
+            # everything published while writing is picked up before waiting again
+            if sent < job.first_event():
+                # dropped before this stream got to them
+                await send({"event": "truncated", "skipped": job.first_event() - sent})
+                sent = job.first_event()
+
+            while sent < job.published:
+                await send(job.events[sent - job.first_event()])
+                sent += 1
+
+            if job.done():
+                break
+
+            if time.monotonic() >= next_progress:
+                await send({"event": "progress", **job.progress()})
+                next_progress = time.monotonic() + self.config.progress_interval
+
+            try:
+                await asyncio.wait_for(job.updated.wait(), max(0.0, next_progress - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+        await response.write_eof()
+        return response
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Krawler crawl service")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Pages fetched at once across every krawl, shared fairly between tenants (default: 50)")
+    parser.add_argument("--max-connections", type=int, default=200, help="Connections open at once across every krawl, 0 for no limit (default: 200)")
+    parser.add_argument("--max-connections-per-host", type=int, default=10, help="Connections open at once to one host, 0 for no limit (default: 10)")
+    parser.add_argument("--max-jobs", type=int, default=100, help="Krawls running at once (default: 100)")
+    parser.add_argument("--finished-jobs", type=int, default=100, help="Finished krawls kept for their status and events (default: 100)")
+    parser.add_argument("--replay-events", type=int, default=10000, help="Latest events kept per krawl for streams opened later (default: 10000)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = CrawlServiceConfiguration(args.concurrency, args.max_connections, args.max_connections_per_host,
+                                       args.max_jobs, args.finished_jobs, replay_events=args.replay_events)
+    web.run_app(CrawlService(config).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
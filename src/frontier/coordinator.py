@@ -0,0 +1,209 @@
+"""
+Frontier coordinator - one shared frontier that several krawler nodes pull links from and dedup against
+
+Usage (from src):
+    python -m frontier.coordinator [--host 0.0.0.0] [--port 8765] [--visited exact|fingerprint|bloom]
+
+Nodes connect with `krawler.py --coordinator HOST:PORT`. Requests and responses are json lines, tagged with an id
+so a node's workers can share one connection:
+    {"id": 1, "op": "add", "links": [...], "depth": 2}  ->  {"id": 1, "queued": [...]}
+    {"id": 2, "op": "get"}                              ->  {"id": 2, "link": "...", "depth": 2} (link is null once finished)
+    {"id": 3, "op": "done", "link": "..."}              ->  {"id": 3}
+    {"id": 4, "op": "abandon", "link": "...", "depth": 2}  ->  {"id": 4} (queued again for any node)
+    mark_seen (links), hold and release                 ->  {"id": ...}
+
+Links handed to a node are leased to its connection - if the node goes away before finishing them they are queued
+again for the other nodes, and any holds it had are released.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+
+from frontier.frontier import Frontier, MemoryFrontier
+from visited_set.visited import BLOOM, EXACT, FINGERPRINT, VisitedSetConfiguration
+
+_default_port = 8765
+# a batch of links found on a large page can make for a long line
+_stream_limit = 64 * 1024 * 1024
+
+
+class CoordinatorConnectionException(Exception):
+    pass
+
+
+class FrontierCoordinator:
+    def __init__(self, host: str = "127.0.0.1", port: int = _default_port, visited_config: VisitedSetConfiguration = None):
+        self.host = host
+        self.port = port
+        self.frontier = MemoryFrontier(visited_config)
+        self.server: asyncio.Server | None = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve_node, self.host, self.port, limit=_stream_limit)
+        # port 0 picks a free port
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def serve_node(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # links handed to this node and not yet done, and how many holds it has
+        leases: dict[str, int] = {}
+        holds = [0]
+        requests = set()
+
+        try:
+            while line := await reader.readline():
+                # gets block until there is work, so every request is handled in its own task
+                request = asyncio.create_task(self.handle_request(json.loads(line), writer, leases, holds))
+                requests.add(request)
+                request.add_done_callback(requests.discard)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            for request in requests:
+                request.cancel()
+            await asyncio.gather(*requests, return_exceptions=True)
+
+            for link, depth in leases.items():
+                await self.frontier.abandon(link, depth)
+            for _ in range(holds[0]):
+                await self.frontier.release()
+
+            writer.close()
+
+    async def handle_request(self, request: dict, writer: asyncio.StreamWriter, leases: dict, holds: list):
+        response = {"id": request.get("id")}
+        op = request.get("op")
+
+        if op == "add":
+            response["queued"] = await self.frontier.add(request["links"], request["depth"])
+        elif op == "mark_seen":
+            await self.frontier.mark_seen(request["links"])
+        elif op == "get":
+            item = await self.frontier.get()
+            if item is not None:
+                leases[item[0]] = item[1]
+            response["link"], response["depth"] = item if item is not None else (None, None)
+        elif op == "done":
+            if leases.pop(request["link"], None) is not None:
+                await self.frontier.done(request["link"])
+        elif op == "abandon":
+            if leases.pop(request["link"], None) is not None:
+                await self.frontier.abandon(request["link"], request["depth"])
+        elif op == "hold":
+            holds[0] += 1
+            await self.frontier.hold()
+        elif op == "release":
+            holds[0] -= 1
+            await self.frontier.release()
+        else:
+            response["error"] = f"unknown op: {op}"
+
+        writer.write(json.dumps(response).encode() + b"\n")
+
+
+class CoordinatorFrontier(Frontier):
+    """
+    Frontier held by a FrontierCoordinator - requests from every worker are multiplexed over one connection
+    """
+    def __init__(self, host: str, port: int = _default_port):
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.responses: dict[int, asyncio.Future] = {}
+        self.ids = itertools.count()
+        self.read_task: asyncio.Task | None = None
+
+    async def open(self):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=_stream_limit)
+            self.read_task = asyncio.create_task(self.read_responses())
+
+    async def close(self):
+        if self.writer is not None:
+            self.read_task.cancel()
+            self.writer.close()
+            self.writer = None
+
+    async def read_responses(self):
+        try:
+            while line := await self.reader.readline():
+                response = json.loads(line)
+                future = self.responses.pop(response["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            # the coordinator has gone - nothing waiting on it will ever be answered
+            for future in self.responses.values():
+                if not future.done():
+                    future.set_exception(CoordinatorConnectionException("lost connection to the frontier coordinator"))
+            self.responses.clear()
+
+    async def request(self, op: str, **fields) -> dict:
+        if self.writer is None or self.read_task.done():
+            raise CoordinatorConnectionException("not connected to the frontier coordinator")
+
+        request_id = next(self.ids)
+        future = self.responses[request_id] = asyncio.get_running_loop().create_future()
+
+        self.writer.write(json.dumps({"id": request_id, "op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+
+        response = await future
+        if "error" in response:
+            raise CoordinatorConnectionException(response["error"])
+
+        return response
+
+    async def add(self, links: list[str], depth: int, hints: dict = None) -> list[str]:
+        # the coordinator's frontier is breadth-first, so hints aren't sent
+        if not links:
+            return []
+        return (await self.request("add", links=links, depth=depth))["queued"]
+
+    async def mark_seen(self, links: list[str]):
+        if links:
+            await self.request("mark_seen", links=links)
+
+    async def get(self) -> tuple[str, int] | None:
+        response = await self.request("get")
+        return (response["link"], response["depth"]) if response["link"] is not None else None
+
+    async def done(self, link: str):
+        await self.request("done", link=link)
+
+    async def abandon(self, link: str, depth: int):
+        await self.request("abandon", link=link, depth=depth)
+
+    async def hold(self):
+        await self.request("hold")
+
+    async def release(self):
+        await self.request("release")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Krawler - frontier coordinator for distributed krawls")
+    parser.add_argument('--host', default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=_default_port, help=f"Port to listen on (default: {_default_port})")
+    parser.add_argument('--visited', choices=[EXACT, FINGERPRINT, BLOOM], default=EXACT, help="How seen links are remembered (default: exact)")
+    parser.add_argument('--bloom-error-rate', type=float, default=1e-6, help="False positive rate of --visited bloom (default: 1e-6)")
+    args = parser.parse_args()
+
+    visited_config = VisitedSetConfiguration(args.visited, error_rate=args.bloom_error_rate)
+    asyncio.run(FrontierCoordinator(args.host, args.port, visited_config).serve_forever())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import asyncio
+from abc import ABC, abstractmethod
+from collections import deque
+
+from visited_set.visited import VisitedSetConfiguration, construct_visited_set
+
+
+class FrontierConfiguration:
+    def __init__(self, coordinator_host: str = None, coordinator_port: int = None, scorers: list = None):
+        # address of a frontier coordinator shared with other krawler nodes, None keeps the frontier in memory
+        self.coordinator_host = coordinator_host
+        self.coordinator_port = coordinator_port
+        # in memory frontiers only - links are crawled highest score first rather than in the order they were found
+        # see frontier.priority, None (or empty) crawls breadth-first
+        self.scorers = scorers
+
+
+class Frontier(ABC):
+    """
+    The links waiting to be crawled and the set of links already seen, shared by every worker of a crawl.
+    Links are only queued the first time they are added, so the frontier is the crawl's dedup authority.
+
+    Every link handed out by `get` is in flight until `done` (or `abandon`) is called for it. The crawl is finished once nothing
+    is queued, in flight or held - `get` then returns None to every waiting worker. `hold` stops the crawl from
+    finishing while links are still being added from outside a worker i.e. by sitemap seeding.
+    """
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def add(self, links: list[str], depth: int, hints: dict = None) -> list[str]:
+        """
+        Args:
+            links: links found on a page at depth - 1, or seeds
+            depth: the depth the links are crawled at
+            hints: sitemap entries by link, used by scoring frontiers to order the crawl
+
+        Returns:
+            the links that were queued, links that have been seen before are dropped
+        """
+        pass
+
+    @abstractmethod
+    async def mark_seen(self, links: list[str]):
+        # links that must never be queued i.e. the finished pages of a resumed crawl
+        pass
+
+    @abstractmethod
+    async def get(self) -> tuple[str, int] | None:
+        pass
+
+    @abstractmethod
+    async def done(self, link: str):
+        pass
+
+    @abstractmethod
+    async def abandon(self, link: str, depth: int):
+        # a link handed out by `get` that won't be processed i.e. the budget ran out - queued again rather than done
+        pass
+
+    @abstractmethod
+    async def hold(self):
+        pass
+
+    @abstractmethod
+    async def release(self):
+        pass
+
+    def depth(self) -> int | None:
+        # links waiting to be crawled, None when the queue isn't held by this process
+        return None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+
+class MemoryFrontier(Frontier):
+    """
+    Frontier for a single process - a FIFO queue, which keeps the crawl breadth-first, and a visited set
+    """
+    def __init__(self, visited_config: VisitedSetConfiguration = None):
+        self.queue: deque[tuple[str, int]] = deque()
+        # every link ever queued or marked seen - hashed so the dedup check is constant time, compact modes don't keep the urls
+        self.seen = construct_visited_set(visited_config)
+        self.in_flight = 0
+        self.holds = 0
+        self.changed = asyncio.Condition()
+
+    def finished(self) -> bool:
+        return self.depth() == 0 and self.in_flight == 0 and self.holds == 0
+
+    def depth(self) -> int:
+        return len(self.queue)
+
+    def offer(self, link: str, depth: int, hint=None) -> bool:
+        # queues the link if it hasn't been seen before
+        if self.seen.add(link):
+            self.queue.append((link, depth))
+            return True
+        return False
+
+    def pop(self) -> tuple[str, int]:
+        return self.queue.popleft()
+
+    def push_back(self, link: str, depth: int):
+        # first in line again
+        self.queue.appendleft((link, depth))
+
+    async def add(self, links: list[str], depth: int, hints: dict = None) -> list[str]:
+        queued = []
+
+        for link in links:
+            if self.offer(link, depth, hints.get(link) if hints is not None else None):
+                queued.append(link)
+
+        if queued:
+            async with self.changed:
+                self.changed.notify(len(queued))
+
+        return queued
+
+    async def mark_seen(self, links: list[str]):
+        for link in links:
+            self.seen.add(link)
+
+    async def get(self) -> tuple[str, int] | None:
+        async with self.changed:
+            while True:
+                if self.depth():
+                    self.in_flight += 1
+                    return self.pop()
+
+                if self.finished():
+                    # wake every other waiting worker so they can see the crawl is over too
+                    self.changed.notify_all()
+                    return None
+
+                await self.changed.wait()
+
+    async def done(self, link: str):
+        self.in_flight -= 1
+        await self.notify_if_finished()
+
+    async def abandon(self, link: str, depth: int):
+        # a link that was handed out but won't be processed goes back to the front of the queue
+        self.in_flight -= 1
+        self.push_back(link, depth)
+
+        async with self.changed:
+            self.changed.notify()
+
+    async def hold(self):
+        self.holds += 1
+
+    async def release(self):
+        self.holds -= 1
+        await self.notify_if_finished()
+
+    async def notify_if_finished(self):
+        if self.finished():
+            async with self.changed:
+                self.changed.notify_all()
+
+
+def construct_frontier(config: FrontierConfiguration = None, visited_config: VisitedSetConfiguration = None) -> Frontier:
+    if config is not None and config.coordinator_host is not None:
+        # imported here - the coordinator is only needed by distributed crawls
+        from frontier.coordinator import CoordinatorFrontier
+        return CoordinatorFrontier(config.coordinator_host, config.coordinator_port)
+
+    if config is not None and config.scorers:
+        from frontier.priority import PriorityFrontier
+        return PriorityFrontier(config.scorers, visited_config)
+
+    return MemoryFrontier(visited_config)
@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import math
+import time
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+from urllib.parse import urlsplit
+
+from frontier.frontier import MemoryFrontier
+from sitemap.sitemap import SitemapEntry
+from visited_set.visited import VisitedSetConfiguration
+
+
+class Candidate:
+    """
+    A queued link and what is known about it so far
+    """
+    __slots__ = ("link", "depth", "hint", "inlinks", "sequence")
+
+    def __init__(self, link: str, depth: int, hint: SitemapEntry = None):
+        self.link = link
+        self.depth = depth
+        # the link's sitemap entry, if it was seeded from a sitemap
+        self.hint = hint
+        # pages found linking to it while it has been queued
+        self.inlinks = 1
+        # the heap entry that is current - older entries for the link are skipped
+        self.sequence = 0
+
+
+class DepthScorer:
+    # shallower first - on its own this is breadth-first
+    def __init__(self, weight: float = 1.0):
+        self.weight = weight
+
+    def score(self, candidate: Candidate) -> float:
+        return -self.weight * candidate.depth
+
+
+class InlinkScorer:
+    # pages linked to from many pages first - log scaled so a link from every page doesn't swamp everything else
+    def __init__(self, weight: float = 1.0):
+        self.weight = weight
+
+    def score(self, candidate: Candidate) -> float:
+        return self.weight * math.log2(1 + candidate.inlinks)
+
+
+class PathScorer:
+    """
+    Weights by url path, i.e. [("/blog/*", 2.0), ("/tag/*", -3.0)] - every matching glob pattern adds its weight
+    """
+    def __init__(self, patterns: list[tuple[str, float]]):
+        self.patterns = patterns
+
+    def score(self, candidate: Candidate) -> float:
+        path = urlsplit(candidate.link).path or "/"
+        return sum(weight for pattern, weight in self.patterns if fnmatchcase(path, pattern))
+
+
+class SitemapPriorityScorer:
+    # <priority> from the sitemap, relative to the protocol's default of 0.5 - links not in a sitemap score 0
+    def __init__(self, weight: float = 2.0):
+        self.weight = weight
+
+    def score(self, candidate: Candidate) -> float:
+        if candidate.hint is None or candidate.hint.priority is None:
+            return 0.0
+        return self.weight * (candidate.hint.priority - 0.5)
+
+
+def parse_lastmod(value: str) -> float | None:
+    # W3C datetime - a date, or a date and time with a timezone
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class FreshnessScorer:
+    # recently modified pages (by sitemap <lastmod>) first - the score halves every half_life_days
+    def __init__(self, weight: float = 1.0, half_life_days: float = 30.0):
+        self.weight = weight
+        self.half_life = half_life_days * 86400
+
+    def score(self, candidate: Candidate) -> float:
+        if candidate.hint is None or candidate.hint.lastmod is None:
+            return 0.0
+
+        modified = parse_lastmod(candidate.hint.lastmod)
+        if modified is None:
+            return 0.0
+
+        age = max(0.0, time.time() - modified)
+        return self.weight * 0.5 ** (age / self.half_life)
+
+
+class ChangedPageScorer:
+    # pages that changed when the baseline of an incremental krawl was krawled first - they are the likeliest to have changed again
+    def __init__(self, changed_links: set[str], weight: float = 2.0):
+        self.changed_links = changed_links
+        self.weight = weight
+
+    def score(self, candidate: Candidate) -> float:
+        return self.weight if candidate.link in self.changed_links else 0.0
+
+
+def default_scorers(path_weights: list[tuple[str, float]] = None) -> list:
+    scorers = [DepthScorer(), InlinkScorer(), SitemapPriorityScorer(), FreshnessScorer()]
+    if path_weights:
+        scorers.append(PathScorer(path_weights))
+    return scorers
+
+
+class PriorityFrontier(MemoryFrontier):
+    """
+    In memory frontier that hands out the highest scoring link first, links scoring the same are handed out in the
+    order they were queued. A score is the sum of the scorers' scores - anything with `score(candidate) -> float`.
+
+    A link's score is worked out when it is queued and again each time another page links to it while it waits, at the
+    shallowest depth it has been found at.
+    Rescored links are pushed onto the heap again and their old entries skipped when they come off it.
+    """
+    def __init__(self, scorers: list, visited_config: VisitedSetConfiguration = None):
+        super().__init__(visited_config)
+        self.scorers = scorers
+        self.heap: list[tuple[float, int, str]] = []
+        # links waiting to be crawled
+        self.candidates: dict[str, Candidate] = {}
+        self.sequence = itertools.count()
+
+    def depth(self) -> int:
+        return len(self.candidates)
+
+    def score(self, candidate: Candidate) -> float:
+        return sum(scorer.score(candidate) for scorer in self.scorers)
+
+    def push(self, candidate: Candidate):
+        candidate.sequence = next(self.sequence)
+        # heapq is a min heap
+        heapq.heappush(self.heap, (-self.score(candidate), candidate.sequence, candidate.link))
+
+        # rescoring leaves old entries behind - rebuilt once they outnumber the live ones, so the heap stays in
+        # proportion to the queue on sites where every page links to every other
+        if len(self.heap) > 4 * len(self.candidates) + 1024:
+            self.heap = [entry for entry in self.heap if self.candidates.get(entry[2]) is not None and self.candidates[entry[2]].sequence == entry[1]]
+            heapq.heapify(self.heap)
+
+    def offer(self, link: str, depth: int, hint: SitemapEntry = None) -> bool:
+        if self.seen.add(link):
+            candidate = self.candidates[link] = Candidate(link, depth, hint)
+            self.push(candidate)
+            return True
+
+        candidate = self.candidates.get(link)
+        if candidate is not None:
+            # still waiting - one more page links to it, or it has turned up in a sitemap
+            if hint is not None:
+                candidate.hint = hint
+            else:
+                candidate.inlinks += 1
+            # links aren't handed out breadth first, so a shallower page can find a link after a deeper one did - the
+            # shallowest depth is kept so the recursion limit doesn't cut off a page that is within it
+            candidate.depth = min(candidate.depth, depth)
+            self.push(candidate)
+
+        return False
+
+    def pop(self) -> tuple[str, int]:
+        while True:
+            _, sequence, link = heapq.heappop(self.heap)
+            candidate = self.candidates.get(link)
+
+            if candidate is not None and candidate.sequence == sequence:
+                del self.candidates[link]
+                return link, candidate.depth
+
+    def push_back(self, link: str, depth: int):
+        candidate = self.candidates[link] = Candidate(link, depth)
+        self.push(candidate)
@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+
+
+class HttpCacheConfiguration:
+    def __init__(self, directory: str, compression_level: int = 6):
+        self.directory = directory
+        self.compression_level = compression_level
+
+
+class CacheEntry:
+    def __init__(self, url: str, etag: str = None, last_modified: str = None, links: list = None, fetched_at: float = None):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        # canonical links found on the page when it was last fetched
+        self.links = links if links is not None else []
+        self.fetched_at = fetched_at
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "links": self.links,
+            "fetched_at": self.fetched_at,
+        }
+
+
+class HttpCache:
+    """
+    On-disk page cache keyed by canonical url.
+    Each page is stored as a small json file (validators + ripped links) and a gzipped copy of the body:
+        <directory>/<first 2 hex of key>/<key>.json
+        <directory>/<first 2 hex of key>/<key>.html.gz
+    Only pages that came with an ETag or Last-Modified header are worth storing, as those are the only ones that
+    can be revalidated with a conditional request.
+    File access runs in a thread so the event loop isn't blocked on disk.
+    """
+    def __init__(self, config: HttpCacheConfiguration):
+        self.directory = config.directory
+        self.compression_level = config.compression_level
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, url: str, extension: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}{extension}")
+
+    def get(self, url: str) -> CacheEntry | None:
+        try:
+            with open(self.path(url, ".json"), "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            # missing or half written entries are a cache miss
+            return None
+
+        if entry.get("url") != url:
+            return None
+
+        return CacheEntry(entry["url"], entry.get("etag"), entry.get("last_modified"), entry.get("links"), entry.get("fetched_at"))
+
+    def put(self, entry: CacheEntry, body: bytes = None):
+        meta_path = self.path(entry.url, ".json")
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        # the body is written before the entry that points at it, both are swapped in atomically
+        if body is not None:
+            body_path = self.path(entry.url, ".html.gz")
+            write_atomically(body_path, gzip.compress(body, self.compression_level))
+
+        write_atomically(meta_path, json.dumps(entry.to_dict()).encode("utf-8"))
+
+    def get_body(self, url: str) -> bytes | None:
+        try:
+            with open(self.path(url, ".html.gz"), "rb") as file:
+                return gzip.decompress(file.read())
+        except (OSError, EOFError, gzip.BadGzipFile):
+            return None
+
+    async def load(self, url: str) -> CacheEntry | None:
+        return await asyncio.to_thread(self.get, url)
+
+    async def store(self, url: str, etag: str, last_modified: str, links: list, body: bytes = None):
+        entry = CacheEntry(url, etag, last_modified, links, time.time())
+        await asyncio.to_thread(self.put, entry, body)
+
+
+def write_atomically(path: str, content: bytes):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(temporary_path, "wb") as file:
+        file.write(content)
+
+    os.replace(temporary_path, path)
+
+
+def construct_http_cache(config: HttpCacheConfiguration) -> HttpCache:
+    return HttpCache(config)
@@ -0,0 +1,130 @@
+import asyncio
+
+import aiohttp
+
+from crawl_metrics.metrics import construct_trace_config, current_metrics
+
+
+# which limit a request or page ran into, see TimeoutConfiguration
+CONNECT_TIMEOUT = "connect"
+FIRST_BYTE_TIMEOUT = "first_byte"
+READ_IDLE_TIMEOUT = "read_idle"
+TOTAL_TIMEOUT = "total"
+WATCHDOG_TIMEOUT = "watchdog"
+DEADLINE_TIMEOUT = "deadline"
+
+# sent with every request - robots.txt groups are chosen by its product token, see robots_txt.robots
+USER_AGENT = "Krawler/1.0"
+
+
+class TimeoutConfiguration:
+    def __init__(self, connect: float = 10.0, first_byte: float = 30.0, read_idle: float = 30.0, total: float = 120.0,
+                 watchdog: float = 300.0):
+        # seconds, None for no limit
+        # opening a connection (dns, tcp and tls) - not waiting for a free one in the pool
+        self.connect = connect
+        # a request being made to its response headers, including waiting for and opening a connection
+        self.first_byte = first_byte
+        # longest wait for the next bytes of a response - catches stalled streams the other limits would wait out
+        self.read_idle = read_idle
+        # a request being made to the end of its body - a page that trickles in (slow loris) can't hold a worker
+        # for longer than this. Each retry gets its own
+        self.total = total
+        # a worker taking longer than this over one page is cancelled whatever it is waiting for - retries,
+        # politeness waits, parsing. A backstop for the limits above, pages it cancels are failed
+        self.watchdog = watchdog
+
+    def client_timeout(self) -> aiohttp.ClientTimeout:
+        # first_byte and the watchdog are enforced by the page loader and the orchestrator
+        return aiohttp.ClientTimeout(total=self.total, sock_connect=self.connect, sock_read=self.read_idle)
+
+
+class TransportConfiguration:
+    def __init__(self, connection_limit: int = 100, connection_limit_per_host: int = 10, dns_cache_ttl: int = 300,
+                 timeouts: TimeoutConfiguration = None, user_agent: str = USER_AGENT):
+        # 0 removes the limit (aiohttp semantics)
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        # seconds a resolved host is kept for, None caches forever
+        self.dns_cache_ttl = dns_cache_ttl
+        # every request made through the transport is bound by these - pages, robots.txt and sitemaps
+        self.timeouts = timeouts if timeouts is not None else TimeoutConfiguration()
+        # the User-Agent header of every request, rather than aiohttp's own
+        self.user_agent = user_agent
+
+
+class TransportClosedException(Exception):
+    pass
+
+
+class Transport:
+    """
+    Crawl-scoped HTTP transport.
+    A single ClientSession + TCPConnector is shared by every PageLoader for the lifetime of a crawl so that
+    keep-alive connections, TLS sessions and resolved DNS entries are reused from page to page.
+    The session is created lazily by `open` because aiohttp needs a running event loop to build a connector.
+    """
+    def __init__(self, config: TransportConfiguration, trace_configs: list[aiohttp.TraceConfig] = None):
+        self.config = config
+        # request tracing i.e. dns / connect / ttfb timings for the crawl's metrics
+        self.trace_configs = trace_configs
+        self.session: aiohttp.ClientSession | None = None
+
+    async def open(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.connection_limit,
+                limit_per_host=self.config.connection_limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.config.dns_cache_ttl,
+            )
+            self.session = aiohttp.ClientSession(connector=connector, trace_configs=self.trace_configs,
+                                                 timeout=self.config.timeouts.client_timeout(),
+                                                 headers={"User-Agent": self.config.user_agent})
+
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            raise TransportClosedException
+        return self.session
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+
+def timeout_kind(error: BaseException) -> str | None:
+    # which of the session's limits a failed request ran into, None when it didn't time out
+    if isinstance(error, aiohttp.ConnectionTimeoutError):
+        return CONNECT_TIMEOUT
+    if isinstance(error, aiohttp.ServerTimeoutError):
+        return READ_IDLE_TIMEOUT
+    if isinstance(error, asyncio.TimeoutError):
+        return TOTAL_TIMEOUT
+    return None
+
+
+class SharedTransport(Transport):
+    """
+    One transport for many crawls running at once i.e. the crawl service - every crawl shares its connection pool
+    and dns cache, the limits are for all of them together. Crawls open it but leave it open as they finish,
+    its owner closes it with close(). Requests are traced to the metrics of the crawl that makes them.
+    """
+    def __init__(self, config: TransportConfiguration):
+        super().__init__(config, [construct_trace_config(current_metrics.get)])
+
+    async def __aexit__(self, *_):
+        pass
+
+
+def construct_transport(config: TransportConfiguration, trace_configs: list[aiohttp.TraceConfig] = None) -> Transport:
+    return Transport(config, trace_configs)
@@ -1,45 +1,210 @@
-import math
-from typing import Callable
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+# handed to a waiter in place of an instance - an instance was dropped, so the waiter may construct a new one
+_free_slot = object()
+
+
+class PoolerConfiguration:
+    def __init__(self, max_size: int = None, idle_timeout: float = 30.0, health_check: Callable[[object], bool] = None,
+                 close_instance: Callable[[object], None] = None):
+        # instances that exist at once, in use or free - acquiring waits once they are all in use, None never waits
+        self.max_size = max_size
+        # seconds a free instance is kept before it is dropped, None keeps free instances forever
+        self.idle_timeout = idle_timeout
+        # called with each returned instance, instances it fails are dropped rather than reused
+        self.health_check = health_check
+        # called with each instance the pool drops - idle, unhealthy or the pool closing
+        self.close_instance = close_instance
+
 
 class Pooler:
-    def __init__(self, instance_constructor: Callable, instance_configuration: dict = {}):
+    """
+    Bounded pool of instances made by instance_constructor(instance_configuration), shared by the workers of a crawl.
+
+    `async with pool.acquire() as instance:` takes a free instance, constructs one while there are fewer than
+    max_size, and otherwise waits. Waiters are served in the order they arrived - a returned instance is handed
+    straight to the longest waiter, so a newcomer can't take it first. The most recently returned instance is reused
+    first (it is the warmest) and instances left free for longer than idle_timeout are dropped as the pool is used.
+    """
+    def __init__(self, instance_constructor: Callable, instance_configuration: dict = {}, config: PoolerConfiguration = None):
         self.instance_constructor = instance_constructor
         self.instance_configuration = instance_configuration
 
-        self.free_instances = []
+        config = config if config is not None else PoolerConfiguration()
+        self.max_size = config.max_size
+        self.idle_timeout = config.idle_timeout
+        self.health_check = config.health_check
+        self.close_instance = config.close_instance
+
+        # (instance, time it was returned) - oldest on the left
+        self.free_instances: deque[tuple[object, float]] = deque()
+        # instances that exist, free or in use
         self.instance_count = 0
+        self.in_use = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.closed = False
 
-    """
-    Fetches a free instance from the pool - new instances are created ad-hoc
-    """
-    def get_instance_from_pool(self):
+        # usage
+        self.created = 0
+        self.dropped = 0
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
 
-        # if no free instances: create new instance - add to loaned pool - return
-        if len(self.free_instances) == 0:
-            instance = self.instance_constructor(self.instance_configuration)
+    def create_instance(self, reserved: bool = False):
+        # a waiter handed a free slot has had the new instance counted already, so nobody else can take its place
+        if not reserved:
             self.instance_count += 1
-            return instance
 
-        # otherwise, pull instance from pool
-        return self.free_instances.pop()
-    
-    """
-    Returns to instance to the free instance pool, triggers a pool reduction if more than half of the instances are free
-    """
-    def return_instance_to_pool(self, instance: object):
-        self.free_instances.append(instance)
+        try:
+            instance = self.instance_constructor(self.instance_configuration)
+        except Exception:
+            self.instance_count -= 1
+            raise
 
-        if len(self.free_instances) > math.ceil(self.instance_count / 2):
-            self.reduce_instance_pool()
+        self.created += 1
+        self.in_use += 1
+        return instance
 
-    """
-    Removes half of the free instances (roughly quarter of all instances)
-    """
-    def reduce_instance_pool(self):
-        remove_count = math.floor(self.instance_count / 2)
+    def drop_instance(self, instance: object):
+        self.instance_count -= 1
+        self.dropped += 1
+
+        if self.close_instance is not None:
+            self.close_instance(instance)
+
+    def drop_idle_instances(self):
+        if self.idle_timeout is None:
+            return
+
+        expired = time.monotonic() - self.idle_timeout
+        while self.free_instances and self.free_instances[0][1] < expired:
+            instance, _ = self.free_instances.popleft()
+            self.drop_instance(instance)
+
+    def has_capacity(self) -> bool:
+        return self.max_size is None or self.instance_count < self.max_size
+
+    async def get_instance(self):
+        """
+        Takes an instance from the pool, waiting while the pool is at max_size and every instance is in use.
+        Every instance taken must be given back with return_instance - acquire does both.
+        """
+        if self.closed:
+            raise RuntimeError("the pool is closed")
+
+        self.acquired += 1
+        self.drop_idle_instances()
+
+        # with anyone waiting, newcomers queue behind them
+        if not self.waiters:
+            if self.free_instances:
+                instance, _ = self.free_instances.pop()
+                self.in_use += 1
+                return instance
+
+            if self.has_capacity():
+                return self.create_instance()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.waited += 1
+        started = time.monotonic()
+
+        try:
+            instance = await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # handed something just as the wait was cancelled - pass it on to the next waiter
+                self.hand_on(waiter.result())
+            raise
+        finally:
+            self.wait_seconds += time.monotonic() - started
+            # still queued when the wait was cancelled - newcomers mustn't queue behind it
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+        if instance is _free_slot:
+            return self.create_instance(reserved=True)
+        return instance
+
+    def hand_on(self, instance: object):
+        # an instance (counted in use) or a free slot a waiter took but won't use
+        if instance is _free_slot:
+            self.instance_count -= 1
+            self.wake_free_slot()
+        else:
+            self.return_instance(instance)
+
+    def wake_free_slot(self):
+        # reserved before the waiter runs, so the pool can't go over max_size in the meantime
+        self.instance_count += 1
+        if not self.wake_waiter(_free_slot):
+            self.instance_count -= 1
+
+    def wake_waiter(self, instance: object) -> bool:
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(instance)
+                return True
+
+        return False
+
+    def return_instance(self, instance: object):
+        self.in_use -= 1
+
+        if self.closed or (self.health_check is not None and not self.health_check(instance)):
+            self.drop_instance(instance)
+            # there is room for another instance now
+            if not self.closed:
+                self.wake_free_slot()
+            return
+
+        if self.wake_waiter(instance):
+            self.in_use += 1
+            return
+
+        self.free_instances.append((instance, time.monotonic()))
+        self.drop_idle_instances()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[object]:
+        instance = await self.get_instance()
+        try:
+            yield instance
+        finally:
+            self.return_instance(instance)
+
+    def close(self):
+        """
+        Drops every free instance, instances in use are dropped as they are returned
+        """
+        self.closed = True
+
+        while self.free_instances:
+            instance, _ = self.free_instances.popleft()
+            self.drop_instance(instance)
 
-        for _ in range(0,remove_count):
-            self.free_instances.pop()
-            
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_exception(RuntimeError("the pool is closed"))
+        self.waiters.clear()
 
-    
\ No newline at end of file
+    def stats(self) -> dict:
+        return {
+            "size": self.instance_count,
+            "in_use": self.in_use,
+            "free": len(self.free_instances),
+            "waiting": len(self.waiters),
+            "max_size": self.max_size,
+            "created": self.created,
+            "dropped": self.dropped,
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "wait_seconds": self.wait_seconds,
+        }
@@ -1,6 +1,40 @@
 import argparse
+import os
 
-from orchestrator.orchestrator import Orchestrator
+from content_filter.filter import ContentFilterConfiguration
+from crawl_baseline.baseline import BaselineConfiguration
+from crawl_journal.journal import CrawlJournalConfiguration, journal_has_entries
+from crawl_metrics.metrics import MetricsConfiguration
+from crawl_scope.scope import InvalidScopeRuleException, ScopeConfiguration, parse_rule
+from frontier.frontier import FrontierConfiguration
+from frontier.priority import default_scorers
+from http_cache.cache import HttpCacheConfiguration
+from http_transport.transport import TimeoutConfiguration, TransportConfiguration
+from link_ripper.ripper import LinkRipperConfiguration, available_backends
+from orchestrator.orchestrator import CrawlBudgetConfiguration, Orchestrator
+from politeness.scheduler import PolitenessConfiguration
+from result_writer.writer import ResultWriterConfiguration, GRAPH, JSON, NDJSON
+from robots_txt.robots import RobotsConfiguration
+from sitemap.sitemap import SitemapConfiguration
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+from visited_set.visited import BLOOM, EXACT, FINGERPRINT, VisitedSetConfiguration
+
+
+def address(value: str) -> tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    if host == "" or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT, got {value}")
+    return host, int(port)
+
+
+def path_weight(value: str) -> tuple[str, float]:
+    pattern, _, weight = value.rpartition("=")
+    try:
+        if pattern == "":
+            raise ValueError()
+        return pattern, float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected PATTERN=WEIGHT, got {value}")
 
 
 def parse_args():
@@ -14,8 +48,7 @@ def parse_args():
 
     parser.add_argument(
         '-H', '--host',
-        required=True,
-        help="Root domain to crawl (e.g. example-domain.com)"
+        help="Root domain to crawl (e.g. example-domain.com), optional when --seed is given"
     )
 
     parser.add_argument(
@@ -24,6 +57,30 @@ def parse_args():
         help="Path to crawl on the host (default: /)"
     )
 
+    parser.add_argument(
+        '--seed',
+        action='append',
+        default=[],
+        metavar='LINK',
+        help="Another link to start the krawl from, its host is krawled too - can be given more than once (e.g. --seed blog.example-domain.com)"
+    )
+
+    parser.add_argument(
+        '--allow',
+        action='append',
+        default=[],
+        metavar='RULE',
+        help="Also krawl links matching RULE: host, .suffix (a domain and its subdomains), /path/ prefix, host/path/ prefix or re:PATTERN - can be given more than once"
+    )
+
+    parser.add_argument(
+        '--deny',
+        action='append',
+        default=[],
+        metavar='RULE',
+        help="Never krawl links matching RULE, same forms as --allow - can be given more than once"
+    )
+
     parser.add_argument(
         '-l', '--recursion-limit',
         type=int,
@@ -31,13 +88,366 @@ def parse_args():
         help="Maximum recursion depth (default: 5; use -1 for unlimited - this might make bad things happen)"
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        '--scheme',
+        default='http',
+        choices=['http', 'https'],
+        help="Scheme used for links that don't specify one, including the base link (default: http)"
+    )
+
+    parser.add_argument(
+        '--strip-query-param',
+        action='append',
+        default=[],
+        help="Query parameter to remove before links are compared, a trailing * matches a prefix i.e. 'utm_*' (repeatable)"
+    )
+
+    parser.add_argument(
+        '--ripper',
+        default='regex',
+        choices=available_backends(),
+        help="Backend used to rip links from pages (default: regex; lxml is available when installed)"
+    )
+
+    parser.add_argument(
+        '--capture-sources',
+        action='store_true',
+        help="Also collect src and srcset links (images, scripts, frames)"
+    )
+
+    parser.add_argument(
+        '--link-rel',
+        action='append',
+        default=None,
+        help="Only collect <link href> when its rel is one of these i.e. canonical (repeatable, default: every <link>)"
+    )
+
+    parser.add_argument(
+        '-c', '--concurrency',
+        type=int,
+        default=10,
+        help="Number of pages processed at the same time (default: 10)"
+    )
+
+    parser.add_argument(
+        '--rate-limit',
+        type=float,
+        default=10.0,
+        help="Maximum requests per second to a single host, slowed down automatically when the host throttles or struggles (default: 10; use 0 for unlimited)"
+    )
+
+    parser.add_argument(
+        '--burst',
+        type=int,
+        default=10,
+        help="Requests that can be made to a host back to back before the rate limit applies (default: 10)"
+    )
+
+    parser.add_argument(
+        '--max-retries',
+        type=int,
+        default=3,
+        help="Retries for throttled (429/503) and failed (5xx, connection error, timeout) requests (default: 3)"
+    )
+
+    parser.add_argument(
+        '--ignore-robots',
+        action='store_true',
+        help="Crawl pages disallowed by robots.txt and ignore its Crawl-delay"
+    )
+
+    parser.add_argument(
+        '--sitemap',
+        action='store_true',
+        help="Seed the krawl with the pages listed in the sitemaps named in robots.txt (or /sitemap.xml)"
+    )
+
+    parser.add_argument(
+        '--sitemap-url',
+        action='append',
+        help="Sitemap or sitemap index to seed the krawl from, implies --sitemap (repeatable)"
+    )
+
+    parser.add_argument(
+        '--allow-extension',
+        action='append',
+        help="Extension of links that are pages, on top of the defaults i.e. .xml (repeatable)"
+    )
+
+    parser.add_argument(
+        '--deny-extension',
+        action='append',
+        help="Extension of links that are never downloaded, on top of the defaults i.e. .cfm (repeatable)"
+    )
+
+    parser.add_argument(
+        '--head-probe',
+        action='store_true',
+        help="Check links with an unknown extension with a HEAD request before queueing them"
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help="Processes to parse pages in, fetching stays on the main process (default: 0, parse on the main process)"
+    )
+
+    parser.add_argument(
+        '--coordinator',
+        type=address,
+        help="HOST:PORT of a frontier coordinator (python -m frontier.coordinator) to share the krawl with other krawler nodes"
+    )
+
+    parser.add_argument(
+        '--visited',
+        choices=[EXACT, FINGERPRINT, BLOOM],
+        default=EXACT,
+        help="How seen links are remembered - fingerprint and bloom use far less memory and spill results to disk (default: exact)"
+    )
+
+    parser.add_argument(
+        '--bloom-error-rate',
+        type=float,
+        default=1e-6,
+        help="Chance that --visited bloom skips a link it hasn't seen (default: 1e-6)"
+    )
+
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=10,
+        help="Seconds between one line progress summaries on stderr (default: 10; use 0 to turn them off)"
+    )
+
+    parser.add_argument(
+        '--stats',
+        default=None,
+        help="File to write a json report of the krawl's counters and timings to once it finishes"
+    )
+
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help="Serve the krawl's metrics in the prometheus text format on http://127.0.0.1:PORT/metrics while it runs"
+    )
+
+    parser.add_argument(
+        '--priority',
+        action='store_true',
+        help="Krawl the most valuable links first - shallow, linked to from many pages, high sitemap priority, recently modified - rather than breadth first"
+    )
+
+    parser.add_argument(
+        '--path-weight',
+        type=path_weight,
+        action='append',
+        default=None,
+        help="PATTERN=WEIGHT added to the priority of links whose path matches the glob pattern i.e. '/blog/*=2', implies --priority (repeatable)"
+    )
+
+    parser.add_argument(
+        '--max-pages',
+        type=int,
+        default=None,
+        help="Stop the krawl once this many pages have been fetched (default: unlimited)"
+    )
+
+    parser.add_argument(
+        '--max-duration',
+        type=float,
+        default=None,
+        help="Stop the krawl after this many seconds, pages already being fetched are finished (default: unlimited)"
+    )
+
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=None,
+        help="Stop the krawl after this many seconds, pages still being fetched are cancelled (default: unlimited)"
+    )
+
+    parser.add_argument(
+        '--max-page-size',
+        type=int,
+        default=10 * 1024 * 1024,
+        help="Maximum bytes downloaded from a single page, links beyond this are ignored (default: 10485760; use -1 for unlimited)"
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        default=None,
+        help="File to write results to (default: timestamped krawl_*.json / krawl_*.ndjson / krawl_*.graph in the working directory)"
+    )
+
+    parser.add_argument(
+        '--output-format',
+        default=JSON,
+        choices=[JSON, NDJSON, GRAPH],
+        help="json writes one dict when the krawl finishes, ndjson streams one record per page as it completes, graph writes a compact binary link graph (default: json)"
+    )
+
+    parser.add_argument(
+        '--gzip',
+        action='store_true',
+        help="Gzip the output"
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help="Directory to cache pages in - cached pages are revalidated instead of re-downloaded on later krawls (default: no cache)"
+    )
+
+    parser.add_argument(
+        '--journal',
+        default=None,
+        help="File to record the krawl's progress in, so that it can be resumed with --resume if it stops (default: not recorded)"
+    )
+
+    parser.add_argument(
+        '--resume',
+        default=None,
+        help="Journal of an interrupted krawl to resume - finished pages are not fetched again"
+    )
+
+    parser.add_argument(
+        '--baseline',
+        default=None,
+        help="Output of an earlier krawl of the same site - unchanged pages aren't ripped again, pages that changed last time are krawled first and a diff is written"
+    )
+
+    parser.add_argument(
+        '--diff',
+        default=None,
+        help="File to write the pages and links added and removed since --baseline to (default: <output>.diff.json)"
+    )
+
+    parser.add_argument(
+        '--max-connections',
+        type=int,
+        default=100,
+        help="Maximum number of open connections across all hosts (default: 100; use 0 for unlimited)"
+    )
+
+    parser.add_argument(
+        '--max-connections-per-host',
+        type=int,
+        default=10,
+        help="Maximum number of open connections to a single host (default: 10; use 0 for unlimited)"
+    )
+
+    parser.add_argument(
+        '--dns-cache-ttl',
+        type=int,
+        default=300,
+        help="Seconds to cache resolved host addresses for (default: 300)"
+    )
+
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=10.0,
+        help="Seconds to open a connection (default: 10; use 0 for unlimited)"
+    )
+
+    parser.add_argument(
+        '--first-byte-timeout',
+        type=float,
+        default=30.0,
+        help="Seconds from making a request to its response headers (default: 30; use 0 for unlimited)"
+    )
+
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        default=30.0,
+        help="Seconds to wait for more of a response before giving it up as stalled (default: 30; use 0 for unlimited)"
+    )
+
+    parser.add_argument(
+        '--page-timeout',
+        type=float,
+        default=120.0,
+        help="Seconds to download a whole page, each retry gets its own (default: 120; use 0 for unlimited)"
+    )
+
+    parser.add_argument(
+        '--watchdog-timeout',
+        type=float,
+        default=300.0,
+        help="Seconds a worker may spend on one page, retries and waits included, before it is cancelled (default: 300; use 0 for unlimited)"
+    )
+
+    args = parser.parse_args()
+
+    if args.host is None and not args.seed:
+        parser.error("-H/--host: a host or at least one --seed is needed")
+    for option, rules in (("--allow", args.allow), ("--deny", args.deny)):
+        for rule in rules:
+            try:
+                parse_rule(rule)
+            except InvalidScopeRuleException as error:
+                parser.error(f"{option}: {error}")
+    if args.resume is not None and not os.path.isfile(args.resume):
+        parser.error(f"--resume: no journal found at {args.resume}")
+    if args.journal is not None and journal_has_entries(args.journal):
+        parser.error(f"--journal: {args.journal} already records a krawl, carry it on with --resume {args.journal} or choose another file")
+    if args.gzip and args.output_format == GRAPH:
+        parser.error("--gzip: graph outputs are memory mapped when read, so aren't compressed")
+    if args.baseline is not None and not os.path.isfile(args.baseline):
+        parser.error(f"--baseline: no krawl output found at {args.baseline}")
+    if args.baseline is not None and args.coordinator is not None:
+        parser.error("--baseline: each node only outputs part of the krawl, it can't be used with --coordinator")
+    if args.diff is not None and args.baseline is None:
+        parser.error("--diff: needs a --baseline to diff against")
+    if (args.priority or args.path_weight) and args.coordinator is not None:
+        parser.error("--priority: a shared frontier is krawled breadth first, it can't be used with --coordinator")
+
+    return args
 
 
 if __name__ == '__main__':
     args = parse_args()
 
-    orchestrator = Orchestrator(args.subdomain, args.host, args.recursion_limit)
+    # 0 turns a timeout off
+    timeouts = [timeout if timeout > 0 else None for timeout in
+                (args.connect_timeout, args.first_byte_timeout, args.read_timeout, args.page_timeout, args.watchdog_timeout)]
+    transport_config = TransportConfiguration(args.max_connections, args.max_connections_per_host, args.dns_cache_ttl,
+                                              TimeoutConfiguration(*timeouts))
+
+    max_page_size = args.max_page_size if args.max_page_size >= 0 else None
+    normaliser_config = UrlNormaliserConfiguration(default_scheme=args.scheme, strip_query_params=args.strip_query_param)
+    ripper_config = LinkRipperConfiguration(args.ripper, args.capture_sources, args.link_rel)
+    http_cache_config = HttpCacheConfiguration(args.cache_dir) if args.cache_dir is not None else None
+    journal_path = args.resume if args.resume is not None else args.journal
+    journal_config = CrawlJournalConfiguration(journal_path) if journal_path is not None else None
+    politeness_config = PolitenessConfiguration(args.rate_limit, args.burst, max_retries=args.max_retries)
+    robots_config = RobotsConfiguration() if not args.ignore_robots else None
+    sitemap_config = SitemapConfiguration(args.sitemap_url) if args.sitemap or args.sitemap_url else None
+    content_filter_config = ContentFilterConfiguration(args.allow_extension, args.deny_extension, head_probe=args.head_probe)
+    frontier_config = FrontierConfiguration(*args.coordinator) if args.coordinator is not None else None
+    if args.priority or args.path_weight:
+        frontier_config = FrontierConfiguration(scorers=default_scorers(args.path_weight))
+    budget_config = CrawlBudgetConfiguration(args.max_pages, args.max_duration, args.deadline)
+    baseline_config = BaselineConfiguration(args.baseline, args.diff) if args.baseline is not None else None
+    metrics_config = MetricsConfiguration(args.progress_interval, args.stats, args.metrics_port)
+    visited_config = VisitedSetConfiguration(args.visited, error_rate=args.bloom_error_rate) if args.visited != EXACT else None
+
+    # a resumed krawl adds to the records streamed by the interrupted one
+    writer_config = ResultWriterConfiguration(args.output, args.output_format, args.gzip, append=args.resume is not None)
+
+    scope_config = ScopeConfiguration(args.seed, args.allow, args.deny)
+
+    orchestrator = Orchestrator(args.subdomain, args.host or "", args.recursion_limit, transport_config, args.concurrency, max_page_size,
+                                normaliser_config, ripper_config, http_cache_config, journal_config,
+                                writer_config, politeness_config, robots_config, sitemap_config,
+                                content_filter_config, args.workers, frontier_config, visited_config, metrics_config,
+                                budget_config, baseline_config, scope_config=scope_config)
 
-    base_link = f"{args.subdomain}.{args.host}{args.path}"
+    # a krawl of seeds alone has no base link
+    base_link = None
+    if args.host is not None:
+        base_link = f"{args.subdomain}.{args.host}{args.path}" if args.subdomain else f"{args.host}{args.path}"
     orchestrator.run(base_link)
@@ -1,13 +1,40 @@
-import re
-
+import asyncio
+import hashlib
+import time
+
+from content_filter.filter import PROBE, ContentFilter
+from crawl_baseline.baseline import PageHashes
+from crawl_metrics.metrics import PARSE, CrawlMetrics
+from crawl_scope.scope import CrawlScope, construct_scope
+from http_cache.cache import HttpCache
 from instance_pooler.pooler import Pooler
-from page_loader.loader import PageLoader, RequestFailedException, InvalidContentTypeException
+from link_ripper.ripper import LinkRipperConfiguration, construct_link_ripper
+from parse_pool.pool import ParsePool
+from page_loader.loader import FetchTimeoutException, PageLoader, RequestFailedException, InvalidContentTypeException, NotModifiedException
+from url_normaliser.normaliser import UrlNormaliser
 
 class LinkProcessorConfiguration:
-    def __init__(self, page_loader_pool, subdomain, host):
+    def __init__(self, page_loader_pool, subdomain, host, normaliser: UrlNormaliser = None, ripper_config: LinkRipperConfiguration = None,
+                 http_cache: HttpCache = None, content_filter: ContentFilter = None, parse_pool: ParsePool = None,
+                 metrics: CrawlMetrics = None, page_hashes: PageHashes = None, scope: CrawlScope = None):
         self.page_loader_pool = page_loader_pool
         self.subdomain = subdomain
         self.host = host
+        # the links that are followed, compiled once and shared between processors - None stays on subdomain.host
+        self.scope = scope if scope is not None else construct_scope(subdomain, host)
+        # shared between processors so the normaliser's cache is shared too
+        self.normaliser = normaliser if normaliser is not None else UrlNormaliser()
+        self.ripper_config = ripper_config if ripper_config is not None else LinkRipperConfiguration()
+        # pages are revalidated against the cache rather than re-downloaded when set
+        self.http_cache = http_cache
+        # shared between processors so HEAD probe results are shared too
+        self.content_filter = content_filter if content_filter is not None else ContentFilter()
+        # pages are ripped and normalised in worker processes when set, rather than on the event loop
+        self.parse_pool = parse_pool
+        # parse times, failed pages and links found are recorded here
+        self.metrics = metrics if metrics is not None else CrawlMetrics()
+        # pages are hashed as they download when set, and pages unchanged since the baseline krawl aren't ripped again
+        self.page_hashes = page_hashes
 
 
 class LinkProcessor:
@@ -15,129 +42,205 @@ class LinkProcessor:
         self.page_loader_pool: Pooler = config.page_loader_pool
         self.subdomain: str = config.subdomain
         self.host: str = config.host
+        self.normaliser: UrlNormaliser = config.normaliser
+        self.ripper_config: LinkRipperConfiguration = config.ripper_config
+        self.http_cache: HttpCache = config.http_cache
+        self.content_filter: ContentFilter = config.content_filter
+        self.parse_pool: ParsePool = config.parse_pool
+        self.metrics: CrawlMetrics = config.metrics
+        self.page_hashes: PageHashes = config.page_hashes
+        self.scope: CrawlScope = config.scope
+
+        # status, body bytes and latency of the page last processed - kept per page by the graph output
+        self.page_metadata = {}
+
+    def format_relative_link(self, parent_link: str, link: str) -> str:
+        """
+        Resolves the link against its parent and returns the canonical form of the result
+        """
+        return self.normaliser.normalise(link, parent_link)
 
-        # add www to expected host elements if subdomain is default ("")
-        self.expected_host_elements = self.subdomain.split(".") if self.subdomain != "" else ["www"]
-        self.expected_host_elements.extend(self.host.split("."))
+    def evaluate_link(self, link: str) -> bool:
+        """
+        Whether the link is in the krawl's scope - see crawl_scope.scope.CrawlScope.
+        Hosts are compared whole, so www.example-domain.com.evil.com doesn't pass for www.example-domain.com
 
-    def format_relative_link(self, parent_link:str, link: str) -> str:
-        formatted_link = ""
+        Args:
+        link: (str) the link to evaluate
 
-        formatted_link += f"{self.subdomain}." if self.subdomain != "" else "www."
+        Returns:
+        valid: (bool)
 
-        formatted_link += self.host
+        """
 
-        # removes the scheme i.e. http/s
-        scheme_separation = parent_link.split("//", 1)
-        remainder = scheme_separation[1] if len(scheme_separation) > 1 else scheme_separation[0]
-        # remove domain from parent link
-        parent_link_elements = remainder.split("/", 1)  # domain.com, relative/path
-        if len(parent_link_elements) > 1 and parent_link_elements[1] != "":
-            parent_path = parent_link_elements[1]
+        link = self.normaliser.normalise(link)
+        if link is None:
+            return False
 
-            # remove filename from path
-            path_elements = parent_path.split("/")
-            if "." in path_elements[-1]:
-                parent_path = "/".join(path_elements[:-1])
+        return self.scope.in_scope(link)
 
-            # add path from parent link
-            formatted_link += f"/{parent_path}"
+    def should_follow(self, link: str) -> bool:
+        # local links to assets are kept in the page's links but never queued
+        return self.evaluate_link(link) and self.content_filter.allows(link)
 
-        # add preceding slash if missing from relative path
-        formatted_link += f"/{link}" if link[0] != "/" else f"{link}"
+    def collect_link(self, parent_link: str, found_link: str, all_links: dict, local_links: list):
+        # relative and scheme-less links are resolved against the parent, every link ends up in canonical form
+        self.collect_canonical_link(self.format_relative_link(parent_link, found_link), all_links, local_links)
 
-        return formatted_link
+    def collect_canonical_link(self, found_link: str, all_links: dict, local_links: list):
+        # stop processing if unparseable or already found - all_links is a dict so the check is constant time and keeps page order
+        if found_link is None or found_link in all_links:
+            return
 
-    @staticmethod
-    def fragment_link(link) -> tuple[str, str]:
-        # removes the scheme i.e. http/s
-        scheme_separation = link.split("//", 1)
-        remainder = scheme_separation[1] if len(scheme_separation) > 1 else scheme_separation[0]
-        # removes the path. netloc will look like: `relativepathsection` or `sub.domains.domain.ext` or `domain.ext`
-        netloc = remainder.split("/", 1)[0]
-        # removes port numbers
-        hostname = netloc.split(":", 1)[0]
+        all_links[found_link] = None
 
-        return netloc, hostname
+        # check if link is from same subdomain and host, and could be a page
+        if self.should_follow(found_link):
+            local_links.append(found_link)
 
-    def check_is_relative_link(self, link: str) -> bool:
-        netloc = self.fragment_link(link)[0]
+    def parent_link(self, ripper, page_link: str) -> str:
+        # a <base href> changes the parent of every link on the page - normalise is cached so this is cheap per chunk
+        if ripper.base_link is not None:
+            base_link = self.normaliser.normalise(ripper.base_link, page_link)
+            if base_link is not None:
+                return base_link
 
-        # capture links like `/relative/path` or `./relative/path` or `../relative/path` or `relative/path` 
-        return bool(netloc == "" or netloc == "." or netloc == ".." or "." not in netloc)
+        return page_link
 
-    def evaluate_link(self, link: str) -> tuple[bool, str]:
-        """
-        This element is insubstantial, due to the number of href variations.
-        This won't work correctly for:
-        - links using a different extension i.e. .com vs .co.uk (it's not a bug it's a feature)
-        - links with the same subdomain more than once i.e. subdomain.subdomain.domain.ext will pass when expecting subdomain.domain.ext
-        Alas, the technical challenge isn't about making the best URL parser... right?
+    def collect_links(self, parent_link: str, found_links: list, all_links: dict, local_links: list):
+        for found_link in found_links:
+            self.collect_link(parent_link, found_link, all_links, local_links)
 
-        
-        Args:
-        link: (str) the link to evaluate
+    def rip_body(self, body: list, page_link: str, charset: str, all_links: dict, local_links: list):
+        # a page buffered whole, ripped on the event loop
+        started = time.perf_counter()
+        ripper = construct_link_ripper(self.ripper_config, charset)
 
-        Returns:
-        valid, formatted_link: (tuple[bool, str])
+        for chunk in body:
+            self.collect_links(self.parent_link(ripper, page_link), ripper.feed(chunk), all_links, local_links)
+        self.collect_links(self.parent_link(ripper, page_link), ripper.close(), all_links, local_links)
 
-        """
+        self.metrics.observe(PARSE, time.perf_counter() - started)
 
-        hostname = self.fragment_link(link)[1]
+    async def probe_links(self, loader: PageLoader, local_links: list) -> list:
+        """
+        HEAD probes local links whose extension doesn't say whether they are pages, dropping any that aren't
+        """
+        if not self.content_filter.head_probe:
+            return local_links
 
-        # is third party link - note: this has a hole, www.NotTheRightHost.com would pass for www.TheRightHost.com TODO
-        if self.host not in hostname:
-            return False
-        
-        # specified subdomain is absent
-        if self.subdomain != "" and self.subdomain != "www" and self.subdomain not in hostname:
-            return False
+        probed = self.content_filter.probed
+        unprobed = [link for link in local_links if link not in probed and self.content_filter.classify(link) == PROBE]
 
-        # incorrect subdomain is present
-        domain_items = hostname.split(".")
-        for item in domain_items:
-            if item not in self.expected_host_elements:
-                return False
+        results = await asyncio.gather(*[loader.probe_html(link) for link in unprobed])
+        probed.update(zip(unprobed, results))
 
-        return True
+        return [link for link in local_links if probed.get(link, True)]
 
     async def process_link(self, link_to_process: str) -> tuple[list, list]:
-        # load page behind link
-        loader: PageLoader = self.page_loader_pool.get_instance_from_pool()
-
-        try:
-            content = await loader.load_html(link_to_process)
-        except RequestFailedException:
-            return [], []
-        except InvalidContentTypeException:
-            raise
+        all_links = {}
+        local_links = []
+        self.page_metadata = {}
 
-        self.page_loader_pool.return_instance_to_pool(loader)
+        cache_entry = await self.http_cache.load(link_to_process) if self.http_cache is not None else None
+        headers = cache_entry.conditional_headers() if cache_entry is not None else None
 
-        all_links = []
-        local_links = []
+        hashing = self.page_hashes is not None and self.page_hashes.hashing()
+        # pages in the baseline krawl are buffered whole rather than ripped as they stream, so they needn't be ripped at all if unchanged
+        previous_hash = self.page_hashes.previous_hash(link_to_process) if hashing else None
+        buffered = self.parse_pool is not None or previous_hash is not None
 
-        # find all links
-        for line in content:
-            line = line.decode("utf-8")
-            found_links = re.findall(r'href=["\']([^"\']+)["\']', line)
+        # the body is only kept when it is going to be cached or parsed once it has downloaded
+        body = [] if self.http_cache is not None or buffered else None
+        digest = hashlib.blake2b(digest_size=16) if hashing else None
+        content_hash = None
 
-            for found_link in found_links:
-                # convert relative links to example-domain.com/relative/path format
-                if self.check_is_relative_link(found_link):
-                    found_link = self.format_relative_link(link_to_process, found_link)
+        # load page behind link - waits for a free loader once the pool is at its limit
+        loader: PageLoader = await self.page_loader_pool.get_instance()
 
-                # stop processing if already found
-                if found_link in all_links:
-                    continue
+        try:
+            async with loader.open_html(link_to_process, headers) as page:
+                # relative links are relative to where the page ended up after redirects, or to its <base href>
+                page_link = self.normaliser.normalise(page.url)
+                self.page_metadata = {"status": page.status, "latency": page.latency}
+
+                if buffered:
+                    # buffered whole and parsed once the connection has been released
+                    async for chunk in page.iter_chunks():
+                        body.append(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+                else:
+                    # links are ripped from each chunk as it arrives rather than after the whole page has downloaded
+                    ripper = construct_link_ripper(self.ripper_config, page.charset)
+                    # only the time spent ripping, not the time waiting for chunks
+                    parse_time = 0.0
+
+                    async for chunk in page.iter_chunks():
+                        if body is not None:
+                            body.append(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+
+                        started = time.perf_counter()
+                        found_links = ripper.feed(chunk)
+                        self.collect_links(self.parent_link(ripper, page_link), found_links, all_links, local_links)
+                        parse_time += time.perf_counter() - started
+
+                    started = time.perf_counter()
+                    found_links = ripper.close()
+                    self.collect_links(self.parent_link(ripper, page_link), found_links, all_links, local_links)
+                    self.metrics.observe(PARSE, parse_time + time.perf_counter() - started)
+
+            self.page_metadata["bytes"] = page.bytes_read
+            content_hash = digest.hexdigest() if digest is not None else None
+
+            if previous_hash is not None and content_hash == previous_hash:
+                # unchanged since the baseline krawl - its links are reused rather than ripping the page again
+                self.metrics.increment("pages_unchanged")
+                for found_link in self.page_hashes.previous_links(link_to_process):
+                    self.collect_canonical_link(found_link, all_links, local_links)
+            elif self.parse_pool is not None:
+                # the worker returns canonical links, so only dedup and evaluation are left on the event loop
+                started = time.perf_counter()
+                for found_link in await self.parse_pool.parse(b"".join(body), page_link, page.charset):
+                    self.collect_canonical_link(found_link, all_links, local_links)
+                # includes waiting for a free worker process
+                self.metrics.observe(PARSE, time.perf_counter() - started)
+            elif buffered:
+                self.rip_body(body, page_link, page.charset, all_links, local_links)
+
+            local_links = await self.probe_links(loader, local_links)
+        except NotModifiedException:
+            # unchanged since the last crawl - reuse the cached links without downloading or ripping the page
+            self.metrics.increment("not_modified")
+            self.page_metadata = {"status": 304, "bytes": 0}
+            self.collect_links(link_to_process, cache_entry.links, all_links, local_links)
+
+            # the page is the cached copy, so that is what is hashed
+            if hashing:
+                cached_body = await asyncio.to_thread(self.http_cache.get_body, link_to_process)
+                if cached_body is not None:
+                    self.page_hashes.record(link_to_process, hashlib.blake2b(cached_body, digest_size=16).hexdigest())
+            return list(all_links), await self.probe_links(loader, local_links)
+        except RequestFailedException as error:
+            self.metrics.increment("pages_failed")
+            self.page_metadata = {"status": error.status}
+            if isinstance(error, FetchTimeoutException):
+                self.page_metadata["timeout"] = error.kind
+            return [], []
+        finally:
+            self.page_loader_pool.return_instance(loader)
 
-                all_links.append(found_link)
+        # truncated pages are missing links, so aren't cached
+        if self.http_cache is not None and (page.etag is not None or page.last_modified is not None) and not page.truncated:
+            await self.http_cache.store(link_to_process, page.etag, page.last_modified, list(all_links), b"".join(body))
 
-                # check if link is from same subdomain and host
-                if self.evaluate_link(found_link):
-                    local_links.append(found_link)
+        if content_hash is not None:
+            self.page_hashes.record(link_to_process, content_hash)
 
-        return all_links, local_links
+        self.metrics.increment("links_found", len(all_links))
+        return list(all_links), local_links
 
 
 def construct_link_processor(config: LinkProcessorConfiguration):
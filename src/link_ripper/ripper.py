@@ -0,0 +1,221 @@
+import codecs
+import re
+
+try:
+    from lxml import etree
+except ImportError:  # optional backend
+    etree = None
+
+# one pass over the raw bytes finds every wanted attribute - nothing is decoded until a link is found
+# the patterns are case sensitive and start with a literal so the regex engine can skip ahead to candidates quickly,
+# case insensitive patterns are several times slower
+_href_pattern = re.compile(rb'href\s*=\s*["\']([^"\']+)["\']')
+_source_pattern = re.compile(rb'(href|src|srcset)\s*=\s*["\']([^"\']+)["\']')
+_base_pattern = re.compile(rb'<base\s[^>]*?href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+_rel_pattern = re.compile(rb'\brel\s*=\s*["\']?([^"\'>]+)', re.IGNORECASE)
+_meta_charset_pattern = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([a-zA-Z0-9_:.-]+)', re.IGNORECASE)
+
+# hrefs longer than this are dropped rather than buffered across chunks - keeps the carried remainder bounded
+# on minified single-line pages where the whole document is one "line"
+_max_href_length = 4096
+_max_remainder_length = _max_href_length + len(b'srcset = ""')
+
+# a <meta charset> is only looked for at the start of the document
+_charset_sniff_length = 1024
+
+_default_charset = "utf-8"
+
+
+class RipperBackendUnavailableException(Exception):
+    pass
+
+
+class LinkRipperConfiguration:
+    def __init__(self, backend: str = "regex", capture_sources: bool = False, link_rels: list = None):
+        # one of the keys of _backends
+        self.backend = backend
+        # also rip src and srcset attributes (images, scripts, frames)
+        self.capture_sources = capture_sources
+        # only keep <link href> when its rel is one of these i.e. ["canonical", "alternate"], None keeps every <link>
+        self.link_rels = set(rel.lower() for rel in link_rels) if link_rels is not None else None
+
+
+def resolve_charset(charset: str) -> str:
+    # unknown or missing charsets fall back to utf-8 rather than failing the page
+    if charset:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+
+    return _default_charset
+
+
+def split_srcset(srcset: str) -> list[str]:
+    # `a.jpg 1x, b.jpg 2x` -> [a.jpg, b.jpg]
+    return [candidate.split()[0] for candidate in srcset.split(",") if candidate.strip() != ""]
+
+
+def keep_link_rel(rels: set, rel: str) -> bool:
+    return rels is None or any(value in rels for value in rel.lower().split())
+
+
+class RegexLinkRipper:
+    """
+    Incrementally rips links out of a html byte stream with a single precompiled bytes pattern.
+    Chunks can be fed as they arrive from the network, a link split across two chunks is still found because
+    the unmatched tail of each chunk is carried over into the next one.
+    Only matched links are decoded - using the response charset, or a <meta charset> near the start of the page.
+    The first <base href> is recorded in base_link rather than being returned as a link.
+
+    Links are found anywhere in the document, including inside comments and scripts.
+    """
+    def __init__(self, config: LinkRipperConfiguration, charset: str = None):
+        self.config = config
+        self.pattern = _source_pattern if config.capture_sources else _href_pattern
+
+        self.charset: str = resolve_charset(charset) if charset else None
+        self.remainder = b""
+        self.base_link: str = None
+
+    def decode(self, value: bytes) -> str:
+        return value.decode(self.charset, errors="replace")
+
+    def feed(self, chunk: bytes) -> list[str]:
+        """
+        Args:
+        chunk: (bytes) the next section of the document
+
+        Returns:
+        links: (list[str]) every link completed by this chunk, in document order
+        """
+        buffer = self.remainder + chunk if self.remainder else chunk
+
+        if self.charset is None:
+            charset_match = _meta_charset_pattern.search(buffer, 0, _charset_sniff_length)
+            self.charset = resolve_charset(charset_match.group(1).decode("ascii") if charset_match else None)
+
+        base_end = -1
+        if self.base_link is None:
+            base_match = _base_pattern.search(buffer)
+            if base_match is not None:
+                self.base_link = self.decode(base_match.group(1))
+                base_end = base_match.end()
+
+        filtered = self.config.capture_sources or self.config.link_rels is not None
+        charset = self.charset
+
+        links = []
+        matched_to = 0
+        for match in self.pattern.finditer(buffer):
+            matched_to = match.end()
+
+            if matched_to == base_end:
+                continue
+
+            # plain hrefs - the common case is kept to a minimum of work per link
+            if not filtered:
+                links.append(match.group(1).decode(charset, errors="replace"))
+                continue
+
+            attribute, value = match.groups() if self.config.capture_sources else (b"href", match.group(1))
+
+            if attribute == b"srcset":
+                links.extend(split_srcset(self.decode(value)))
+                continue
+
+            if attribute == b"href" and self.config.link_rels is not None and not self.keep_tag_link(buffer, match.start()):
+                continue
+
+            links.append(self.decode(value))
+
+        # anything after the last match could be the start of a link that finishes in the next chunk
+        self.remainder = buffer[max(matched_to, len(buffer) - _max_remainder_length):]
+
+        return links
+
+    def keep_tag_link(self, buffer: bytes, attribute_start: int) -> bool:
+        tag_start = buffer.rfind(b"<", 0, attribute_start)
+        if tag_start == -1 or buffer[tag_start + 1:tag_start + 5].lower() != b"link":
+            return True
+
+        tag_end = buffer.find(b">", attribute_start)
+        rel_match = _rel_pattern.search(buffer, tag_start, tag_end if tag_end != -1 else len(buffer))
+
+        return keep_link_rel(self.config.link_rels, self.decode(rel_match.group(1)) if rel_match else "")
+
+    def close(self) -> list[str]:
+        # an unterminated link at the end of the document is not a link
+        self.remainder = b""
+        return []
+
+
+class LxmlLinkRipper:
+    """
+    Rips links with lxml's incremental html parser - links are only taken from real elements, so commented out
+    markup and text that looks like an attribute are ignored.
+    Requires lxml to be installed.
+    """
+    def __init__(self, config: LinkRipperConfiguration, charset: str = None):
+        if etree is None:
+            raise RipperBackendUnavailableException("the lxml ripper backend requires lxml to be installed")
+
+        self.config = config
+        self.parser = etree.HTMLPullParser(events=("start",), encoding=resolve_charset(charset) if charset else None)
+        self.base_link: str = None
+
+    def feed(self, chunk: bytes) -> list[str]:
+        self.parser.feed(chunk)
+        return self.read_links()
+
+    def close(self) -> list[str]:
+        self.parser.close()
+        return self.read_links()
+
+    def read_links(self) -> list[str]:
+        links = []
+
+        for _, element in self.parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ""
+            href = element.get("href")
+
+            if tag == "base":
+                if self.base_link is None and href is not None:
+                    self.base_link = href
+                continue
+
+            if href is not None and (tag != "link" or keep_link_rel(self.config.link_rels, element.get("rel", ""))):
+                links.append(href)
+
+            if self.config.capture_sources:
+                src = element.get("src")
+                if src is not None:
+                    links.append(src)
+
+                srcset = element.get("srcset")
+                if srcset is not None:
+                    links.extend(split_srcset(srcset))
+
+        return [link.strip() for link in links if link.strip() != ""]
+
+
+_backends = {
+    "regex": RegexLinkRipper,
+    "lxml": LxmlLinkRipper,
+}
+
+
+def available_backends() -> list[str]:
+    return [name for name in _backends if name != "lxml" or etree is not None]
+
+
+def construct_link_ripper(config: LinkRipperConfiguration, charset: str = None):
+    if config.backend not in _backends:
+        raise RipperBackendUnavailableException(f"unknown ripper backend: {config.backend}")
+
+    return _backends[config.backend](config, charset)
+
+
+def rip_links(content: bytes, config: LinkRipperConfiguration = None, charset: str = None) -> list[str]:
+    ripper = construct_link_ripper(config if config is not None else LinkRipperConfiguration(), charset)
+    return ripper.feed(content) + ripper.close()
@@ -1,95 +1,526 @@
 import asyncio
+import contextlib
 import json
 import math
-from datetime import datetime
+import time
+from urllib.parse import urlsplit
 
-from instance_pooler.pooler import Pooler
+from content_filter.filter import ContentFilter, ContentFilterConfiguration
+from crawl_baseline.baseline import DIFF, HASHES, Baseline, BaselineConfiguration, PageHashes, diff_krawls, sidecar_path
+from crawl_journal.journal import OUTPUT_PATH, CrawlJournal, CrawlJournalConfiguration
+from crawl_metrics.metrics import PAGE, CrawlMetrics, MetricsConfiguration, MetricsReporter, current_metrics
+from crawl_scope.scope import ScopeConfiguration, construct_scope, is_domain_name, link_host
+from frontier.frontier import Frontier, FrontierConfiguration, construct_frontier
+from frontier.priority import ChangedPageScorer, DepthScorer
+from http_cache.cache import HttpCache, HttpCacheConfiguration
+from http_transport.transport import DEADLINE_TIMEOUT, WATCHDOG_TIMEOUT, Transport, TransportConfiguration
+from instance_pooler.pooler import Pooler, PoolerConfiguration
 from link_processor import processor
+from link_ripper.ripper import LinkRipperConfiguration
 from page_loader import loader
+from parse_pool.pool import ParsePool, ParsePoolConfiguration
+from politeness.scheduler import PolitenessConfiguration, PolitenessScheduler
+from result_writer.writer import JsonResultWriter, ResultWriterConfiguration, construct_result_writer, read_output
+from robots_txt.robots import RobotsCache, RobotsConfiguration
+from sitemap.sitemap import SitemapConfiguration, SitemapReader
+from url_normaliser.normaliser import UrlNormaliser, UrlNormaliserConfiguration
+from visited_set.visited import EXACT, VisitedSetConfiguration
+
+
+class CrawlBudgetConfiguration:
+    def __init__(self, max_pages: int = None, max_duration: float = None, deadline: float = None):
+        # pages fetched before the crawl stops taking links, None is unlimited - links beyond the recursion limit aren't fetched so don't count
+        self.max_pages = max_pages
+        # seconds after which the crawl stops taking links, pages already being fetched are finished
+        self.max_duration = max_duration
+        # seconds after which the crawl stops taking links and pages still being fetched are cancelled (and failed)
+        self.deadline = deadline
 
 
 class Orchestrator:
-    def __init__(self, subdomain: str, host: str, recursion_limit: int):
-        page_loader_pool = Pooler(loader.construct_page_loader)
-        link_processor_config = processor.LinkProcessorConfiguration(page_loader_pool, subdomain, host)
+    def __init__(self, subdomain: str, host: str, recursion_limit: int, transport_config: TransportConfiguration = None, concurrency: int = 10, max_page_size: int = None,
+                 normaliser_config: UrlNormaliserConfiguration = None, ripper_config: LinkRipperConfiguration = None,
+                 http_cache_config: HttpCacheConfiguration = None, journal_config: CrawlJournalConfiguration = None,
+                 writer_config: ResultWriterConfiguration = None, politeness_config: PolitenessConfiguration = None,
+                 robots_config: RobotsConfiguration = None, sitemap_config: SitemapConfiguration = None,
+                 content_filter_config: ContentFilterConfiguration = None, workers: int = 0,
+                 frontier_config: FrontierConfiguration = None, visited_config: VisitedSetConfiguration = None,
+                 metrics_config: MetricsConfiguration = None, budget_config: CrawlBudgetConfiguration = None,
+                 baseline_config: BaselineConfiguration = None, page_hooks: list = None, keep_page_links: bool = True,
+                 transport: Transport = None, fetch_slots=None, scope_config: ScopeConfiguration = None):
+        # counters and timings recorded by every component, always collected - the configuration decides how they are reported
+        self.metrics = CrawlMetrics()
+        self.metrics_reporter = MetricsReporter(metrics_config if metrics_config is not None else MetricsConfiguration(), self.metrics)
+
+        # one transport (session + connection pool) is shared by every page loader for the whole crawl
+        # dns, connect and ttfb are timed by tracing the transport's requests
+        # a transport passed in (a SharedTransport) is shared with other crawls and transport_config is ignored
+        if transport is None:
+            transport = Transport(transport_config if transport_config is not None else TransportConfiguration(),
+                                  [self.metrics.trace_config()])
+        self.transport = transport
+
+        # per host rate limiting, backoff and retries - shared so every loader sees the same host state
+        self.scheduler = PolitenessScheduler(politeness_config)
+
+        # links to assets are dropped before they are queued, shared so HEAD probes are only made once per link
+        self.content_filter = ContentFilter(content_filter_config)
+
+        page_loader_config = loader.PageLoaderConfiguration(self.transport, max_page_size, scheduler=self.scheduler,
+                                                            content_filter=self.content_filter, metrics=self.metrics)
+        # each worker holds at most one page loader and one link processor at a time, so neither pool grows past concurrency
+        pool_config = PoolerConfiguration(max_size=max(1, concurrency))
+        page_loader_pool = Pooler(loader.construct_page_loader, page_loader_config, pool_config)
+
+        normaliser_config = normaliser_config if normaliser_config is not None else UrlNormaliserConfiguration()
+        # the bare domain is treated as the www subdomain - stops `example.com` duplicating `www.example.com`
+        if subdomain in ("", "www") and is_domain_name(host):
+            normaliser_config.host_aliases.setdefault(host.lower(), f"www.{host.lower()}")
+
+        # more seeds and allow / deny rules on top of subdomain.host - the krawl starts from every seed as well as the base link
+        self.scope_config = scope_config if scope_config is not None else ScopeConfiguration()
+        scope = construct_scope(subdomain, host, self.scope_config)
+        # as for the bare domain above, a www seed's bare domain is the same site
+        for seed_host in map(link_host, self.scope_config.seeds):
+            if seed_host.startswith("www.") and is_domain_name(seed_host):
+                normaliser_config.host_aliases.setdefault(seed_host[len("www."):], seed_host)
+        self.normaliser = UrlNormaliser(normaliser_config)
+
+        # opt-in on-disk cache, pages are revalidated with conditional requests on later crawls
+        self.http_cache = HttpCache(http_cache_config) if http_cache_config is not None else None
+
+        # pages are parsed in worker processes rather than on the event loop, 0 parses on the event loop
+        self.parse_pool = ParsePool(ParsePoolConfiguration(workers, ripper_config, normaliser_config)) if workers > 0 else None
+
+        # an incremental crawl is compared against an earlier crawl's output - pages are hashed as they download, whether
+        # or not there is a baseline, so that this crawl can be the baseline of the next
+        self.baseline = Baseline(baseline_config) if baseline_config is not None else None
+        self.page_hashes = PageHashes(self.baseline)
+        # pages and links added and removed since the baseline, once the crawl has finished
+        self.diff = None
+
+        link_processor_config = processor.LinkProcessorConfiguration(page_loader_pool, subdomain, host, self.normaliser, ripper_config,
+                                                                     self.http_cache, self.content_filter, self.parse_pool, self.metrics,
+                                                                     self.page_hashes, scope)
         
-        self.link_processor_pool = Pooler(processor.construct_link_processor, link_processor_config)
+        self.link_processor_pool = Pooler(processor.construct_link_processor, link_processor_config, pool_config)
+
+        for name, pool in [("page_loader", page_loader_pool), ("link_processor", self.link_processor_pool)]:
+            for stat in ("size", "in_use", "free", "waiting"):
+                self.metrics.register_gauge(f"{name}_pool_{stat}", lambda pool=pool, stat=stat: pool.stats()[stat])
 
         self.recursion_limit = recursion_limit if recursion_limit >= 0 else math.inf
 
+        # number of workers draining the frontier - this caps in-flight page loads
+        self.concurrency = max(1, concurrency)
+        # seconds a worker may spend on one page before it is cancelled, see TimeoutConfiguration
+        self.watchdog = self.transport.config.timeouts.watchdog
+        # a limit on in-flight page loads shared with other crawls - `async with fetch_slots.acquire():` is held
+        # around each page, None only limits by concurrency
+        self.fetch_slots = fetch_slots
+
+        # pages that had changed when the baseline was crawled are crawled first - a shared frontier is only ever breadth first
+        if self.baseline is not None and (frontier_config is None or frontier_config.coordinator_host is None):
+            scorers = frontier_config.scorers if frontier_config is not None and frontier_config.scorers else [DepthScorer()]
+            frontier_config = FrontierConfiguration(scorers=[*scorers, ChangedPageScorer(self.baseline.changed)])
+
+        # links waiting to be processed and every link seen so far, in memory or shared with other nodes
+        self.frontier_config = frontier_config
+        self.visited_config = visited_config
+        self.frontier: Frontier = None
+        # links taken from the frontier by this node's workers and not finished yet
+        self.in_flight = 0
+
+        # with a budget the crawl stops early - a priority frontier makes sure the pages fetched are the valuable ones
+        budget_config = budget_config if budget_config is not None else CrawlBudgetConfiguration()
+        self.max_pages = budget_config.max_pages
+        self.max_duration = budget_config.max_duration
+        self.deadline = budget_config.deadline
+        self.pages_started = 0
+        self.crawl_started = None
+        self.seeding: asyncio.Task | None = None
+
+        self.metrics.register_gauge("queue_depth", lambda: self.frontier.depth() if self.frontier is not None else None)
+        self.metrics.register_gauge("in_flight", lambda: self.in_flight)
+
+        # compact crawls keep nothing per url - the frontier remembers seen links as fingerprints or in a bloom filter
+        # and pages are written out (spilled to disk for json output) as they complete
+        self.compact = visited_config is not None and visited_config.mode != EXACT
+
+        # awaited with (link, contained links, metadata) as each page is fetched, before its links are queued
+        self.page_hooks = page_hooks if page_hooks is not None else []
+        # False only keeps that a page was crawled - for callers that take pages from the hooks as they are fetched
+        self.keep_page_links = keep_page_links
+
         """
         registered_links structure:
         {
             "<link-name>": list[str](contained-links))
         }
+        when the result writer streams (or page links aren't kept), contained links are written out as each page completes
+        and only True is kept
         """
         self.registered_links = {}
 
         # links to skip - i.e. incorrect content-type
-        self.skip_links = []
+        # the frontier is the visited set, these are this node's results
+        self.skip_links = set()
+
+        # records crawl state as it changes so that an interrupted crawl can be resumed
+        self.journal = CrawlJournal(journal_config) if journal_config is not None else None
 
+        if self.compact and writer_config is not None:
+            writer_config.spill = True
+
+        # a resumed crawl adds to the interrupted crawl's output rather than replacing it or starting a new timestamped file
+        if writer_config is not None and self.journal is not None and self.journal.has_entries():
+            writer_config.append = True
+            if writer_config.path is None:
+                writer_config.path = self.recorded_output_path()
+
+        # None leaves results in registered_links only
+        self.result_writer = construct_result_writer(writer_config) if writer_config is not None else None
+
+        # links disallowed by robots.txt are never queued, None ignores robots.txt
+        self.robots = RobotsCache(robots_config, self.transport, self.scheduler) if robots_config is not None else None
+
+        # seeds the frontier with the pages listed in the site's sitemaps, None only follows links
+        self.sitemap_config = sitemap_config
+        self.sitemap_reader = SitemapReader(sitemap_config, self.transport, self.scheduler) if sitemap_config is not None else None
+
+
+    def run(self, base_link: str = None):
+        # output defaults to the original timestamped json file, or the interrupted krawl's when resuming
+        if self.result_writer is None:
+            path = self.recorded_output_path()
+            self.result_writer = JsonResultWriter(ResultWriterConfiguration(path, append=path is not None, spill=self.compact))
 
-    def run(self, base_link: str):
-        # add base link to registered links to stop it being re-run by the concurrency
-        self.registered_links[base_link] = None
-        # add base link without slash to skip it no file name is provided at the end of the path
-        # this prevents duplication between `fuery.co.uk` and `fuery.co.uk/`
-        if base_link[-1] == "/":
-            self.skip_links.append(base_link[:-1])
         # run
-        asyncio.run(self.process_link(base_link, 1))
+        asyncio.run(self.crawl(base_link))
+
+    def recorded_output_path(self) -> str | None:
+        return self.journal.get_value(OUTPUT_PATH) if self.journal is not None else None
+
+
+    async def crawl(self, base_link: str = None):
+        self.frontier = construct_frontier(self.frontier_config, self.visited_config)
+
+        if self.parse_pool is not None:
+            self.parse_pool.open()
+
+        # requests made through a shared transport are traced to this crawl's metrics
+        metrics_token = current_metrics.set(self.metrics)
+
+        try:
+            # the transport is closed once every link has been processed, releasing all pooled connections
+            # metrics are reported last, once everything else has finished
+            async with self.metrics_reporter, self.transport, self.frontier:
+                await self.crawl_frontier(base_link)
+        finally:
+            current_metrics.reset(metrics_token)
+
+            if self.parse_pool is not None:
+                self.parse_pool.close()
+
+
+    async def crawl_frontier(self, base_link: str = None):
+        seed_links = None
+
+        if self.journal is not None and self.journal.has_entries():
+            # resuming - finished pages are kept and only unfinished links are queued again
+            self.registered_links, self.skip_links, unfinished_links = self.journal.load()
+
+            # unfinished links are registered again as workers take them
+            self.registered_links = {link: links for link, links in self.registered_links.items() if links is not None}
+
+            # finished pages were written out by the interrupted run
+            if self.streams_results():
+                self.registered_links = dict.fromkeys(self.registered_links, True)
+
+            await self.frontier.mark_seen([*self.registered_links, *self.skip_links])
+            if self.compact:
+                self.registered_links = {}
+            for link, depth in unfinished_links:
+                await self.frontier.add([link], depth)
+        else:
+            # links found on pages are canonical, so the seeds need to be too - `fuery.co.uk` becomes `http://www.fuery.co.uk/`
+            seeds = [base_link] if base_link is not None else []
+            seeds = list(dict.fromkeys(link for link in map(self.normaliser.normalise, [*seeds, *self.scope_config.seeds]) if link is not None))
+            if not seeds:
+                raise ValueError("nothing to krawl - a base link or a seed is needed")
+            await self.enqueue_allowed_links(seeds, 1)
+
+            # sitemaps are read while the workers run - a resumed crawl already has the seeded links in its journal
+            if self.sitemap_reader is not None:
+                seed_links = self.seed_links(seeds)
+
+        if self.result_writer is not None:
+            self.result_writer.open()
+            self.page_hashes.open(sidecar_path(self.result_writer.path, HASHES), self.result_writer.append)
+            if self.journal is not None:
+                self.journal.set_value(OUTPUT_PATH, self.result_writer.path)
+                self.journal.commit()
+
+        self.crawl_started = time.monotonic()
+
+        try:
+            await self.drain_frontier(seed_links)
+        finally:
+            if self.journal is not None:
+                self.journal.close()
+
+            if self.result_writer is not None:
+                self.result_writer.close(self.registered_links)
+
+            self.page_hashes.close()
+
+        if self.baseline is not None:
+            self.write_diff()
+
+
+    def write_diff(self):
+        # streamed and compact crawls don't hold on to their pages' links, the output has them
+        if self.result_writer is not None and (self.streams_results() or self.compact):
+            current = read_output(self.result_writer.path)
+        else:
+            current = self.registered_links
+
+        self.diff = {"baseline": self.baseline.path, **diff_krawls(self.baseline.links, current, self.page_hashes.changed_pages)}
+
+        diff_path = self.baseline.diff_path
+        if diff_path is None and self.result_writer is not None:
+            diff_path = sidecar_path(self.result_writer.path, DIFF)
+
+        if diff_path is not None:
+            with open(diff_path, "w", encoding="utf-8") as file:
+                json.dump(self.diff, file, indent=2)
+
 
-        # output
-        dt = datetime.now()
-        filename = dt.strftime('krawl_%h-%m-%d_%H-%M-%S.json')
+    def streams_results(self) -> bool:
+        return self.result_writer is not None and self.result_writer.streaming
 
-        with open(filename, 'w') as file:
-            json.dump(self.registered_links, file, indent=2)
 
+    def register(self, link: str, value):
+        if not self.compact:
+            self.registered_links[link] = value
 
-    def skip_link(self, link, recursion_limit_reached=False):
-        if recursion_limit_reached and link in self.registered_links:
-            self.registered_links[link] = "not processed - recursion limit reached"
-        elif link in self.registered_links:
-            self.skip_links.append(link)
-            self.registered_links.pop(link)
+
+    def record_page(self, link: str, contained_links, metadata: dict = None):
+        if self.streams_results():
+            # written out now rather than held in memory until the end - metadata is only kept by the graph output
+            self.result_writer.write_page(link, contained_links, metadata)
+            self.register(link, True)
+        elif not self.keep_page_links:
+            self.register(link, True)
+        else:
+            self.register(link, contained_links)
+
+
+    async def drain_frontier(self, seed_links=None):
+        tasks = []
+
+        if seed_links is not None:
+            # the frontier can run dry while seeds are still being read, the hold stops the crawl finishing early
+            await self.frontier.hold()
+            self.seeding = asyncio.create_task(self.seed_then_release(seed_links))
+            tasks.append(self.seeding)
+
+        # workers return once the frontier reports the crawl is finished - on every node for a shared frontier
+        tasks.extend(asyncio.create_task(self.worker()) for _ in range(self.concurrency))
+
+        try:
+            # finishes when every worker has returned, or early if a worker or the seeding raises
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+
+    async def seed_then_release(self, seed_links):
+        try:
+            await seed_links
+        finally:
+            await self.frontier.release()
+
+
+    async def seed_links(self, seeds: list[str]):
+        sitemap_links = self.sitemap_config.links
+        if sitemap_links is None:
+            # every site the krawl starts on has its own sitemaps
+            sitemap_links = []
+            for origin in dict.fromkeys(f"{parts.scheme}://{parts.netloc}" for parts in map(urlsplit, seeds)):
+                site_sitemaps = (await self.robots.rules(f"{origin}/")).sitemaps if self.robots is not None else []
+                sitemap_links.extend(site_sitemaps or [f"{origin}/sitemap.xml"])
+
+        async for entry in self.sitemap_reader.iter_entries(sitemap_links):
+            link = self.normaliser.normalise(entry.url)
+            if link is None or link in self.registered_links or link in self.skip_links:
+                continue
+
+            # sitemaps can list anything, only links the crawl would have followed are seeded
+            # the processor is only held for the check, so seeding never keeps one from the workers
+            async with self.link_processor_pool.acquire() as link_processor_instance:
+                if not link_processor_instance.should_follow(link):
+                    continue
+
+            # seeds sit level with the base link, a priority frontier scores them by their sitemap entry
+            await self.enqueue_allowed_links([link], 1, {link: entry})
+
+
+    async def worker(self):
+        while (item := await self.frontier.get()) is not None:
+            link, depth = item
+
+            # links beyond the recursion limit aren't fetched, so aren't counted against the budget
+            if depth < self.recursion_limit:
+                if self.budget_spent():
+                    # queued again - for the other nodes of a shared frontier, and left queued in the journal so
+                    # resuming the crawl carries on from here
+                    await self.frontier.abandon(link, depth)
+                    self.stop_seeding()
+                    return
+
+                self.pages_started += 1
+
+            # registered as it is taken, so output keeps the order links were queued in
+            self.register(link, None)  # this value is updated once the link has been processed
+
+            self.in_flight += 1
+            started = time.monotonic()
+
+            try:
+                await self.process_link(link, depth)
+            finally:
+                self.in_flight -= 1
+                self.metrics.observe(PAGE, time.monotonic() - started)
+                await self.frontier.done(link)
+
+
+    def budget_spent(self) -> bool:
+        if self.max_pages is not None and self.pages_started >= self.max_pages:
+            return True
+        if self.deadline_passed():
+            return True
+        return self.max_duration is not None and time.monotonic() - self.crawl_started >= self.max_duration
+
+
+    def deadline_passed(self) -> bool:
+        return self.deadline is not None and time.monotonic() - self.crawl_started >= self.deadline
+
+
+    def stop_seeding(self):
+        if self.seeding is not None:
+            self.seeding.cancel()
+
+
+    async def enqueue_links(self, links: list[str], depth: int, hints: dict = None):
+        # the frontier drops links it has seen before - for a shared frontier that includes links seen by other nodes
+        queued_links = await self.frontier.add(links, depth, hints)
+        self.metrics.increment("links_queued", len(queued_links))
+
+        for link in queued_links:
+            if self.journal is not None:
+                self.journal.record_queued(link, depth)
+
+
+    async def enqueue_allowed_links(self, links: list[str], depth: int, hints: dict = None):
+        allowed_links = []
+
+        for link in links:
+            if self.robots is not None and not await self.robots.allowed(link):
+                # not journaled - robots.txt is checked again when a crawl resumes
+                self.skip_links.add(link)
+            else:
+                allowed_links.append(link)
+
+        await self.enqueue_links(allowed_links, depth, hints)
+
+
+    def skip_link(self, link, recursion_limit_reached=False, depth: int = None):
+        # only called for links taken from the frontier
+        if recursion_limit_reached:
+            self.metrics.increment("pages_beyond_limit")
+            self.record_page(link, "not processed - recursion limit reached", {"depth": depth})
+
+            if self.journal is not None:
+                self.journal.record_recursion_limit(link)
+        else:
+            self.metrics.increment("pages_skipped")
+            self.skip_links.add(link)
+            self.registered_links.pop(link, None)
+
+            if self.journal is not None:
+                self.journal.record_skipped(link)
 
 
     async def process_link(self, link: str, depth: int):
         # cancel processing if recursion depth is beyond limit
         if depth >= self.recursion_limit:
-            self.skip_link(link, recursion_limit_reached=True)
+            self.skip_link(link, recursion_limit_reached=True, depth=depth)
             return
 
-        link_processor_instance: processor.LinkProcessor = self.link_processor_pool.get_instance_from_pool()
+        async with self.fetch_slot(), self.link_processor_pool.acquire() as link_processor_instance:
+            started = time.monotonic()
+
+            try:
+                # the watchdog - whatever the page is stuck on, it is given up at its own limit or the crawl's deadline
+                async with asyncio.timeout_at(self.watchdog_deadline(started)) as watchdog:
+                    all_links, local_links = await link_processor_instance.process_link(link)
+            except loader.InvalidContentTypeException:
+                self.skip_link(link)
+                return
+            except asyncio.TimeoutError:
+                if not watchdog.expired():
+                    raise
+
+                kind = DEADLINE_TIMEOUT if self.deadline_passed() else WATCHDOG_TIMEOUT
+                self.metrics.record_timeout(kind, link, time.monotonic() - started)
+                self.metrics.increment("pages_failed")
+
+                all_links, local_links = [], []
+                link_processor_instance.page_metadata["timeout"] = kind
+
+            metadata = {"depth": depth, **link_processor_instance.page_metadata}
+
+        await self.register_links(link, all_links, local_links, depth, metadata)
 
-        try:
-            all_links, local_links = await link_processor_instance.process_link(link)
-        except loader.InvalidContentTypeException:
-            self.skip_link(link)
-            self.link_processor_pool.return_instance_to_pool(link_processor_instance)
-            return
 
-        self.link_processor_pool.return_instance_to_pool(link_processor_instance)
+    def watchdog_deadline(self, started: float) -> float | None:
+        # in the event loop's time, None for no limit
+        limits = []
+        if self.watchdog is not None:
+            limits.append(started + self.watchdog)
+        if self.deadline is not None:
+            limits.append(self.crawl_started + self.deadline)
 
-        await self.register_links(link, all_links, local_links, depth)
+        if not limits:
+            return None
+        return asyncio.get_running_loop().time() + min(limits) - time.monotonic()
 
 
-    async def register_links(self, link: str, contained_links: list, local_links: list, depth: int):
+    def fetch_slot(self):
+        return self.fetch_slots.acquire() if self.fetch_slots is not None else contextlib.nullcontext()
+
+
+    async def register_links(self, link: str, contained_links: list, local_links: list, depth: int, metadata: dict = None):
         # register found details
-        self.registered_links[link] = contained_links
-        
-        # check for any new unprocessed links
-        to_recurse = []
-        for new_link in local_links:
-            if new_link not in self.registered_links and new_link not in self.skip_links:
-                self.registered_links[new_link] = None  # this value is updated by a later call to this same function
-                to_recurse.append(new_link)
-
-        # recurse if necessary
-        if len(to_recurse) > 0:
-            depth += 1
-            tasks = [self.process_link(new_link, depth) for new_link in to_recurse]
-            await asyncio.gather(*tasks)
+        self.metrics.increment("pages")
+        self.record_page(link, contained_links, metadata)
+
+        if self.journal is not None:
+            self.journal.record_done(link, contained_links)
+
+        for page_hook in self.page_hooks:
+            await page_hook(link, contained_links, metadata if metadata is not None else {"depth": depth})
+
+        # queue any new unprocessed links one level deeper - links this node knows about are dropped before asking the frontier
+        new_links = [new_link for new_link in local_links if new_link not in self.registered_links and new_link not in self.skip_links]
+        await self.enqueue_allowed_links(new_links, depth + 1)
 
 
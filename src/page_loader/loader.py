@@ -1,60 +1,274 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
 import aiohttp
 
-_invalid_patterns = [".css", "cdn-cgi"]
+from content_filter.filter import DENY, ContentFilter
+from crawl_metrics.metrics import DOWNLOAD, CrawlMetrics
+from http_transport.transport import FIRST_BYTE_TIMEOUT, Transport, timeout_kind
+from politeness.scheduler import PolitenessScheduler
+from url_normaliser.normaliser import normalise_url
+
+_default_chunk_size = 64 * 1024
+
+# request headers that make a 304 response possible
+_conditional_headers = ("If-None-Match", "If-Modified-Since")
 
 class RequestFailedException(Exception):
-    pass
+    def __init__(self, status: int = None):
+        super().__init__(status)
+        # the final response's status, None when no response was received
+        self.status = status
+
+
+class FetchTimeoutException(RequestFailedException):
+    def __init__(self, kind: str, status: int = None):
+        super().__init__(status)
+        # the limit that was hit, see http_transport.transport.TimeoutConfiguration
+        self.kind = kind
+
+
+def is_conditional(headers: dict | None) -> bool:
+    # sent with validators from the http cache, so a 304 means the cached copy is still current
+    return headers is not None and any(name in headers for name in _conditional_headers)
+
+
+def is_transient(error: Exception) -> bool:
+    # connection failures and timeouts may succeed on a later attempt, other client errors won't
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
 
 
 class InvalidContentTypeException(Exception):
     pass
 
 
+class NotModifiedException(Exception):
+    # the page hasn't changed since the validators sent with the request
+    pass
+
+
+class PageLoaderConfiguration:
+    def __init__(self, transport: Transport, max_body_size: int = None, chunk_size: int = _default_chunk_size,
+                 scheduler: PolitenessScheduler = None, content_filter: ContentFilter = None, metrics: CrawlMetrics = None):
+        self.transport = transport
+        # paces requests per host and retries transient failures, None makes a single unpaced attempt
+        self.scheduler = scheduler
+        # bytes read from a single page before the download is abandoned, None reads everything
+        self.max_body_size = max_body_size
+        self.chunk_size = chunk_size
+        # links that are never pages are refused without a request, and decides which Content-Types are pages
+        self.content_filter = content_filter if content_filter is not None else ContentFilter()
+        # retries, bytes and download times are recorded here - requests themselves are traced by the transport
+        self.metrics = metrics if metrics is not None else CrawlMetrics()
+
+
+class PageStream:
+    """
+    An open html response whose body is read chunk by chunk.
+    If the body grows beyond max_body_size the connection is closed and the stream ends early with truncated set.
+    """
+    def __init__(self, response: aiohttp.ClientResponse, max_body_size: int = None, chunk_size: int = _default_chunk_size):
+        self.response = response
+        self.url = str(response.url)
+        self.status = response.status
+        self.charset = response.charset
+        # validators for conditional requests on later crawls
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.max_body_size = max_body_size
+        self.chunk_size = chunk_size
+
+        self.bytes_read = 0
+        self.truncated = False
+        # seconds from the request being sent to the response headers, set by the loader
+        self.latency = None
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        chunks = self.response.content.iter_chunked(self.chunk_size)
+
+        while True:
+            try:
+                chunk = await anext(chunks)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError as error:
+                # the body stalled or trickled in for too long - the page is failed rather than ripped from a fragment
+                raise FetchTimeoutException(timeout_kind(error), self.status) from error
+            except aiohttp.ClientError as error:
+                # the connection dropped or the body was malformed part way through - only this page fails
+                raise RequestFailedException(self.status) from error
+
+            if self.max_body_size is not None and self.bytes_read + len(chunk) > self.max_body_size:
+                # keep what fits, then drop the connection rather than draining the rest of the body
+                chunk = chunk[:self.max_body_size - self.bytes_read]
+                self.bytes_read += len(chunk)
+                self.truncated = True
+                self.response.close()
+
+                if chunk:
+                    yield chunk
+                return
+
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
 class PageLoader:
+    def __init__(self, config: PageLoaderConfiguration):
+        self.transport: Transport = config.transport
+        self.max_body_size: int = config.max_body_size
+        self.chunk_size: int = config.chunk_size
+        self.scheduler: PolitenessScheduler = config.scheduler
+        self.content_filter: ContentFilter = config.content_filter
+        self.metrics: CrawlMetrics = config.metrics
+        # the session's own timeouts cover connecting, stalls and the whole request
+        self.first_byte_timeout: float | None = config.transport.config.timeouts.first_byte
+
     @staticmethod
     def ensure_url_scheme(link: str) -> str:
-        parts = link.split("//", 1)
-
-        # if ['www.eg.com']  
-        if len(parts) == 1:
-            return f"http://{parts[0]}"
-            
-        # if ['', 'www.eg.com'] (aiohttp doesn't like //domain.com style blank schemes)
-        if parts[0] == "": 
-            return f"http://{parts[1]}"
-        
-        return link
+        # aiohttp needs an absolute url - links from the link processor are canonical already so this is a cache hit
+        normalised_link = normalise_url(link)
+        return normalised_link if normalised_link is not None else link
 
-    async def load_html(self, url) -> list:
+    @asynccontextmanager
+    async def open_html(self, url: str, headers: dict = None) -> AsyncIterator[PageStream]:
         """
-        load_html
+        open_html
 
         Args:
             url: the url to load
+            headers: extra request headers i.e. If-None-Match
 
         Returns:
-            list[bytes]: lines of html as bytes
+            PageStream: the open response, the body is only downloaded as the stream is iterated
         """
-        
+
         url = self.ensure_url_scheme(url)
 
-        # filter common invalid files
-        for extension in _invalid_patterns:
-            if extension in url:
-                raise InvalidContentTypeException
+        # filter links that are known not to be pages i.e. stylesheets, images
+        if self.content_filter.classify(url) == DENY:
+            raise InvalidContentTypeException
+
+        # the session is shared across the crawl - connections are returned to the pool on exit
+        session = self.transport.get_session()
+
+        host = urlsplit(url).hostname or ""
+        max_retries = self.scheduler.max_retries if self.scheduler is not None else 0
+
+        for attempt in range(max_retries + 1):
+            if self.scheduler is not None:
+                await self.scheduler.wait_turn(host)
+
+            started = time.monotonic()
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
+            try:
+                async with asyncio.timeout(self.first_byte_timeout) as first_byte:
+                    response = await session.get(url, headers=headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if not is_transient(error):
+                    # redirect loops, redirects to non http links etc. fail the same way on every attempt
+                    raise RequestFailedException(getattr(error, "status", None)) from error
 
+                kind = FIRST_BYTE_TIMEOUT if first_byte.expired() else timeout_kind(error)
+                if kind is not None:
+                    self.metrics.record_timeout(kind, url, time.monotonic() - started)
+
+                if self.scheduler is None:
+                    raise (FetchTimeoutException(kind) if kind is not None else RequestFailedException()) from error
+
+                self.scheduler.record_error(host)
+                if attempt == max_retries:
+                    raise (FetchTimeoutException(kind) if kind is not None else RequestFailedException()) from error
+
+                self.metrics.increment("retries")
+                await asyncio.sleep(self.scheduler.retry_delay(attempt))
+                continue
+
+            async with response:
+                retry_after = response.headers.get("Retry-After")
+                retry = False
+
+                if self.scheduler is not None:
+                    self.scheduler.record_response(host, response.status, time.monotonic() - started, retry_after)
+                    retry = self.scheduler.should_retry(response.status) and attempt < max_retries
+
+                if not retry:
+                    # only a revalidation has a cached copy to fall back on, any other 304 is a failed request
+                    if response.status == 304 and is_conditional(headers):
+                        raise NotModifiedException
+
+                    if response.status < 200 or response.status > 299:
+                        raise RequestFailedException(response.status)
+
+                    if not self.content_filter.is_html(response.headers.get("Content-Type", "")):
+                        # drop the connection without reading the body - it could be a large download
+                        response.close()
+                        raise InvalidContentTypeException
+
+                    page = PageStream(response, self.max_body_size, self.chunk_size)
+                    page.latency = time.monotonic() - started
+                    body_started = time.monotonic()
+
+                    try:
+                        yield page
+                    except RequestFailedException as error:
+                        # the body failed part way through - the page may have been partly ripped so it isn't retried
+                        if isinstance(error, FetchTimeoutException):
+                            self.metrics.record_timeout(error.kind, url, time.monotonic() - started)
+                        if self.scheduler is not None:
+                            self.scheduler.record_error(host)
+                        raise
+                    finally:
+                        # pages ripped as they stream include the ripping in their download time
+                        self.metrics.observe(DOWNLOAD, time.monotonic() - body_started)
+                        self.metrics.increment("bytes", page.bytes_read)
+                    return
+
+            self.metrics.increment("retries")
+
+            # throttled or a transient server error - the response has been released before waiting to retry
+            await asyncio.sleep(self.scheduler.retry_delay(attempt, retry_after))
+
+    async def probe_html(self, url: str) -> bool:
+        """
+        Checks whether the url is a page with a HEAD request, without downloading anything.
+        Anything inconclusive (errors, servers that don't support HEAD) counts as a page so the GET can decide.
+        """
+        url = self.ensure_url_scheme(url)
+        host = urlsplit(url).hostname or ""
+
+        if self.scheduler is not None:
+            await self.scheduler.wait_turn(host)
+
+        try:
+            async with self.transport.get_session().head(url, allow_redirects=True) as response:
                 if response.status < 200 or response.status > 299:
-                    raise RequestFailedException
+                    return True
+
+                content_type = response.headers.get("Content-Type")
+                return content_type is None or self.content_filter.is_html(content_type)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return True
+
+    async def load_html(self, url) -> list:
+        """
+        load_html
+
+        Args:
+            url: the url to load
+
+        Returns:
+            list[bytes]: lines of html as bytes
+        """
+
+        async with self.open_html(url) as page:
+            content = b"".join([chunk async for chunk in page.iter_chunks()])
+
+        return content.splitlines(keepends=True)
 
-                if "text/html" not in response.headers.get("Content-Type"):
-                    raise InvalidContentTypeException
-                
-                # pull complete lines from StreamReader before returning
-                return [line async for line in response.content]
-                
 
-def construct_page_loader(_) -> PageLoader:
-    return PageLoader()
\ No newline at end of file
+def construct_page_loader(config: PageLoaderConfiguration) -> PageLoader:
+    return PageLoader(config)
\ No newline at end of file
@@ -0,0 +1,79 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from link_ripper.ripper import LinkRipperConfiguration, construct_link_ripper
+from url_normaliser.normaliser import UrlNormaliser, UrlNormaliserConfiguration
+
+# per process state - set once by init_worker when a worker process starts, so each task only carries the page
+_ripper_config: LinkRipperConfiguration = None
+_normaliser: UrlNormaliser = None
+
+
+class ParsePoolConfiguration:
+    def __init__(self, workers: int, ripper_config: LinkRipperConfiguration = None, normaliser_config: UrlNormaliserConfiguration = None):
+        # number of parser processes
+        self.workers = workers
+        # sent to each worker once, the worker's normaliser keeps its own cache
+        self.ripper_config = ripper_config if ripper_config is not None else LinkRipperConfiguration()
+        self.normaliser_config = normaliser_config if normaliser_config is not None else UrlNormaliserConfiguration()
+
+
+def init_worker(ripper_config: LinkRipperConfiguration, normaliser_config: UrlNormaliserConfiguration):
+    global _ripper_config, _normaliser
+
+    _ripper_config = ripper_config
+    _normaliser = UrlNormaliser(normaliser_config)
+
+
+def parse_page(content: bytes, page_link: str, charset: str = None) -> list[str]:
+    """
+    Rips and normalises every link on a page - runs in a worker process, so it only takes and returns picklable values.
+
+    Returns:
+        the page's canonical links, in page order without duplicates
+    """
+    ripper = construct_link_ripper(_ripper_config, charset)
+    found_links = ripper.feed(content) + ripper.close()
+
+    # a <base href> anywhere on the page applies to every link on it
+    parent_link = page_link
+    if ripper.base_link is not None:
+        parent_link = _normaliser.normalise(ripper.base_link, page_link) or page_link
+
+    links = {}
+    for found_link in found_links:
+        link = _normaliser.normalise(found_link, parent_link)
+        if link is not None:
+            links[link] = None
+
+    return list(links)
+
+
+class ParsePool:
+    """
+    Process pool that link ripping and normalisation are handed to, so parsing runs on every core while
+    fetching stays on the event loop. Pages are parsed whole - the body is buffered before it is sent to a worker.
+    """
+    def __init__(self, config: ParsePoolConfiguration):
+        self.config = config
+        self.executor: ProcessPoolExecutor | None = None
+
+    def open(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.config.workers,
+                initializer=init_worker,
+                initargs=(self.config.ripper_config, self.config.normaliser_config),
+            )
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def parse(self, content: bytes, page_link: str, charset: str = None) -> list[str]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, parse_page, content, page_link, charset)
+
+
+def construct_parse_pool(config: ParsePoolConfiguration) -> ParsePool:
+    return ParsePool(config)
@@ -0,0 +1,169 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# statuses that mean "try again later" rather than "this page is broken"
+_throttle_statuses = frozenset([429, 503])
+_retry_statuses = frozenset([429, 500, 502, 503, 504])
+
+
+class PolitenessConfiguration:
+    def __init__(self, requests_per_second: float = 10.0, burst: int = 10, min_requests_per_second: float = 0.5,
+                 latency_threshold: float = 2.0, max_retries: int = 3, retry_base_delay: float = 0.5,
+                 retry_max_delay: float = 30.0, max_retry_after: float = 300.0):
+        # per host ceiling, 0 removes the rate limit (backoff and Retry-After are still honoured)
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        # adaptive backoff never slows a host below this
+        self.min_requests_per_second = min_requests_per_second
+        # seconds to first byte - a host responding slower than this is slowed down
+        self.latency_threshold = latency_threshold
+        # attempts after the first for throttled responses, 5xx, connection errors and timeouts
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        # longest Retry-After that will be waited for
+        self.max_retry_after = max_retry_after
+
+
+class HostState:
+    """
+    Token bucket for a single host whose rate adapts to how the host is coping:
+    - throttling responses (429/503) halve the rate, slow responses reduce it by a quarter
+    - every other successful response adds back a twentieth of the ceiling (AIMD)
+    Retry-After and Crawl-delay block the host outright until they have passed.
+    """
+    def __init__(self, config: PolitenessConfiguration):
+        self.config = config
+        self.max_rate = config.requests_per_second
+        self.rate = self.max_rate
+        self.tokens = float(config.burst)
+        self.updated = time.monotonic()
+
+        self.blocked_until = 0.0
+        # minimum seconds between requests i.e. robots.txt Crawl-delay
+        self.min_delay = 0.0
+        self.last_request = 0.0
+        self.latency = None
+
+        # waiters are served in arrival order
+        self.lock = asyncio.Lock()
+
+    def refill(self, now: float):
+        self.tokens = min(float(self.config.burst), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                wait = max(self.blocked_until - now, self.last_request + self.min_delay - now, 0.0)
+
+                if self.max_rate > 0:
+                    self.refill(now)
+                    if self.tokens < 1:
+                        wait = max(wait, (1 - self.tokens) / self.rate)
+
+                if wait <= 0:
+                    if self.max_rate > 0:
+                        self.tokens -= 1
+                    self.last_request = now
+                    return
+
+                await asyncio.sleep(wait)
+
+    def record_response(self, status: int, latency: float, retry_after: float = None):
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+        if retry_after is not None:
+            self.block(retry_after)
+
+        if self.max_rate <= 0:
+            return
+
+        if status in _throttle_statuses:
+            self.slow_down(0.5)
+        elif self.latency > self.config.latency_threshold:
+            self.slow_down(0.75)
+        elif status < 500:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def record_error(self):
+        if self.max_rate > 0:
+            self.slow_down(0.5)
+
+    def slow_down(self, factor: float):
+        self.rate = max(self.config.min_requests_per_second, self.rate * factor)
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + min(seconds, self.config.max_retry_after))
+
+
+class PolitenessScheduler:
+    """
+    Paces requests per host and decides when failed requests are retried
+    """
+    def __init__(self, config: PolitenessConfiguration = None):
+        self.config = config if config is not None else PolitenessConfiguration()
+        self.hosts: dict[str, HostState] = {}
+        self.max_retries = self.config.max_retries
+
+    def host_state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(self.config)
+        return state
+
+    async def wait_turn(self, host: str):
+        await self.host_state(host).acquire()
+
+    def record_response(self, host: str, status: int, latency: float, retry_after: str = None):
+        self.host_state(host).record_response(status, latency, parse_retry_after(retry_after))
+
+    def record_error(self, host: str):
+        self.host_state(host).record_error()
+
+    def set_min_delay(self, host: str, seconds: float):
+        self.host_state(host).min_delay = seconds
+
+    @staticmethod
+    def should_retry(status: int) -> bool:
+        return status in _retry_statuses
+
+    def retry_delay(self, attempt: int, retry_after: str = None) -> float:
+        # exponential backoff with full jitter, so retries from many workers don't line up
+        delay = random.uniform(0, min(self.config.retry_max_delay, self.config.retry_base_delay * 2 ** attempt))
+
+        retry_after_seconds = parse_retry_after(retry_after)
+        if retry_after_seconds is not None:
+            delay = max(delay, min(retry_after_seconds, self.config.max_retry_after))
+
+        return delay
+
+
+def parse_retry_after(value: str) -> float | None:
+    """
+    Retry-After is either a number of seconds or a http date
+    """
+    if value is None:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def construct_politeness_scheduler(config: PolitenessConfiguration) -> PolitenessScheduler:
+    return PolitenessScheduler(config)
@@ -0,0 +1,39 @@
+"""
+Assembles the original single-dict json output from a streamed ndjson output, or from the outputs of every node
+of a distributed krawl
+
+Usage (from src):
+    python -m result_writer.assemble <krawl.ndjson[.gz]> [<node-2.ndjson[.gz]> ...] [-o <krawl.json>]
+"""
+import argparse
+import json
+
+from result_writer.writer import read_records
+
+
+def assemble(*paths: str) -> dict:
+    registered_links = {}
+
+    for path in paths:
+        for record in read_records(path):
+            registered_links[record["url"]] = record["links"]
+
+    return registered_links
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Krawler - assemble json output from ndjson output")
+    parser.add_argument('input', nargs='+', help="ndjson outputs of a krawl (optionally gzipped)")
+    parser.add_argument('-o', '--output', default=None, help="json file to write (default: input name with .json)")
+    args = parser.parse_args()
+
+    output = args.output
+    if output is None:
+        output = args.input[0].removesuffix(".gz").removesuffix(".ndjson") + ".json"
+
+    with open(output, 'w') as file:
+        json.dump(assemble(*args.input), file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
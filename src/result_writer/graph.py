@@ -0,0 +1,346 @@
+"""
+Link graph output
+
+A krawl's pages and links as a binary columnar file - every url is stored once in a string table and referred to
+by its integer id, links are CSR (compressed sparse row) adjacency arrays in both directions and per page metadata
+is kept in columns. KrawlGraph memory maps the file, so out-links and in-links of a url are answered by reading a
+few slices of it rather than parsing the whole output.
+
+Layout (little-endian, every section aligned to 8 bytes):
+    header          magic, version, node count, edge count, then (offset, length) of each section
+    string_offsets  u64[nodes + 1]   url i is strings[string_offsets[i]:string_offsets[i + 1]], utf-8
+    strings         bytes
+    sorted_ids      u32[nodes]       ids in url order, for looking urls up with a binary search
+    out_offsets     u64[nodes + 1]   links on page i are out_targets[out_offsets[i]:out_offsets[i + 1]], in page order
+    out_targets     u32[edges]
+    in_offsets      u64[nodes + 1]   pages linking to i are in_sources[in_offsets[i]:in_offsets[i + 1]]
+    in_sources      u32[edges]
+    flags           u8[nodes]        CRAWLED, BEYOND_LIMIT - neither for links that were found but not krawled
+    status          u16[nodes]       final response status, 0 when unknown
+    depth           i32[nodes]       -1 when unknown
+    bytes           u64[nodes]       body bytes downloaded
+    latency         f32[nodes]       seconds from the request to the response headers, nan when unknown
+
+Usage (from src):
+    python -m result_writer.graph convert <krawl.json | krawl.ndjson[.gz]> [-o <krawl.graph>]
+    python -m result_writer.graph query <krawl.graph> [--out URL] [--in URL] [--page URL]
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterator
+
+from result_writer.writer import GRAPH, ResultWriterConfiguration, default_path, read_output, read_records
+
+_magic = b"KRAWLGRF"
+_version = 1
+
+# section name, array typecode
+_sections = [
+    ("string_offsets", "Q"),
+    ("strings", "B"),
+    ("sorted_ids", "I"),
+    ("out_offsets", "Q"),
+    ("out_targets", "I"),
+    ("in_offsets", "Q"),
+    ("in_sources", "I"),
+    ("flags", "B"),
+    ("status", "H"),
+    ("depth", "i"),
+    ("bytes", "Q"),
+    ("latency", "f"),
+]
+
+_header = struct.Struct("<8sIIQ" + "QQ" * len(_sections))
+
+# node flags
+CRAWLED = 1
+BEYOND_LIMIT = 2
+
+_beyond_limit = "not processed - recursion limit reached"
+
+
+def align(file):
+    file.write(b"\0" * (-file.tell() % 8))
+
+
+def write_section(file, values: array | bytes) -> tuple[int, int]:
+    align(file)
+    offset = file.tell()
+
+    if isinstance(values, array) and sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    file.write(values)
+    return offset, file.tell() - offset
+
+
+def compressed_rows(node_count: int, rows: array, values: array) -> tuple[array, array]:
+    """
+    CSR arrays from parallel (row, value) arrays - values keep their order within each row
+    """
+    offsets = array("Q", bytes(8 * (node_count + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for node in range(node_count):
+        offsets[node + 1] += offsets[node]
+
+    ordered = array("I", bytes(4 * len(values)))
+    cursors = array("Q", offsets[:-1])
+    for row, value in zip(rows, values):
+        ordered[cursors[row]] = value
+        cursors[row] += 1
+
+    return offsets, ordered
+
+
+def write_graph(records, path: str):
+    """
+    Writes the graph of {"url", "links", and optionally "status", "depth", "bytes", "latency"} records - ids are
+    given to urls in the order they are first seen, so pages keep the order of the output they came from
+    """
+    ids: dict[str, int] = {}
+    urls: list[bytes] = []
+    columns = {name: array(typecode) for name, typecode in _sections[-5:]}
+    defaults = {"flags": 0, "status": 0, "depth": -1, "bytes": 0, "latency": math.nan}
+
+    def intern(url: str) -> int:
+        node = ids.get(url)
+        if node is None:
+            node = ids[url] = len(urls)
+            urls.append(url.encode("utf-8"))
+            for name, column in columns.items():
+                column.append(defaults[name])
+        return node
+
+    sources = array("I")
+    targets = array("I")
+
+    for record in records:
+        page = intern(record["url"])
+        # a page recorded twice (i.e. in flight when a resumed krawl stopped) keeps its first record
+        if columns["flags"][page]:
+            continue
+
+        links = record["links"]
+        if isinstance(links, list):
+            columns["flags"][page] = CRAWLED
+            for link in links:
+                sources.append(page)
+                targets.append(intern(link))
+        else:
+            columns["flags"][page] = BEYOND_LIMIT
+
+        for name in ("status", "depth", "bytes", "latency"):
+            if record.get(name) is not None:
+                columns[name][page] = record[name]
+
+    node_count = len(urls)
+    string_offsets = array("Q", [0])
+    for url in urls:
+        string_offsets.append(string_offsets[-1] + len(url))
+
+    sorted_ids = array("I", sorted(range(node_count), key=urls.__getitem__))
+    out_offsets, out_targets = compressed_rows(node_count, sources, targets)
+    in_offsets, in_sources = compressed_rows(node_count, targets, sources)
+
+    sections = {
+        "string_offsets": string_offsets,
+        "strings": b"".join(urls),
+        "sorted_ids": sorted_ids,
+        "out_offsets": out_offsets,
+        "out_targets": out_targets,
+        "in_offsets": in_offsets,
+        "in_sources": in_sources,
+        **columns,
+    }
+
+    # written alongside and swapped in once complete, so a reader never maps a half written graph
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(temporary_path, "wb") as file:
+        file.write(bytes(_header.size))
+        locations = [write_section(file, sections[name]) for name, _ in _sections]
+
+        file.seek(0)
+        file.write(_header.pack(_magic, _version, node_count, len(targets), *[value for location in locations for value in location]))
+
+    os.replace(temporary_path, path)
+
+
+class GraphResultWriter:
+    """
+    Streams pages to a spill file as they complete, like a spilled json output, and builds the graph from it once
+    the crawl has finished - the spill is what a resumed crawl adds to. Per page metadata is only kept by this output.
+    """
+    streaming = True
+
+    def __init__(self, config: ResultWriterConfiguration):
+        self.path = config.path if config.path is not None else default_path(GRAPH, False)
+        self.append = config.append
+        self.spill_path = self.path + ".spill"
+        self.spill_file = None
+
+    def open(self):
+        self.spill_file = open(self.spill_path, "a" if self.append else "w", encoding="utf-8")
+
+    def write_page(self, link: str, contained_links, metadata: dict = None):
+        self.spill_file.write(json.dumps({"url": link, "links": contained_links, **(metadata or {})}) + "\n")
+
+    def close(self, _: dict = None):
+        if self.spill_file is None:
+            return
+
+        self.spill_file.close()
+        self.spill_file = None
+
+        write_graph(read_records(self.spill_path), self.path)
+        os.remove(self.spill_path)
+
+
+class KrawlGraph:
+    """
+    Reads a graph output through a memory map - only the parts of the file a query touches are read from disk.
+
+        with KrawlGraph("krawl.graph") as graph:
+            graph.out_links("https://www.example.com/")
+            graph.in_links("https://www.example.com/about")
+    """
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise ValueError("graph outputs are little-endian and are mapped as they are, they can't be read on this machine")
+
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.node_count, self.edge_count, *locations = _header.unpack_from(self.map) if len(self.map) >= _header.size else [None] * 4
+        if magic != _magic or version != _version:
+            self.close()
+            raise ValueError(f"{path} isn't a version {_version} krawl graph")
+
+        view = memoryview(self.map)
+        self.views = [view]
+        for (name, typecode), offset, length in zip(_sections, locations[0::2], locations[1::2]):
+            section = view[offset:offset + length].cast(typecode)
+            self.views.append(section)
+            setattr(self, name, section)
+
+    def close(self):
+        # the views have to be released before the map can be closed
+        for view in reversed(getattr(self, "views", [])):
+            view.release()
+        self.views = []
+
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def url(self, node: int) -> str:
+        return self.url_bytes(node).decode("utf-8")
+
+    def url_bytes(self, node: int) -> bytes:
+        return bytes(self.strings[self.string_offsets[node]:self.string_offsets[node + 1]])
+
+    def node(self, url: str) -> int | None:
+        """
+        Id of the url, None if it isn't in the graph
+        """
+        key = url.encode("utf-8")
+        index = bisect_left(self.sorted_ids, key, key=self.url_bytes)
+
+        if index < self.node_count and self.url_bytes(self.sorted_ids[index]) == key:
+            return self.sorted_ids[index]
+        return None
+
+    def out_ids(self, node: int) -> memoryview:
+        return self.out_targets[self.out_offsets[node]:self.out_offsets[node + 1]]
+
+    def in_ids(self, node: int) -> memoryview:
+        return self.in_sources[self.in_offsets[node]:self.in_offsets[node + 1]]
+
+    def out_links(self, url: str) -> list[str]:
+        node = self.node(url)
+        return [self.url(target) for target in self.out_ids(node)] if node is not None else []
+
+    def in_links(self, url: str) -> list[str]:
+        node = self.node(url)
+        return [self.url(source) for source in self.in_ids(node)] if node is not None else []
+
+    def page(self, url: str) -> dict | None:
+        node = self.node(url)
+        if node is None:
+            return None
+
+        latency = self.latency[node]
+        return {
+            "crawled": bool(self.flags[node] & CRAWLED),
+            "beyond_limit": bool(self.flags[node] & BEYOND_LIMIT),
+            "status": self.status[node] or None,
+            "depth": self.depth[node] if self.depth[node] >= 0 else None,
+            "bytes": self.bytes[node],
+            "latency": latency if not math.isnan(latency) else None,
+        }
+
+    def items(self) -> Iterator[tuple[str, list | str]]:
+        """
+        (link, contained links) of every page in the order of the output it was written from, like the json output
+        """
+        for node in range(self.node_count):
+            if self.flags[node] & CRAWLED:
+                yield self.url(node), [self.url(target) for target in self.out_ids(node)]
+            elif self.flags[node] & BEYOND_LIMIT:
+                yield self.url(node), _beyond_limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Krawler - link graph output")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="Write the graph of a json or ndjson output")
+    convert.add_argument('input', help="json or ndjson output of a krawl (optionally gzipped)")
+    convert.add_argument('-o', '--output', default=None, help="graph file to write (default: input name with .graph)")
+
+    query = commands.add_parser("query", help="Look urls up in a graph")
+    query.add_argument('input', help="graph output of a krawl")
+    query.add_argument('--out', action='append', default=[], help="Print the links on this page (repeatable)")
+    query.add_argument('--in', dest='in_', action='append', default=[], help="Print the pages linking to this url (repeatable)")
+    query.add_argument('--page', action='append', default=[], help="Print what is known about this url (repeatable)")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        output = args.output
+        if output is None:
+            output = args.input.removesuffix(".gz").removesuffix(".ndjson").removesuffix(".json") + ".graph"
+
+        write_graph(({"url": url, "links": links} for url, links in read_output(args.input).items()), output)
+        return
+
+    with KrawlGraph(args.input) as graph:
+        if not (args.out or args.in_ or args.page):
+            print(json.dumps({"nodes": len(graph), "edges": graph.edge_count}))
+
+        for url in args.out:
+            print(json.dumps({"url": url, "out": graph.out_links(url)}))
+        for url in args.in_:
+            print(json.dumps({"url": url, "in": graph.in_links(url)}))
+        for url in args.page:
+            print(json.dumps({"url": url, "page": graph.page(url)}))
+
+
+if __name__ == '__main__':
+    main()
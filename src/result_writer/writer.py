@@ -0,0 +1,157 @@
+import gzip
+import json
+import os
+from datetime import datetime
+
+JSON = "json"
+NDJSON = "ndjson"
+GRAPH = "graph"
+
+_extensions = {JSON: ".json", NDJSON: ".ndjson", GRAPH: ".graph"}
+
+
+class ResultWriterConfiguration:
+    def __init__(self, path: str = None, output_format: str = JSON, compress: bool = False, append: bool = False, spill: bool = False):
+        # None writes to a timestamped file in the working directory, or to the interrupted crawl's output when resuming
+        self.path = path
+        self.output_format = output_format
+        # gzip the output - not for graph outputs, which are memory mapped when read
+        self.compress = compress
+        # add to an existing output rather than replacing it - used when resuming a crawl
+        self.append = append
+        # json only - pages are written to a spill file as they complete and assembled into the json output at the end
+        self.spill = spill
+
+
+def default_path(output_format: str, compress: bool) -> str:
+    dt = datetime.now()
+    return dt.strftime('krawl_%h-%m-%d_%H-%M-%S') + _extensions[output_format] + (".gz" if compress else "")
+
+
+def open_output(path: str, mode: str, compress: bool):
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class JsonResultWriter:
+    """
+    The original output - one indented {link: contained links} dict written once the crawl has finished.
+    Every page's links stay in memory until then, unless they are spilled: pages are then streamed to an ndjson
+    spill file next to the output and the dict is written from it record by record.
+    """
+    def __init__(self, config: ResultWriterConfiguration):
+        self.path = config.path if config.path is not None else default_path(JSON, config.compress)
+        self.compress = config.compress
+        self.append = config.append
+
+        self.streaming = config.spill
+        self.spill_path = self.path + ".spill"
+        self.spill_file = None
+
+    def open(self):
+        if self.streaming:
+            # a resumed crawl keeps the pages spilled by the interrupted one
+            self.spill_file = open_output(self.spill_path, "a" if self.append else "w", False)
+
+    def write_page(self, link: str, contained_links, _: dict = None):
+        if self.spill_file is not None:
+            self.spill_file.write(json.dumps({"url": link, "links": contained_links}) + "\n")
+
+    def close(self, registered_links: dict):
+        if not self.streaming:
+            with open_output(self.path, "w", self.compress) as file:
+                json.dump(registered_links, file, indent=2)
+            return
+
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+        with open_output(self.path, "w", self.compress) as file:
+            write_json_records(file, read_records(self.spill_path))
+
+        os.remove(self.spill_path)
+
+
+def write_json_records(file, records):
+    # writes the same text as json.dump({url: links, ...}, indent=2) without building the dict
+    separator = "{\n"
+    for record in records:
+        links = json.dumps(record["links"], indent=2).replace("\n", "\n  ")
+        file.write(f"{separator}  {json.dumps(record['url'])}: {links}")
+        separator = ",\n"
+
+    file.write("{}" if separator == "{\n" else "\n}")
+
+
+class NdjsonResultWriter:
+    """
+    Streams one json record per page as each page completes:
+        {"url": "<link>", "links": list[str](contained-links) | "not processed - recursion limit reached"}
+    Each record is flushed as it is written so the file can be tailed while the crawl runs, and page links don't
+    need to be kept in memory. Records are in completion order.
+    """
+    streaming = True
+
+    def __init__(self, config: ResultWriterConfiguration):
+        self.path = config.path if config.path is not None else default_path(NDJSON, config.compress)
+        self.compress = config.compress
+        self.append = config.append
+        self.file = None
+
+    def open(self):
+        self.file = open_output(self.path, "a" if self.append else "w", self.compress)
+
+    def write_page(self, link: str, contained_links, _: dict = None):
+        self.file.write(json.dumps({"url": link, "links": contained_links}) + "\n")
+        # gzip files are sync-flushed, so complete records are readable as soon as they are written
+        self.file.flush()
+
+    def close(self, _: dict = None):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+_writers = {
+    JSON: JsonResultWriter,
+    NDJSON: NdjsonResultWriter,
+}
+
+
+def read_records(path: str):
+    compress = path.endswith(".gz")
+
+    with open_output(path, "r", compress) as file:
+        for line in file:
+            # a crawl that died mid-write can leave a partial last line
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def read_output(path: str) -> dict:
+    """
+    Reads a krawl's output back into a {link: contained links} dict, whichever format it was written in
+    """
+    if path.endswith(_extensions[GRAPH]):
+        from result_writer.graph import KrawlGraph
+        with KrawlGraph(path) as graph:
+            return dict(graph.items())
+
+    if path.removesuffix(".gz").endswith(_extensions[NDJSON]):
+        return {record["url"]: record["links"] for record in read_records(path)}
+
+    with open_output(path, "r", path.endswith(".gz")) as file:
+        return json.load(file)
+
+
+def construct_result_writer(config: ResultWriterConfiguration):
+    if config.output_format == GRAPH:
+        # imported when used, the graph module builds on this one
+        from result_writer.graph import GraphResultWriter
+        return GraphResultWriter(config)
+
+    return _writers[config.output_format](config)
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import re
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from http_transport.transport import Transport
+from page_loader.loader import is_transient
+from politeness.scheduler import PolitenessScheduler
+
+logger = logging.getLogger(__name__)
+
+# RFC 9309 - crawlers must parse at least 500 KiB, anything after that is ignored
+_max_robots_size = 512 * 1024
+
+
+class RobotsConfiguration:
+    def __init__(self, user_agent: str = None, max_crawl_delay: float = 60.0):
+        # the user agent whose product token is matched against robots.txt user-agent lines, None for the one the
+        # transport sends
+        self.user_agent = user_agent
+        # a Crawl-delay longer than this is capped rather than stalling the host
+        self.max_crawl_delay = max_crawl_delay
+
+
+class RobotsRules:
+    """
+    Compiled rules of the robots.txt group that applies to us.
+    Rules are sorted longest first with allow before disallow on equal length, so the first rule that matches
+    is the one RFC 9309 says wins (longest match, least restrictive on a tie) and the rest are never checked.
+    Plain rules are a str.startswith, only rules containing wildcards are compiled to a regex.
+    """
+    def __init__(self, rules: list[tuple[bool, str]] = None, crawl_delay: float = None, sitemaps: list[str] = None):
+        self.rules = []
+        for allow, pattern in sorted(rules or [], key=lambda rule: (-len(rule[1]), not rule[0])):
+            if "*" in pattern or pattern.endswith("$"):
+                self.rules.append((allow, None, compile_rule(pattern)))
+            else:
+                self.rules.append((allow, pattern, None))
+
+        self.crawl_delay = crawl_delay
+        self.sitemaps = sitemaps if sitemaps is not None else []
+
+    def allowed(self, path: str) -> bool:
+        for allow, prefix, pattern in self.rules:
+            if prefix is not None:
+                if path.startswith(prefix):
+                    return allow
+            elif pattern.match(path):
+                return allow
+
+        return True
+
+
+# served when robots.txt can't be read because the server is failing - RFC 9309 says to assume a complete disallow
+_disallow_all = RobotsRules([(False, "/")])
+
+
+def compile_rule(pattern: str) -> re.Pattern:
+    # `*` matches any run of characters and a trailing `$` anchors the end of the path
+    anchored = pattern.endswith("$")
+    if anchored:
+        pattern = pattern[:-1]
+
+    expression = ".*".join(re.escape(part) for part in pattern.split("*"))
+    return re.compile(expression + ("$" if anchored else ""), re.DOTALL)
+
+
+def product_token(user_agent: str) -> str:
+    # `Krawler/1.0 (+https://...)` -> `krawler`, RFC 9309 matches groups by the product token without case
+    return user_agent.split("/", 1)[0].strip().lower()
+
+
+def parse_robots(text: str, user_agent: str) -> RobotsRules:
+    """
+    Parses robots.txt, keeping the rules of the group whose user-agent is our product token, or the `*` group when
+    there isn't one. Sitemap lines are kept whichever group they appear in.
+    """
+    token = product_token(user_agent)
+
+    # user-agent -> (rules, crawl delay)
+    groups: dict[str, tuple[list, list]] = {}
+    sitemaps = []
+
+    current_agents = []
+    # consecutive user-agent lines share a group, the first rule line closes the list of agents
+    in_agents = False
+
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+
+        field, value = line.split(":", 1)
+        field = field.strip().lower()
+        value = value.strip()
+
+        if field == "user-agent":
+            if not in_agents:
+                current_agents = []
+                in_agents = True
+            agent = product_token(value)
+            current_agents.append(agent)
+            groups.setdefault(agent, ([], []))
+        elif field == "sitemap":
+            if value:
+                sitemaps.append(value)
+        elif field in ("allow", "disallow", "crawl-delay"):
+            in_agents = False
+            for agent in current_agents:
+                rules, crawl_delay = groups[agent]
+                if field == "crawl-delay":
+                    try:
+                        crawl_delay.append(float(value))
+                    except ValueError:
+                        pass
+                elif value:
+                    # an empty disallow allows everything, which is the default anyway
+                    rules.append((field == "allow", value))
+
+    if token and token != "*" and token in groups:
+        rules, crawl_delay = groups[token]
+    elif "*" in groups:
+        rules, crawl_delay = groups["*"]
+    else:
+        rules, crawl_delay = [], []
+
+    return RobotsRules(rules, crawl_delay[0] if crawl_delay else None, sitemaps)
+
+
+def robots_path(link: str) -> str:
+    parts = urlsplit(link)
+    path = parts.path or "/"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+class RobotsCache:
+    """
+    Fetches robots.txt once per origin and answers whether links may be crawled.
+    Concurrent checks against an origin that hasn't been fetched yet wait on the same fetch.
+    """
+    def __init__(self, config: RobotsConfiguration, transport: Transport, scheduler: PolitenessScheduler = None):
+        self.config = config
+        self.transport = transport
+        self.scheduler = scheduler
+        self.origins: dict[str, asyncio.Task] = {}
+        # groups are chosen for the agent the requests are made as
+        self.user_agent = config.user_agent if config.user_agent is not None else transport.config.user_agent
+
+    async def rules(self, link: str) -> RobotsRules:
+        parts = urlsplit(link)
+        origin = f"{parts.scheme}://{parts.netloc}"
+
+        task = self.origins.get(origin)
+        if task is None:
+            task = self.origins[origin] = asyncio.ensure_future(self.fetch(origin, parts.hostname or ""))
+
+        return await task
+
+    async def allowed(self, link: str) -> bool:
+        rules = await self.rules(link)
+        return rules.allowed(robots_path(link))
+
+    async def fetch(self, origin: str, host: str) -> RobotsRules:
+        # failing servers and connection errors are retried like pages, so one blip doesn't empty the krawl
+        max_retries = self.scheduler.max_retries if self.scheduler is not None else 0
+        rules = None
+
+        for attempt in range(max_retries + 1):
+            if self.scheduler is not None:
+                await self.scheduler.wait_turn(host)
+
+            started = time.monotonic()
+            retry_after = None
+
+            try:
+                async with self.transport.get_session().get(f"{origin}/robots.txt") as response:
+                    if self.scheduler is not None:
+                        self.scheduler.record_response(host, response.status, time.monotonic() - started, response.headers.get("Retry-After"))
+
+                    if response.status >= 500 or response.status == 429:
+                        failure = f"status {response.status}"
+                        retry_after = response.headers.get("Retry-After")
+                    elif response.status >= 400:
+                        # no robots.txt - everything may be crawled
+                        return RobotsRules()
+                    else:
+                        body = bytearray()
+                        async for chunk in response.content.iter_chunked(_max_robots_size):
+                            body.extend(chunk)
+                            if len(body) >= _max_robots_size:
+                                break
+
+                        rules = parse_robots(bytes(body[:_max_robots_size]).decode("utf-8", errors="replace"), self.user_agent)
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if self.scheduler is not None:
+                    self.scheduler.record_error(host)
+                failure = repr(error)
+                if not is_transient(error):
+                    break
+
+            if attempt < max_retries:
+                await asyncio.sleep(self.scheduler.retry_delay(attempt, retry_after))
+
+        if rules is None:
+            # RFC 9309 - a robots.txt that can't be reached means a complete disallow
+            logger.warning("robots.txt of %s couldn't be read (%s) - nothing on it will be krawled", origin, failure)
+            return _disallow_all
+
+        if rules.crawl_delay is not None and self.scheduler is not None:
+            self.scheduler.set_min_delay(host, min(rules.crawl_delay, self.config.max_crawl_delay))
+
+        return rules
+
+
+def construct_robots_cache(config: RobotsConfiguration, transport: Transport, scheduler: PolitenessScheduler = None) -> RobotsCache:
+    return RobotsCache(config, transport, scheduler)
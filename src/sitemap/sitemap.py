@@ -0,0 +1,163 @@
+import asyncio
+import zlib
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import aiohttp
+
+from http_transport.transport import Transport
+from politeness.scheduler import PolitenessScheduler
+
+_gzip_magic = b"\x1f\x8b"
+_chunk_size = 64 * 1024
+
+
+class SitemapConfiguration:
+    def __init__(self, links: list[str] = None, max_urls: int = 1_000_000, max_depth: int = 3, max_size: int = 50 * 1024 * 1024):
+        # sitemaps to read, None reads the ones listed in robots.txt or falls back to /sitemap.xml
+        self.links = links
+        # stops a runaway sitemap from filling the frontier
+        self.max_urls = max_urls
+        # sitemap indexes may point at further indexes, this bounds how far they are followed
+        self.max_depth = max_depth
+        # decompressed bytes read from a single sitemap - the protocol's own limit is 50MB
+        self.max_size = max_size
+
+
+class SitemapEntry:
+    def __init__(self, url: str, priority: float = None, lastmod: str = None):
+        self.url = url
+        self.priority = priority
+        self.lastmod = lastmod
+
+
+def local_name(tag: str) -> str:
+    # sitemaps are namespaced - `{http://www.sitemaps.org/schemas/sitemap/0.9}loc` becomes `loc`
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapParser:
+    """
+    Incremental sitemap parser, fed (possibly gzipped) chunks as they are downloaded.
+    Each <url>/<sitemap> element is cleared once it has been read so memory stays flat however big the sitemap is.
+    """
+    def __init__(self):
+        self.parser = XMLPullParser(events=("end",))
+        self.decompressor = None
+        self.sniffed = False
+        # decompressed bytes parsed so far
+        self.size = 0
+
+    def feed(self, chunk: bytes) -> tuple[list[SitemapEntry], list[str]]:
+        if not self.sniffed:
+            # gzip is detected from the content rather than the url - servers also send .xml.gz with Content-Encoding
+            self.sniffed = True
+            if chunk.startswith(_gzip_magic):
+                self.decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+        if self.decompressor is not None:
+            chunk = self.decompressor.decompress(chunk)
+
+        self.size += len(chunk)
+        self.parser.feed(chunk)
+        return self.read_events()
+
+    def close(self) -> tuple[list[SitemapEntry], list[str]]:
+        if self.decompressor is not None:
+            self.parser.feed(self.decompressor.flush())
+        self.parser.close()
+        return self.read_events()
+
+    def read_events(self) -> tuple[list[SitemapEntry], list[str]]:
+        entries = []
+        sitemaps = []
+
+        for _, element in self.parser.read_events():
+            name = local_name(element.tag)
+
+            if name not in ("url", "sitemap"):
+                continue
+
+            fields = {local_name(child.tag): (child.text or "").strip() for child in element}
+            loc = fields.get("loc")
+
+            if loc:
+                if name == "sitemap":
+                    sitemaps.append(loc)
+                else:
+                    entries.append(SitemapEntry(loc, parse_priority(fields.get("priority")), fields.get("lastmod")))
+
+            element.clear()
+
+        return entries, sitemaps
+
+
+def parse_priority(value: str) -> float | None:
+    try:
+        return min(1.0, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+class SitemapReader:
+    """
+    Streams the page urls listed in sitemaps, following sitemap indexes.
+    Sitemaps that can't be fetched or parsed are skipped - they only seed the crawl, the crawl doesn't depend on them.
+    """
+    def __init__(self, config: SitemapConfiguration, transport: Transport, scheduler: PolitenessScheduler = None):
+        self.config = config
+        self.transport = transport
+        self.scheduler = scheduler
+
+    async def iter_entries(self, sitemap_links: list[str]) -> AsyncIterator[SitemapEntry]:
+        pending = [(link, 0) for link in sitemap_links]
+        seen = set()
+        count = 0
+
+        while pending:
+            link, depth = pending.pop(0)
+            if link in seen or depth > self.config.max_depth:
+                continue
+            seen.add(link)
+
+            async for entry in self.iter_sitemap(link, lambda nested: pending.append((nested, depth + 1))):
+                yield entry
+
+                count += 1
+                if count >= self.config.max_urls:
+                    return
+
+    async def iter_sitemap(self, link: str, on_sitemap) -> AsyncIterator[SitemapEntry]:
+        if self.scheduler is not None:
+            await self.scheduler.wait_turn(urlsplit(link).hostname or "")
+
+        parser = SitemapParser()
+
+        try:
+            async with self.transport.get_session().get(link) as response:
+                if not 200 <= response.status < 300:
+                    return
+
+                async for chunk in response.content.iter_chunked(_chunk_size):
+                    entries, sitemaps = parser.feed(chunk)
+                    for sitemap in sitemaps:
+                        on_sitemap(sitemap)
+                    for entry in entries:
+                        yield entry
+
+                    if parser.size >= self.config.max_size:
+                        return
+
+            entries, sitemaps = parser.close()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ParseError, zlib.error):
+            return
+
+        for sitemap in sitemaps:
+            on_sitemap(sitemap)
+        for entry in entries:
+            yield entry
+
+
+def construct_sitemap_reader(config: SitemapConfiguration, transport: Transport, scheduler: PolitenessScheduler = None) -> SitemapReader:
+    return SitemapReader(config, transport, scheduler)
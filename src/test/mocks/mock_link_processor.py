@@ -0,0 +1,30 @@
+import asyncio
+
+
+class MockLinkProcessor:
+    """
+    Serves links from a fixed site map ({link: [contained links]}) and tracks how many links are processed at once
+    """
+    def __init__(self, site_map: dict):
+        self.site_map = site_map
+        self.processed_links = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.page_metadata = {"status": 200}
+
+    async def process_link(self, link: str) -> tuple[list, list]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        # yield so that other workers get the chance to overlap with this one
+        await asyncio.sleep(0)
+
+        self.processed_links.append(link)
+        self.in_flight -= 1
+
+        links = self.site_map.get(link, [])
+        return list(links), list(links)
+
+
+def construct_mock_link_processor(site_map: dict) -> MockLinkProcessor:
+    return MockLinkProcessor(site_map)
@@ -1,3 +1,6 @@
+from contextlib import asynccontextmanager
+
+
 class RequestFailedException(Exception):
     pass
 
@@ -6,6 +9,24 @@ class InvalidContentTypeException(Exception):
     pass
 
 
+class MockPageStream:
+    def __init__(self, url: str, chunks: list):
+        self.url = url
+        self.chunks = chunks
+        self.charset = "utf-8"
+        self.etag = None
+        self.last_modified = None
+        self.truncated = False
+        self.status = 200
+        self.latency = None
+        self.bytes_read = 0
+
+    async def iter_chunks(self):
+        for chunk in self.chunks:
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
 class MockPageLoader:
     __return_content = []
     called_link = ""
@@ -20,6 +41,12 @@ class MockPageLoader:
         # sets the called link for validation
         self.called_link = link
         return self.__return_content
+
+    @asynccontextmanager
+    async def open_html(self, link, headers: dict = None):
+        # each item of the return content is served as one chunk of the stream
+        self.called_link = link
+        yield MockPageStream(link, self.__return_content)
                 
 
 def construct_mock_page_loader(_) -> MockPageLoader:
@@ -1,11 +1,19 @@
+from contextlib import asynccontextmanager
 from typing import Callable
 
-class MockPooler:        
+class MockPooler:
+    """
+    Pool of a single instance that is handed to everyone at once - tests inspect it through `instance`
+    """
     def __init__(self, instance_constructor: Callable, instance_configuration: dict = {}):
         self.instance = instance_constructor(instance_configuration)
 
-    def get_instance_from_pool(self):
+    async def get_instance(self):
         return self.instance
-    
-    def return_instance_to_pool(self, _):
-        pass
\ No newline at end of file
+
+    def return_instance(self, _):
+        pass
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.instance
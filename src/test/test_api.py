@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+from contextlib import aclosing
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawl_api.api import CrawledPage, CrawlOptions, crawl, crawl_iter
+from test.common import test_out
+
+
+def construct_site(pages: int, latency: float = 0.0) -> web.Application:
+    # page n links to pages 2n + 1 and 2n + 2 - a binary tree of pages
+    async def handler(request: web.Request) -> web.Response:
+        index = int(request.match_info.get("index") or 0)
+        if index >= pages:
+            raise web.HTTPNotFound()
+
+        await asyncio.sleep(latency)
+        links = "".join(f"<a href='/page/{child}'>page</a>" for child in (2 * index + 1, 2 * index + 2))
+        return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    app.router.add_get("/page/{index}", handler)
+    return app
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = TestServer(construct_site(15), host="127.0.0.1")
+        await self.server.start_server()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    def options(self, server: TestServer = None, **overrides) -> CrawlOptions:
+        server = server if server is not None else self.server
+        return CrawlOptions("127.0.0.1", subdomain="", scheme="http", port=server.port, recursion_limit=-1, rate_limit=0,
+                            respect_robots=False, **overrides)
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(path))
+
+    async def test_crawl(self):
+        test_out.log_starting_test_set("API - test crawl")
+
+        fetched = []
+
+        async def record_async(page: CrawledPage):
+            await asyncio.sleep(0)
+            fetched.append(("async", page.url))
+
+        test_out.log_starting_test("results")
+        result = await crawl(self.options(on_page=[lambda page: fetched.append(("sync", page.url)), record_async]))
+
+        # 15 pages and the 16 missing pages they link to
+        self.assertEqual(len(result.pages), 31)
+        self.assertEqual(result.pages[self.url("/")], [self.url("/page/1"), self.url("/page/2")])
+        self.assertEqual(result.pages[self.url("/page/20")], [])
+        self.assertEqual(result.stats["counters"]["pages"], 31)
+
+        test_out.log_starting_test("hooks are called for every fetched page")
+        self.assertEqual(sorted(url for kind, url in fetched if kind == "sync"), sorted(result.pages))
+        self.assertEqual(sorted(url for kind, url in fetched if kind == "async"), sorted(result.pages))
+
+        test_out.log_starting_test("limits")
+        result = await crawl(self.options(max_pages=5, concurrency=1))
+        self.assertEqual(len(result.pages), 5)
+
+    async def test_crawl_iter(self):
+        test_out.log_starting_test_set("API - test crawl iter")
+
+        test_out.log_starting_test("every page is yielded once")
+        pages = [page async for page in crawl_iter(self.options(), buffer=2)]
+
+        self.assertEqual(len(pages), 31)
+        self.assertEqual(len({page.url for page in pages}), 31)
+
+        statuses = {page.url: page.status for page in pages}
+        self.assertEqual(statuses[self.url("/page/3")], 200)
+        self.assertEqual(statuses[self.url("/page/20")], 404)
+
+        test_out.log_starting_test("leaving early stops the krawl")
+        taken = []
+        # closed as the loop is left rather than whenever the generator is collected
+        async with aclosing(crawl_iter(self.options(concurrency=2), buffer=1)) as pages:
+            async for page in pages:
+                taken.append(page)
+                if len(taken) == 3:
+                    break
+
+        self.assertEqual(len(taken), 3)
+        # nothing is left running
+        await asyncio.sleep(0)
+        self.assertEqual([task for task in asyncio.all_tasks() if task is not asyncio.current_task()], [])
+
+        test_out.log_starting_test("errors raised by hooks stop the krawl")
+
+        def fail(page: CrawledPage):
+            if page.url.endswith("/page/4"):
+                raise ValueError(page.url)
+
+        with self.assertRaises(ValueError):
+            async for _ in crawl_iter(self.options(on_page=[fail])):
+                pass
+
+    async def test_concurrent_crawls(self):
+        test_out.log_starting_test_set("API - test concurrent crawls in one loop")
+
+        other = TestServer(construct_site(7, latency=0.01), host="127.0.0.1")
+        await other.start_server()
+        other_port = other.port
+
+        try:
+            first, second = await asyncio.gather(crawl(self.options()), crawl(self.options(other)))
+        finally:
+            await other.close()
+
+        self.assertEqual(len(first.pages), 31)
+        self.assertEqual(len(second.pages), 15)
+        self.assertTrue(all(f":{other_port}/" in link for link in second.pages))
@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawl_baseline.baseline import DIFF, HASHES, BaselineConfiguration, diff_krawls, sidecar_path
+from orchestrator.orchestrator import Orchestrator
+from politeness.scheduler import PolitenessConfiguration
+from result_writer.writer import NDJSON, ResultWriterConfiguration, read_output, read_records
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+
+def page(text: str, *links: str) -> str:
+    anchors = "".join(f"<a href='{link}'>link</a>" for link in links)
+    return f"<html><body><p>{text}</p>{anchors}</body></html>"
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        # {path: html} - changed between krawls
+        self.pages = {}
+
+        async def handler(request: web.Request) -> web.Response:
+            if request.path not in self.pages:
+                raise web.HTTPNotFound()
+            return web.Response(text=self.pages[request.path], content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        self.directory.cleanup()
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(path))
+
+    async def krawl(self, name: str, baseline: str = None, output_format: str = "json") -> Orchestrator:
+        path = os.path.join(self.directory.name, name)
+        orchestrator = Orchestrator("", "127.0.0.1", -1, concurrency=1, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                                    writer_config=ResultWriterConfiguration(path, output_format), politeness_config=PolitenessConfiguration(0),
+                                    baseline_config=BaselineConfiguration(baseline) if baseline is not None else None)
+        await orchestrator.crawl(self.url("/"))
+
+        return orchestrator
+
+    def test_diff(self):
+        test_out.log_starting_test_set("Baseline - test diff")
+
+        test_cases = [
+            {
+                "name": "identical",
+                "previous": {"/": ["/a"], "/a": []},
+                "current": {"/": ["/a"], "/a": []},
+                "changed": set(),
+                "expected": {"pages_added": [], "pages_removed": [], "pages_changed": [], "links_added": {}, "links_removed": {}},
+            },
+            {
+                "name": "pages and links added and removed",
+                "previous": {"/": ["/a", "/b"], "/a": [], "/b": []},
+                "current": {"/": ["/a", "/c"], "/a": ["/"], "/c": []},
+                "changed": {"/", "/a", "/c"},
+                "expected": {
+                    "pages_added": ["/c"],
+                    "pages_removed": ["/b"],
+                    "pages_changed": ["/", "/a"],
+                    "links_added": {"/": ["/c"], "/a": ["/"]},
+                    "links_removed": {"/": ["/b"]},
+                },
+            },
+            {
+                "name": "pages beyond the recursion limit are left out",
+                "previous": {"/": ["/a"], "/a": "not processed - recursion limit reached"},
+                "current": {"/": ["/a"], "/a": []},
+                "changed": set(),
+                "expected": {"pages_added": ["/a"], "pages_removed": [], "pages_changed": [], "links_added": {}, "links_removed": {}},
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+            self.assertEqual(diff_krawls(test_case["previous"], test_case["current"], test_case["changed"]), test_case["expected"])
+
+    def test_sidecar_path(self):
+        test_out.log_starting_test_set("Baseline - test sidecar path")
+
+        for output, expected in [("krawl.json", "krawl.hashes.ndjson"), ("out/krawl.ndjson.gz", "out/krawl.hashes.ndjson"), ("krawl", "krawl.hashes.ndjson")]:
+            test_out.log_starting_test(output)
+            self.assertEqual(sidecar_path(output, HASHES), expected)
+
+    async def test_incremental_krawl(self):
+        test_out.log_starting_test_set("Baseline - test incremental krawl")
+
+        self.pages = {
+            "/": page("home", "/a", "/b", "/c"),
+            "/a": page("a"),
+            "/b": page("b"),
+            "/c": page("c"),
+        }
+
+        test_out.log_starting_test("every krawl records content hashes")
+        first = await self.krawl("first.json")
+        hashes = list(read_records(os.path.join(self.directory.name, "first.hashes.ndjson")))
+
+        self.assertEqual([record["url"] for record in hashes], [self.url(path) for path in ["/", "/a", "/b", "/c"]])
+        # nothing to compare against - every page is new
+        self.assertTrue(all(record["changed"] for record in hashes))
+        self.assertIsNone(first.diff)
+
+        test_out.log_starting_test("unchanged pages aren't ripped again")
+        self.pages = {
+            "/": page("home", "/a", "/c"),
+            "/a": page("a"),
+            "/b": page("b"),
+            "/c": page("c changed", "/d"),
+            "/d": page("d"),
+        }
+
+        second = await self.krawl("second.ndjson", os.path.join(self.directory.name, "first.json"), NDJSON)
+        self.assertEqual(second.metrics.counters["pages_unchanged"], 1)
+
+        test_out.log_starting_test("the diff is written next to the output")
+        expected_diff = {
+            "baseline": os.path.join(self.directory.name, "first.json"),
+            "pages_added": [self.url("/d")],
+            "pages_removed": [self.url("/b")],
+            "pages_changed": [self.url("/"), self.url("/c")],
+            "links_added": {self.url("/c"): [self.url("/d")]},
+            "links_removed": {self.url("/"): [self.url("/b")]},
+        }
+        self.assertEqual(second.diff, expected_diff)
+
+        with open(os.path.join(self.directory.name, "second" + DIFF), encoding="utf-8") as file:
+            self.assertEqual(json.load(file), expected_diff)
+
+        test_out.log_starting_test("pages that changed last time are krawled first")
+        third = await self.krawl("third.json", os.path.join(self.directory.name, "second.ndjson"))
+
+        # /c and /d changed (or were new) last time, /a didn't
+        self.assertEqual(list(third.registered_links), [self.url(path) for path in ["/", "/c", "/d", "/a"]])
+        self.assertEqual(third.metrics.counters["pages_unchanged"], 4)
+        self.assertEqual(third.diff["pages_changed"], [])
+        # reused links are the same links
+        self.assertEqual(third.registered_links, read_output(os.path.join(self.directory.name, "second.ndjson")))
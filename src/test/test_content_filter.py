@@ -0,0 +1,161 @@
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from content_filter.filter import ALLOW, DENY, PROBE, ContentFilter, ContentFilterConfiguration
+from http_transport.transport import Transport, TransportConfiguration
+from instance_pooler.pooler import Pooler
+from link_processor.processor import LinkProcessor, LinkProcessorConfiguration
+from page_loader import loader
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliser, UrlNormaliserConfiguration
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    def test_classify(self):
+        test_out.log_starting_test_set("ContentFilter - test classify")
+
+        test_cases = [
+            {
+                "name": "defaults",
+                "config": ContentFilterConfiguration(),
+                "link_input_expected_output_pairs": {
+                    "https://www.example-domain.com/": ALLOW,
+                    "https://www.example-domain.com/about": ALLOW,
+                    "https://www.example-domain.com/about.php?page=style.css": ALLOW,
+                    "https://www.example-domain.com/index.HTML": ALLOW,
+                    "https://www.example-domain.com/v1.2/about": ALLOW,
+                    "https://www.example-domain.com/releases/version-1.2.3-final": ALLOW,
+                    "https://www.example-domain.com/style.css": DENY,
+                    "https://www.example-domain.com/style.css?v=3": DENY,
+                    "https://www.example-domain.com/favicon.ICO": DENY,
+                    "https://www.example-domain.com/report.pdf#page=2": DENY,
+                    "https://www.example-domain.com/cdn-cgi/l/email-protection": DENY,
+                    "https://www.example-domain.com/download.latest": PROBE,
+                }
+            },
+            {
+                "name": "extra extensions",
+                "config": ContentFilterConfiguration(allow_extensions=["xml"], deny_extensions=[".PHP", ".latest"]),
+                "link_input_expected_output_pairs": {
+                    "https://www.example-domain.com/feed.xml": ALLOW,
+                    "https://www.example-domain.com/about.php": DENY,
+                    "https://www.example-domain.com/download.latest": DENY,
+                    "https://www.example-domain.com/style.css": DENY,
+                }
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            content_filter = ContentFilter(test_case["config"])
+
+            for input_link, expected in test_case["link_input_expected_output_pairs"].items():
+                self.assertEqual(content_filter.classify(input_link), expected, input_link)
+
+    def test_is_html(self):
+        test_out.log_starting_test_set("ContentFilter - test is html")
+
+        content_filter = ContentFilter()
+
+        self.assertTrue(content_filter.is_html("text/html"))
+        self.assertTrue(content_filter.is_html("Text/HTML; charset=utf-8"))
+        self.assertTrue(content_filter.is_html("application/xhtml+xml"))
+        self.assertFalse(content_filter.is_html("image/png"))
+        self.assertFalse(content_filter.is_html(""))
+
+
+class LoaderTesting(unittest.IsolatedAsyncioTestCase):
+    """
+    Filters against a local server rather than the internet
+    """
+    async def asyncSetUp(self):
+        self.requests = []
+
+        async def page(request: web.Request) -> web.Response:
+            self.requests.append((request.method, request.path))
+            links = "<a href='/page'>page</a><a href='/style.css'>style</a><a href='/file.latest'>file</a><a href='/notes.latest'>notes</a>"
+            return web.Response(text=links, content_type="text/html")
+
+        async def download(request: web.Request) -> web.StreamResponse:
+            self.requests.append((request.method, request.path))
+            response = web.StreamResponse(headers={"Content-Type": "application/zip"})
+            await response.prepare(request)
+
+            if request.method == "GET":
+                # far more than is ever read
+                for _ in range(256):
+                    await response.write(b"x" * 64 * 1024)
+
+            return response
+
+        async def no_head(request: web.Request) -> web.Response:
+            self.requests.append((request.method, request.path))
+            if request.method == "HEAD":
+                return web.Response(status=405)
+            return web.Response(text="notes", content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/", page)
+        app.router.add_get("/page", page)
+        app.router.add_get("/file.latest", download)
+        app.router.add_get("/notes.latest", no_head)
+
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+        self.transport = Transport(TransportConfiguration())
+        await self.transport.open()
+
+        self.content_filter = ContentFilter(ContentFilterConfiguration(head_probe=True))
+        self.page_loader = loader.PageLoader(loader.PageLoaderConfiguration(self.transport, content_filter=self.content_filter))
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+        await self.server.close()
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(path))
+
+    async def test_open_html(self):
+        test_out.log_starting_test_set("ContentFilter - test open html")
+
+        test_out.log_starting_test("denied links aren't requested")
+        with self.assertRaises(loader.InvalidContentTypeException):
+            await self.page_loader.load_html(self.url("/style.css"))
+        self.assertEqual(self.requests, [])
+
+        test_out.log_starting_test("non html responses are abandoned")
+        with self.assertRaises(loader.InvalidContentTypeException):
+            await self.page_loader.load_html(self.url("/file.latest"))
+        self.assertEqual(self.requests, [("GET", "/file.latest")])
+
+    async def test_probe_html(self):
+        test_out.log_starting_test_set("ContentFilter - test probe html")
+
+        self.assertTrue(await self.page_loader.probe_html(self.url("/page")))
+        self.assertFalse(await self.page_loader.probe_html(self.url("/file.latest")))
+        # inconclusive - left to the GET
+        self.assertTrue(await self.page_loader.probe_html(self.url("/notes.latest")))
+        self.assertTrue(await self.page_loader.probe_html(self.url("/missing")))
+
+    async def test_process_link(self):
+        test_out.log_starting_test_set("ContentFilter - test process link")
+
+        page_loader_pool = Pooler(loader.construct_page_loader, loader.PageLoaderConfiguration(self.transport, content_filter=self.content_filter))
+        normaliser = UrlNormaliser(UrlNormaliserConfiguration(default_scheme="http"))
+        processor = LinkProcessor(LinkProcessorConfiguration(page_loader_pool, "", "127.0.0.1", normaliser, content_filter=self.content_filter))
+
+        all_links, local_links = await processor.process_link(self.url("/"))
+
+        self.assertEqual(all_links, [self.url("/page"), self.url("/style.css"), self.url("/file.latest"), self.url("/notes.latest")])
+        # the stylesheet is dropped by extension and the download by its HEAD probe
+        self.assertEqual(local_links, [self.url("/page"), self.url("/notes.latest")])
+        self.assertEqual(sorted(self.requests), [("GET", "/"), ("HEAD", "/file.latest"), ("HEAD", "/notes.latest")])
+
+        test_out.log_starting_test("links are only probed once")
+        self.requests.clear()
+        await processor.process_link(self.url("/page"))
+        self.assertEqual(self.requests, [("GET", "/page")])
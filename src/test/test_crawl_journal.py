@@ -0,0 +1,154 @@
+import os
+import tempfile
+import unittest
+
+from crawl_journal.journal import CrawlJournalConfiguration, journal_has_entries
+from orchestrator.orchestrator import Orchestrator
+from result_writer.writer import NDJSON, ResultWriterConfiguration, read_output
+from test.common import test_out
+from test.mocks.mock_link_processor import MockLinkProcessor, construct_mock_link_processor
+from test.mocks.mock_pooler import MockPooler
+
+_site_map = {
+    "https://www.example-domain.com/": ["https://www.example-domain.com/a", "https://www.example-domain.com/b"],
+    "https://www.example-domain.com/a": ["https://www.example-domain.com/a/1", "https://www.example-domain.com/a/2"],
+    "https://www.example-domain.com/b": ["https://www.example-domain.com/b/1"],
+    "https://www.example-domain.com/a/1": ["https://www.example-domain.com/a/1/x"],
+}
+
+# every page of the site map, including those without links
+_site_map_pages = [
+    "https://www.example-domain.com/",
+    "https://www.example-domain.com/a",
+    "https://www.example-domain.com/b",
+    "https://www.example-domain.com/a/1",
+    "https://www.example-domain.com/a/2",
+    "https://www.example-domain.com/b/1",
+    "https://www.example-domain.com/a/1/x",
+]
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+class CrashingLinkProcessor(MockLinkProcessor):
+    """
+    Processes the site map until it reaches crash_link, then raises as if the process had died
+    """
+    def __init__(self, site_map: dict, crash_link: str):
+        super().__init__(site_map)
+        self.crash_link = crash_link
+
+    async def process_link(self, link: str) -> tuple[list, list]:
+        if link == self.crash_link:
+            raise SimulatedCrash
+        return await super().process_link(link)
+
+
+def construct_orchestrator(journal_path: str, recursion_limit: int = -1, writer_config: ResultWriterConfiguration = None) -> Orchestrator:
+    journal_config = CrawlJournalConfiguration(journal_path, commit_interval=0)
+    return Orchestrator("www", "example-domain.com", recursion_limit, concurrency=1, journal_config=journal_config, writer_config=writer_config)
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.directory.name, "krawl.state")
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_resume(self):
+        test_out.log_starting_test_set("CrawlJournal - test resume")
+
+        # first run dies part way through
+        interrupted = construct_orchestrator(self.journal_path)
+        interrupted.link_processor_pool = MockPooler(lambda site_map: CrashingLinkProcessor(site_map, "https://www.example-domain.com/a/1"), _site_map)
+
+        with self.assertRaises(SimulatedCrash):
+            await interrupted.crawl("https://www.example-domain.com/")
+
+        first_processed = interrupted.link_processor_pool.instance.processed_links
+        self.assertEqual(first_processed, [
+            "https://www.example-domain.com/",
+            "https://www.example-domain.com/a",
+            "https://www.example-domain.com/b",
+        ])
+
+        # second run carries on from the journal
+        resumed = construct_orchestrator(self.journal_path)
+        resumed.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+        await resumed.crawl("https://www.example-domain.com/")
+
+        second_processed = resumed.link_processor_pool.instance.processed_links
+        self.assertEqual(second_processed, [
+            "https://www.example-domain.com/a/1",
+            "https://www.example-domain.com/a/2",
+            "https://www.example-domain.com/b/1",
+            "https://www.example-domain.com/a/1/x",
+        ])
+
+        # the resumed result matches an uninterrupted crawl, in the same order
+        uninterrupted = Orchestrator("www", "example-domain.com", -1, concurrency=1)
+        uninterrupted.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+        await uninterrupted.crawl("https://www.example-domain.com/")
+
+        self.assertEqual(list(resumed.registered_links.items()), list(uninterrupted.registered_links.items()))
+
+    async def test_resume_finished_crawl(self):
+        test_out.log_starting_test_set("CrawlJournal - test resume finished crawl")
+
+        finished = construct_orchestrator(self.journal_path, recursion_limit=3)
+        finished.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+        await finished.crawl("https://www.example-domain.com/")
+
+        resumed = construct_orchestrator(self.journal_path, recursion_limit=3)
+        resumed.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+        await resumed.crawl("https://www.example-domain.com/")
+
+        self.assertEqual(resumed.link_processor_pool.instance.processed_links, [])
+        self.assertEqual(resumed.registered_links, finished.registered_links)
+        self.assertEqual(resumed.registered_links["https://www.example-domain.com/a/1"], "not processed - recursion limit reached")
+
+    async def test_resume_output(self):
+        test_out.log_starting_test_set("CrawlJournal - test resume output")
+
+        output_path = os.path.join(self.directory.name, "krawl.ndjson")
+
+        interrupted = construct_orchestrator(self.journal_path, writer_config=ResultWriterConfiguration(output_path, NDJSON))
+        interrupted.link_processor_pool = MockPooler(lambda site_map: CrashingLinkProcessor(site_map, "https://www.example-domain.com/a/1"), _site_map)
+
+        with self.assertRaises(SimulatedCrash):
+            await interrupted.crawl("https://www.example-domain.com/")
+
+        test_out.log_starting_test("the resumed krawl appends to the interrupted krawl's output")
+        # no path given, as with --resume and no --output
+        resumed = construct_orchestrator(self.journal_path, writer_config=ResultWriterConfiguration(None, NDJSON, append=True))
+        resumed.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+        await resumed.crawl("https://www.example-domain.com/")
+
+        self.assertEqual(resumed.result_writer.path, output_path)
+        self.assertEqual(sorted(read_output(output_path)), sorted(_site_map_pages))
+
+    async def test_rerun_journal(self):
+        test_out.log_starting_test_set("CrawlJournal - test journal run again")
+
+        output_path = os.path.join(self.directory.name, "krawl.ndjson")
+        self.assertFalse(journal_has_entries(self.journal_path))
+
+        interrupted = construct_orchestrator(self.journal_path, writer_config=ResultWriterConfiguration(output_path, NDJSON))
+        interrupted.link_processor_pool = MockPooler(lambda site_map: CrashingLinkProcessor(site_map, "https://www.example-domain.com/a/1"), _site_map)
+
+        with self.assertRaises(SimulatedCrash):
+            await interrupted.crawl("https://www.example-domain.com/")
+
+        self.assertTrue(journal_has_entries(self.journal_path))
+
+        test_out.log_starting_test("a journal with entries is resumed without losing the pages already written")
+        # not opened for appending, as with --journal rather than --resume
+        rerun = construct_orchestrator(self.journal_path, writer_config=ResultWriterConfiguration(output_path, NDJSON))
+        rerun.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+        await rerun.crawl("https://www.example-domain.com/")
+
+        self.assertEqual(sorted(read_output(output_path)), sorted(_site_map_pages))
@@ -0,0 +1,161 @@
+import asyncio
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from frontier.coordinator import CoordinatorFrontier, FrontierCoordinator
+from frontier.frontier import Frontier, FrontierConfiguration, MemoryFrontier
+from orchestrator.orchestrator import CrawlBudgetConfiguration, Orchestrator
+from politeness.scheduler import PolitenessConfiguration
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def test_memory_frontier(self):
+        test_out.log_starting_test_set("Frontier - test memory frontier")
+
+        frontier = MemoryFrontier()
+
+        test_out.log_starting_test("dedup")
+        self.assertEqual(await frontier.add(["a", "b", "a"], 1), ["a", "b"])
+        await frontier.mark_seen(["c"])
+        self.assertEqual(await frontier.add(["b", "c", "d"], 2), ["d"])
+
+        test_out.log_starting_test("fifo")
+        self.assertEqual(await frontier.get(), ("a", 1))
+        self.assertEqual(await frontier.get(), ("b", 1))
+        self.assertEqual(await frontier.get(), ("d", 2))
+
+        test_out.log_starting_test("finishes once nothing is in flight or held")
+        await frontier.hold()
+        waiter = asyncio.create_task(frontier.get())
+
+        for link in ["a", "b", "d"]:
+            await frontier.done(link)
+            await asyncio.sleep(0)
+            self.assertFalse(waiter.done())
+
+        await frontier.release()
+        self.assertIsNone(await waiter)
+        self.assertIsNone(await frontier.get())
+
+    async def test_incomplete_frontier(self):
+        test_out.log_starting_test_set("Frontier - test incomplete frontier")
+
+        class QueueOnlyFrontier(Frontier):
+            async def add(self, links: list[str], depth: int, hints: dict = None) -> list[str]:
+                return links
+
+            async def get(self) -> tuple[str, int] | None:
+                return None
+
+        test_out.log_starting_test("a backend missing part of the interface fails when it is constructed")
+        with self.assertRaises(TypeError):
+            QueueOnlyFrontier()
+
+    async def test_coordinator(self):
+        test_out.log_starting_test_set("Frontier - test coordinator")
+
+        coordinator = FrontierCoordinator(port=0)
+        await coordinator.start()
+
+        first = CoordinatorFrontier("127.0.0.1", coordinator.port)
+        second = CoordinatorFrontier("127.0.0.1", coordinator.port)
+        await first.open()
+        await second.open()
+
+        try:
+            test_out.log_starting_test("nodes dedup against each other")
+            self.assertEqual(await first.add(["a", "b"], 1), ["a", "b"])
+            self.assertEqual(await second.add(["b", "c"], 2), ["c"])
+
+            self.assertEqual(await first.get(), ("a", 1))
+            self.assertEqual(await second.get(), ("b", 1))
+
+            test_out.log_starting_test("an abandoned link is queued again for any node")
+            await second.abandon("b", 1)
+            self.assertEqual(await second.get(), ("b", 1))
+            # only the node holding a link can give it up
+            await first.abandon("b", 1)
+            self.assertEqual(coordinator.frontier.depth(), 1)
+
+            test_out.log_starting_test("a lost node's links are queued again")
+            await first.close()
+            await asyncio.sleep(0.05)
+
+            self.assertEqual(await second.get(), ("a", 1))
+            self.assertEqual(await second.get(), ("c", 2))
+
+            test_out.log_starting_test("every node is told the crawl is finished")
+            third = CoordinatorFrontier("127.0.0.1", coordinator.port)
+            await third.open()
+
+            waiter = asyncio.create_task(third.get())
+            for link in ["a", "b", "c"]:
+                await second.done(link)
+
+            self.assertIsNone(await waiter)
+            self.assertIsNone(await second.get())
+            await third.close()
+        finally:
+            await second.close()
+            await coordinator.close()
+
+    async def test_distributed_crawl(self):
+        test_out.log_starting_test_set("Frontier - test distributed crawl")
+
+        async def handler(request: web.Request) -> web.Response:
+            index = int(request.match_info.get("index") or 0)
+            links = "".join(f"<a href='/page/{(index * 4 + offset) % 60}'>page</a>" for offset in range(1, 5))
+            # slow enough that both nodes get a share
+            await asyncio.sleep(0.01)
+            return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/", handler)
+        app.router.add_get("/page/{index}", handler)
+
+        server = TestServer(app, host="127.0.0.1")
+        await server.start_server()
+
+        coordinator = FrontierCoordinator(port=0)
+        await coordinator.start()
+
+        try:
+            nodes = [
+                Orchestrator("", "127.0.0.1", -1, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"), concurrency=4,
+                             politeness_config=PolitenessConfiguration(0), frontier_config=FrontierConfiguration("127.0.0.1", coordinator.port))
+                for _ in range(2)
+            ]
+
+            await asyncio.gather(*[node.crawl(str(server.make_url("/"))) for node in nodes])
+
+            test_out.log_starting_test("links a node's budget stops are left for the other nodes")
+            coordinator.frontier = MemoryFrontier()
+            budgets = [CrawlBudgetConfiguration(max_pages=5), None]
+            budget_nodes = [
+                Orchestrator("", "127.0.0.1", -1, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"), concurrency=4,
+                             politeness_config=PolitenessConfiguration(0), frontier_config=FrontierConfiguration("127.0.0.1", coordinator.port),
+                             budget_config=budget)
+                for budget in budgets
+            ]
+
+            await asyncio.gather(*[node.crawl(str(server.make_url("/"))) for node in budget_nodes])
+        finally:
+            await coordinator.close()
+            await server.close()
+
+        first, second = (set(node.registered_links) for node in nodes)
+
+        # every page is crawled exactly once, by one node or the other
+        self.assertEqual(len(first | second), 61)
+        self.assertEqual(first & second, set())
+        self.assertGreater(len(first), 0)
+        self.assertGreater(len(second), 0)
+
+        limited, unlimited = (set(node.registered_links) for node in budget_nodes)
+        self.assertLessEqual(len(limited), 5)
+        self.assertEqual(len(limited | unlimited), 61)
+        self.assertEqual(limited & unlimited, set())
@@ -0,0 +1,157 @@
+import os
+import tempfile
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from orchestrator.orchestrator import Orchestrator
+from politeness.scheduler import PolitenessConfiguration
+from result_writer import writer
+from result_writer.graph import KrawlGraph, write_graph
+from test.common import test_out
+from test.mocks.mock_link_processor import construct_mock_link_processor
+from test.mocks.mock_pooler import MockPooler
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+_site_map = {
+    "https://www.example-domain.com/": ["https://www.example-domain.com/a", "https://www.example-domain.com/b"],
+    "https://www.example-domain.com/a": ["https://www.example-domain.com/a/1", "https://www.example-domain.com/", "https://www.thirdparty.com/"],
+    "https://www.example-domain.com/b": ["https://www.example-domain.com/a/1", "https://www.example-domain.com/a"],
+    "https://www.example-domain.com/a/1": ["https://www.example-domain.com/a/1/x"],
+}
+
+
+async def crawl(writer_config: writer.ResultWriterConfiguration = None) -> Orchestrator:
+    orchestrator = Orchestrator("www", "example-domain.com", 3, writer_config=writer_config)
+    orchestrator.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+    await orchestrator.crawl("https://www.example-domain.com/")
+
+    return orchestrator
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_graph_output(self):
+        test_out.log_starting_test_set("Graph - test graph output")
+
+        expected = (await crawl()).registered_links
+        path = os.path.join(self.directory.name, "krawl.graph")
+        orchestrator = await crawl(writer.ResultWriterConfiguration(path, writer.GRAPH))
+
+        test_out.log_starting_test("pages are written out rather than kept")
+        self.assertEqual(set(orchestrator.registered_links.values()), {True})
+        self.assertFalse(os.path.exists(path + ".spill"))
+
+        test_out.log_starting_test("reads back as the json output")
+        self.assertEqual(list(writer.read_output(path).items()), list(expected.items()))
+
+        with KrawlGraph(path) as graph:
+            # every page and every link found, stored once each
+            self.assertEqual(len(graph), 5)
+            self.assertEqual(graph.edge_count, sum(len(links) for links in expected.values() if isinstance(links, list)))
+
+            test_cases = [
+                {
+                    "name": "a page",
+                    "url": "https://www.example-domain.com/a",
+                    "out": _site_map["https://www.example-domain.com/a"],
+                    "in": ["https://www.example-domain.com/", "https://www.example-domain.com/b"],
+                    "page": {"crawled": True, "beyond_limit": False, "status": 200, "depth": 2, "bytes": 0, "latency": None},
+                },
+                {
+                    "name": "a page beyond the recursion limit",
+                    "url": "https://www.example-domain.com/a/1",
+                    "out": [],
+                    "in": ["https://www.example-domain.com/a", "https://www.example-domain.com/b"],
+                    "page": {"crawled": False, "beyond_limit": True, "status": None, "depth": 3, "bytes": 0, "latency": None},
+                },
+                {
+                    "name": "a url that isn't in the graph",
+                    "url": "https://www.example-domain.com/missing",
+                    "out": [],
+                    "in": [],
+                    "page": None,
+                },
+            ]
+
+            for test_case in test_cases:
+                test_out.log_starting_test(test_case["name"])
+
+                self.assertEqual(graph.out_links(test_case["url"]), test_case["out"])
+                self.assertEqual(graph.in_links(test_case["url"]), test_case["in"])
+                self.assertEqual(graph.page(test_case["url"]), test_case["page"])
+
+    async def test_metadata(self):
+        test_out.log_starting_test_set("Graph - test metadata")
+
+        body = "<html><a href='/missing'>missing</a></html>"
+
+        async def handler(request: web.Request) -> web.Response:
+            if request.path != "/":
+                raise web.HTTPNotFound()
+            return web.Response(text=body, content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        server = TestServer(app, host="127.0.0.1")
+        await server.start_server()
+
+        path = os.path.join(self.directory.name, "krawl.graph")
+        orchestrator = Orchestrator("", "127.0.0.1", -1, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                                    writer_config=writer.ResultWriterConfiguration(path, writer.GRAPH), politeness_config=PolitenessConfiguration(0, max_retries=0))
+
+        base_link, missing_link = str(server.make_url("/")), str(server.make_url("/missing"))
+
+        try:
+            await orchestrator.crawl(base_link)
+        finally:
+            await server.close()
+
+        with KrawlGraph(path) as graph:
+            page = graph.page(base_link)
+            self.assertEqual((page["status"], page["depth"], page["bytes"]), (200, 1, len(body)))
+            self.assertGreater(page["latency"], 0)
+
+            test_out.log_starting_test("failed pages keep their status")
+            self.assertEqual(graph.page(missing_link)["status"], 404)
+
+    def test_edge_cases(self):
+        test_out.log_starting_test_set("Graph - test edge cases")
+
+        path = os.path.join(self.directory.name, "krawl.graph")
+
+        test_out.log_starting_test("empty graph")
+        write_graph([], path)
+        with KrawlGraph(path) as graph:
+            self.assertEqual(len(graph), 0)
+            self.assertIsNone(graph.node("https://www.example-domain.com/"))
+            self.assertEqual(list(graph.items()), [])
+
+        test_out.log_starting_test("repeated and non ascii pages")
+        write_graph([
+            {"url": "https://www.example-domain.com/ä", "links": ["https://www.example-domain.com/", "https://www.thirdparty.com/"]},
+            {"url": "https://www.example-domain.com/", "links": []},
+            {"url": "https://www.example-domain.com/ä", "links": []},
+        ], path)
+        with KrawlGraph(path) as graph:
+            self.assertEqual(dict(graph.items()), {
+                "https://www.example-domain.com/ä": ["https://www.example-domain.com/", "https://www.thirdparty.com/"],
+                "https://www.example-domain.com/": [],
+            })
+            self.assertEqual(graph.in_links("https://www.example-domain.com/"), ["https://www.example-domain.com/ä"])
+
+            test_out.log_starting_test("links that weren't krawled are nodes without metadata")
+            self.assertEqual(graph.page("https://www.thirdparty.com/"),
+                             {"crawled": False, "beyond_limit": False, "status": None, "depth": None, "bytes": 0, "latency": None})
+
+        test_out.log_starting_test("not a graph")
+        with open(path, "wb") as file:
+            file.write(b"{}" * 100)
+        with self.assertRaises(ValueError):
+            KrawlGraph(path)
@@ -0,0 +1,128 @@
+import tempfile
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from http_cache.cache import CacheEntry, HttpCache, HttpCacheConfiguration
+from http_transport.transport import Transport, TransportConfiguration
+from link_processor.processor import LinkProcessor, LinkProcessorConfiguration
+from page_loader import loader
+from test.common import test_out
+from test.mocks.mock_pooler import MockPooler
+
+_page = b"<html><a href='/a'>a</a><a href='https://www.thirdparty.com/'>third party</a></html>"
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache_directory = tempfile.TemporaryDirectory()
+        self.http_cache = HttpCache(HttpCacheConfiguration(self.cache_directory.name))
+
+        # status codes returned by the server, in order
+        self.statuses = []
+
+        async def handler(request: web.Request) -> web.Response:
+            validators = {"ETag": '"v1"', "Last-Modified": "Sun, 18 Oct 2026 08:00:00 GMT"}
+
+            if request.path == "/no-validators":
+                validators = {}
+            elif request.path == "/not-modified":
+                # a broken server answering 304 whatever was asked
+                self.statuses.append(304)
+                return web.Response(status=304)
+            elif request.headers.get("If-None-Match") == validators["ETag"]:
+                self.statuses.append(304)
+                return web.Response(status=304, headers=validators)
+
+            self.statuses.append(200)
+            return web.Response(body=_page, content_type="text/html", headers=validators)
+
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+        self.transport = Transport(TransportConfiguration())
+        await self.transport.open()
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+        await self.server.close()
+        self.cache_directory.cleanup()
+
+    def construct_link_processor(self) -> LinkProcessor:
+        page_loader_pool = MockPooler(loader.construct_page_loader, loader.PageLoaderConfiguration(self.transport))
+        config = LinkProcessorConfiguration(page_loader_pool, "", "127.0.0.1", http_cache=self.http_cache)
+
+        return LinkProcessor(config)
+
+    async def test_revalidation(self):
+        test_out.log_starting_test_set("HttpCache - test revalidation")
+
+        link = str(self.server.make_url("/page"))
+        expected_all_links = [str(self.server.make_url("/a")), "https://www.thirdparty.com/"]
+
+        first = await self.construct_link_processor().process_link(link)
+        second = await self.construct_link_processor().process_link(link)
+
+        self.assertEqual(self.statuses, [200, 304])
+        self.assertEqual(first, (expected_all_links, expected_all_links[:1]))
+        self.assertEqual(second, first)
+
+        entry = self.http_cache.get(link)
+        self.assertEqual(entry.etag, '"v1"')
+        self.assertEqual(entry.links, expected_all_links)
+        self.assertEqual(self.http_cache.get_body(link), _page)
+
+    async def test_no_validators(self):
+        test_out.log_starting_test_set("HttpCache - test page without validators")
+
+        link = str(self.server.make_url("/no-validators"))
+
+        await self.construct_link_processor().process_link(link)
+        await self.construct_link_processor().process_link(link)
+
+        self.assertEqual(self.statuses, [200, 200])
+        self.assertIsNone(self.http_cache.get(link))
+
+    async def test_unsolicited_not_modified(self):
+        test_out.log_starting_test_set("HttpCache - test 304 to a request without validators")
+
+        link = str(self.server.make_url("/not-modified"))
+
+        test_out.log_starting_test("the page fails rather than reusing a cached copy that doesn't exist")
+        processor = self.construct_link_processor()
+        self.assertEqual(await processor.process_link(link), ([], []))
+        self.assertEqual(processor.page_metadata, {"status": 304})
+        self.assertIsNone(self.http_cache.get(link))
+
+        test_out.log_starting_test("without a cache")
+        page_loader = loader.PageLoader(loader.PageLoaderConfiguration(self.transport))
+        with self.assertRaises(loader.RequestFailedException) as context:
+            await page_loader.load_html(link)
+        self.assertEqual(context.exception.status, 304)
+
+    async def test_entries(self):
+        test_out.log_starting_test_set("HttpCache - test entries")
+
+        link = "https://www.example-domain.com/"
+
+        test_out.log_starting_test("missing entry")
+        self.assertIsNone(self.http_cache.get(link))
+        self.assertIsNone(self.http_cache.get_body(link))
+
+        test_out.log_starting_test("stored entry")
+        self.http_cache.put(CacheEntry(link, last_modified="yesterday", links=["https://www.example-domain.com/a"]), b"body")
+
+        entry = self.http_cache.get(link)
+        self.assertEqual(entry.conditional_headers(), {"If-Modified-Since": "yesterday"})
+        self.assertEqual(entry.links, ["https://www.example-domain.com/a"])
+        self.assertEqual(self.http_cache.get_body(link), b"body")
+
+        test_out.log_starting_test("corrupt entry")
+        with open(self.http_cache.path(link, ".json"), "w") as file:
+            file.write("{not json")
+
+        self.assertIsNone(self.http_cache.get(link))
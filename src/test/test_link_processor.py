@@ -26,10 +26,10 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                 },
                 "parent_link": "example-domain.com/",
                 "link_input_expected_output_pairs": {
-                    "relative/path": "www.example-domain.com/relative/path",
-                    "/relative/path": "www.example-domain.com/relative/path",
-                    "./relative/path": "www.example-domain.com/./relative/path",
-                    "../relative/path": "www.example-domain.com/../relative/path"
+                    "relative/path": "http://example-domain.com/relative/path",
+                    "/relative/path": "http://example-domain.com/relative/path",
+                    "./relative/path": "http://example-domain.com/relative/path",
+                    "../relative/path": "http://example-domain.com/relative/path"
                 }
             },
             {
@@ -38,12 +38,12 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                     "subdomain": "www",
                     "host": "example-domain.com"
                 },
-                "parent_link": "example-domain.com/",
+                "parent_link": "www.example-domain.com/",
                 "link_input_expected_output_pairs": {
-                    "relative/path": "www.example-domain.com/relative/path",
-                    "/relative/path": "www.example-domain.com/relative/path",
-                    "./relative/path": "www.example-domain.com/./relative/path",
-                    "../relative/path": "www.example-domain.com/../relative/path"
+                    "relative/path": "http://www.example-domain.com/relative/path",
+                    "/relative/path": "http://www.example-domain.com/relative/path",
+                    "./relative/path": "http://www.example-domain.com/relative/path",
+                    "../relative/path": "http://www.example-domain.com/relative/path"
                 }
             },
             {
@@ -52,13 +52,13 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                     "subdomain": "www",
                     "host": "example-domain.com"
                 },
-                "parent_link": "example-domain.com/existing/path",
+                "parent_link": "www.example-domain.com/existing/path/",
                 "link_input_expected_output_pairs": {
-                    "relative/path": "www.example-domain.com/existing/path/relative/path",
-                    "/relative/path": "www.example-domain.com/existing/path/relative/path",
-                    "./relative/path": "www.example-domain.com/existing/path/./relative/path",
-                    "../relative/path": "www.example-domain.com/existing/path/../relative/path",
-                    "relative/path/file.ext": "www.example-domain.com/existing/path/relative/path/file.ext"
+                    "relative/path": "http://www.example-domain.com/existing/path/relative/path",
+                    "/relative/path": "http://www.example-domain.com/relative/path",
+                    "./relative/path": "http://www.example-domain.com/existing/path/relative/path",
+                    "../relative/path": "http://www.example-domain.com/existing/relative/path",
+                    "relative/path/file.ext": "http://www.example-domain.com/existing/path/relative/path/file.ext"
                 }
             },
             {
@@ -67,11 +67,14 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                     "subdomain": "www",
                     "host": "example-domain.com"
                 },
-                "parent_link": "example-domain.com/existing/path/filename.ext",
+                "parent_link": "http://www.example-domain.com/existing/path/filename.ext",
                 "link_input_expected_output_pairs": {
-                    "relative/path": "www.example-domain.com/existing/path/relative/path",
-                    "/relative/path": "www.example-domain.com/existing/path/relative/path",
-                    "./relative/path": "www.example-domain.com/existing/path/./relative/path",
+                    "relative/path": "http://www.example-domain.com/existing/path/relative/path",
+                    "/relative/path": "http://www.example-domain.com/relative/path",
+                    "./relative/path": "http://www.example-domain.com/existing/path/relative/path",
+                    "other.php": "http://www.example-domain.com/existing/path/other.php",
+                    "#fragment": "http://www.example-domain.com/existing/path/filename.ext",
+                    "//www.example-domain.com//double//slash": "http://www.example-domain.com/double/slash"
                 }
             }
         ]
@@ -105,6 +108,11 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                     "www.example-domain.com/any/path": True, 
                     "other.example-domain.com": False,
                     "thirdparty.com": False,
+                    # hosts are compared whole rather than by their parts
+                    "www.not-example-domain.com": False,
+                    "www.example-domain.com.thirdparty.com": False,
+                    "www.www.example-domain.com": False,
+                    "example-domain.com.www.example-domain.com": False,
                 }
             },
             {
@@ -137,6 +145,8 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                     "other.subdomain.example-domain.com/any/path": True, 
                     "other.example-domain.com/any/path": False, 
                     "other.subdomain.thirdparty.com": False,
+                    "subdomain.other.example-domain.com": False,
+                    "other.subdomain.other.subdomain.example-domain.com": False,
                 }
             }
         ]
@@ -170,29 +180,27 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                     "<a href='www.thirdparty.com/with/path'>this link should show in all_links</a>",
                     "<a href='//third-party.com'>this link should show in all_links</a>",
                     "<a href='subdomain.example-domain.com'>this link should show in all_links</a>",
-                    "<a href='https://www.example-domain.com/path'>this link should show in both lists</a>",
-                    "<a href='www.example-domain.com/path'>this link should show in both lists</a>",
+                    "<a href='http://www.example-domain.com/path'>this link should show in both lists</a>",
+                    "<a href='www.example-domain.com/path'>this link is a duplicate of the last one once normalised</a>",
                     "<a href='example-domain.com/path'>this link should show in both lists</a>",
                     "<a href='/relative/path'>this link should show in both lists with the subdomain and host attached</a>",
                     "<!--<a href='www.example-domain.com/commented/anchor'>this link will show in both lists and I'm sad about it</a>-->"
                 ],
                 "expected_all_links": [
-                    "www.thirdparty.com",
-                    "www.thirdparty.com/with/path",
-                    "//third-party.com",
-                    "subdomain.example-domain.com",
-                    "https://www.example-domain.com/path",
-                    "www.example-domain.com/path",
-                    "example-domain.com/path",
-                    "www.example-domain.com/relative/path",
-                    "www.example-domain.com/commented/anchor"
+                    "http://www.thirdparty.com/",
+                    "http://www.thirdparty.com/with/path",
+                    "http://third-party.com/",
+                    "http://subdomain.example-domain.com/",
+                    "http://www.example-domain.com/path",
+                    "http://example-domain.com/path",
+                    "http://www.example-domain.com/relative/path",
+                    "http://www.example-domain.com/commented/anchor"
                 ],
                 "expected_local_links": [
-                    "https://www.example-domain.com/path",
-                    "www.example-domain.com/path",
-                    "example-domain.com/path",
-                    "www.example-domain.com/relative/path",
-                    "www.example-domain.com/commented/anchor"
+                    "http://www.example-domain.com/path",
+                    "http://example-domain.com/path",
+                    "http://www.example-domain.com/relative/path",
+                    "http://www.example-domain.com/commented/anchor"
                 ]
             },
             {
@@ -204,23 +212,21 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                 "expected_url": "example-domain.com",
                 "page_loader_response": [
                     "<a href='subdomain.example-domain.com'>this link should show in all_links</a>",
-                    "<a href='https://www.example-domain.com/path'>this link should show in both lists</a>",
-                    "<a href='www.example-domain.com/path'>this link should show in both lists</a>",
+                    "<a href='http://www.example-domain.com/path'>this link should show in both lists</a>",
+                    "<a href='www.example-domain.com/path'>this link is a duplicate of the last one once normalised</a>",
                     "<a href='example-domain.com/path'>this link should show in both lists</a>",
-                    "<a href='/relative/path'>this link should show in both lists with 'www.' + the host attached</a>",
+                    "<a href='/relative/path'>this link should show in both lists with the parent's host attached</a>",
                 ],
                 "expected_all_links": [
-                    "subdomain.example-domain.com",
-                    "https://www.example-domain.com/path",
-                    "www.example-domain.com/path",
-                    "example-domain.com/path",
-                    "www.example-domain.com/relative/path",
+                    "http://subdomain.example-domain.com/",
+                    "http://www.example-domain.com/path",
+                    "http://example-domain.com/path",
+                    "http://example-domain.com/relative/path",
                 ],
                 "expected_local_links": [
-                    "https://www.example-domain.com/path",
-                    "www.example-domain.com/path",
-                    "example-domain.com/path",
-                    "www.example-domain.com/relative/path",
+                    "http://www.example-domain.com/path",
+                    "http://example-domain.com/path",
+                    "http://example-domain.com/relative/path",
                 ]
             },
             {
@@ -239,14 +245,37 @@ class Testing(unittest.IsolatedAsyncioTestCase):
                 ],
                 "expected_all_links": [
                     "https://www.example-domain.com/path",
-                    "example-domain.com/path",
-                    "other.example-domain.com/path",
-                    "subdomain.example-domain.com",
-                    "subdomain.example-domain.com/relative/path",
+                    "http://example-domain.com/path",
+                    "http://other.example-domain.com/path",
+                    "http://subdomain.example-domain.com/",
+                    "http://subdomain.example-domain.com/relative/path",
+                ],
+                "expected_local_links": [
+                    "http://subdomain.example-domain.com/",
+                    "http://subdomain.example-domain.com/relative/path",
+                ]
+            },
+            {
+                "name": "Process link with a base href",
+                "processor_config": {
+                    "subdomain": "www",
+                    "host": "example-domain.com"
+                },
+                "expected_url": "www.example-domain.com",
+                "page_loader_response": [
+                    "<head><base href='https://www.example-domain.com/base/'></head>",
+                    "<a href='relative/path'>this link is relative to the base href</a>",
+                    "<a href='../up/./a/level'>this link should have its dot segments resolved</a>",
+                    "<a href='mailto:someone@example-domain.com'>this link should only show in all_links</a>",
+                ],
+                "expected_all_links": [
+                    "https://www.example-domain.com/base/relative/path",
+                    "https://www.example-domain.com/up/a/level",
+                    "mailto:someone@example-domain.com",
                 ],
                 "expected_local_links": [
-                    "subdomain.example-domain.com",
-                    "subdomain.example-domain.com/relative/path",
+                    "https://www.example-domain.com/base/relative/path",
+                    "https://www.example-domain.com/up/a/level",
                 ]
             },
         ]
@@ -261,7 +290,7 @@ class Testing(unittest.IsolatedAsyncioTestCase):
 
             processor = construct_link_processor(test_case["processor_config"])
 
-            loader_instance: MockPageLoader = processor.page_loader_pool.get_instance_from_pool()
+            loader_instance: MockPageLoader = processor.page_loader_pool.instance
             loader_instance.set_return_content(page_loader_response)
 
             subdomain = processor.subdomain
@@ -0,0 +1,193 @@
+import unittest
+
+from link_ripper import ripper
+from test.common import test_out
+
+_test_page = (
+    b"<html><head><link href='/style.css' rel='stylesheet'><link rel=\"canonical\" href=\"/canonical\"></head><body>"
+    b"<a href=\"https://www.example-domain.com/path\">absolute</a>"
+    b"<a href='/relative/path'>relative</a>"
+    b"<p>href is mentioned but not quoted: href=nothing</p>"
+    b"<img src='/image.png' srcset='/image-1x.png 1x, /image-2x.png 2x'>"
+    b"<a href = 'www.thirdparty.com/with/path?query=1'>third party</a>"
+    b"</body></html>"
+)
+
+_expected_links = [
+    "/style.css",
+    "/canonical",
+    "https://www.example-domain.com/path",
+    "/relative/path",
+    "www.thirdparty.com/with/path?query=1",
+]
+
+
+def rip_in_chunks(content: bytes, chunk_size: int, config: ripper.LinkRipperConfiguration = None, charset: str = None) -> list[str]:
+    link_ripper = ripper.construct_link_ripper(config if config is not None else ripper.LinkRipperConfiguration(), charset)
+
+    links = []
+    for start in range(0, len(content), chunk_size):
+        links.extend(link_ripper.feed(content[start:start + chunk_size]))
+    links.extend(link_ripper.close())
+
+    return links
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def test_rip_links(self):
+        test_out.log_starting_test_set("LinkRipper - test rip links")
+
+        test_cases = [
+            {
+                "name": "hrefs",
+                "config": ripper.LinkRipperConfiguration(),
+                "expected": _expected_links,
+            },
+            {
+                "name": "hrefs and sources",
+                "config": ripper.LinkRipperConfiguration(capture_sources=True),
+                "expected": _expected_links[:4] + ["/image.png", "/image-1x.png", "/image-2x.png"] + _expected_links[4:],
+            },
+            {
+                "name": "filtered link rels",
+                "config": ripper.LinkRipperConfiguration(link_rels=["canonical"]),
+                "expected": _expected_links[1:],
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            self.assertEqual(ripper.rip_links(_test_page, test_case["config"]), test_case["expected"])
+
+    async def test_chunk_boundaries(self):
+        test_out.log_starting_test_set("LinkRipper - test chunk boundaries")
+
+        config = ripper.LinkRipperConfiguration(capture_sources=True, link_rels=["canonical"])
+        expected = ripper.rip_links(_test_page, config)
+
+        # every chunk size splits at least one link somewhere
+        for chunk_size in range(1, len(_test_page) + 1):
+            self.assertEqual(rip_in_chunks(_test_page, chunk_size, config), expected, f"chunk size {chunk_size}")
+
+    async def test_charset(self):
+        test_out.log_starting_test_set("LinkRipper - test charset")
+
+        test_cases = [
+            {
+                "name": "response charset",
+                "content": "<a href='/café'>".encode("latin-1"),
+                "charset": "ISO-8859-1",
+                "expected": ["/café"],
+            },
+            {
+                "name": "meta charset",
+                "content": "<meta charset='windows-1252'><a href='/café'>".encode("cp1252"),
+                "charset": None,
+                "expected": ["/café"],
+            },
+            {
+                "name": "default utf-8",
+                "content": "<a href='/café'>".encode("utf-8"),
+                "charset": None,
+                "expected": ["/café"],
+            },
+            {
+                "name": "undecodable bytes",
+                "content": b"<a href='/caf\xe9'>",
+                "charset": "utf-8",
+                "expected": ["/caf�"],
+            },
+            {
+                "name": "unknown charset",
+                "content": "<a href='/café'>".encode("utf-8"),
+                "charset": "not-a-charset",
+                "expected": ["/café"],
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            links = ripper.rip_links(test_case["content"], charset=test_case["charset"])
+            self.assertEqual(links, test_case["expected"])
+
+    async def test_base_href(self):
+        test_out.log_starting_test_set("LinkRipper - test base href")
+
+        test_cases = [
+            {"name": "base", "content": b"<head><base href='https://www.example-domain.com/base/'></head><a href='relative'>"},
+            {"name": "upper case", "content": b"<HEAD><BASE HREF='https://www.example-domain.com/base/'></HEAD><a href='relative'>"},
+            {"name": "after a basefont", "content": b"<head><basefont size='3'><base href='https://www.example-domain.com/base/'></head><a href='relative'>"},
+        ]
+
+        for backend in ripper.available_backends():
+            for test_case in test_cases:
+                test_out.log_starting_test(f"{backend} - {test_case['name']}")
+
+                link_ripper = ripper.construct_link_ripper(ripper.LinkRipperConfiguration(backend))
+                links = link_ripper.feed(test_case["content"])
+                links.extend(link_ripper.close())
+
+                self.assertEqual(link_ripper.base_link, "https://www.example-domain.com/base/")
+                self.assertEqual(links, ["relative"])
+
+    async def test_minified_page(self):
+        test_out.log_starting_test_set("LinkRipper - test minified page")
+
+        link_count = 5000
+        content = b"".join(b"<a href='/page-%d'>page</a>" % index for index in range(link_count))
+
+        for backend in ripper.available_backends():
+            test_out.log_starting_test(backend)
+
+            links = rip_in_chunks(content, 1000, ripper.LinkRipperConfiguration(backend))
+
+            self.assertEqual(len(links), link_count)
+            self.assertEqual(links[-1], "/page-4999")
+
+    async def test_bounded_remainder(self):
+        test_out.log_starting_test_set("LinkRipper - test bounded remainder")
+
+        link_ripper = ripper.RegexLinkRipper(ripper.LinkRipperConfiguration())
+        link_ripper.feed(b"<a href='" + b"x" * (ripper._max_href_length * 4))
+
+        self.assertLessEqual(len(link_ripper.remainder), ripper._max_remainder_length)
+
+        # an over-long href is dropped but links after it are still found
+        self.assertEqual(link_ripper.feed(b"'><a href='/after'>"), ["/after"])
+
+    @unittest.skipIf(ripper.etree is None, "lxml is not installed")
+    async def test_lxml_backend(self):
+        test_out.log_starting_test_set("LinkRipper - test lxml backend")
+
+        content = _test_page + b"<!--<a href='/commented/out'>ignored by lxml</a>-->"
+
+        test_cases = [
+            {
+                "name": "hrefs",
+                "config": ripper.LinkRipperConfiguration("lxml"),
+                "expected": _expected_links,
+            },
+            {
+                "name": "hrefs and sources",
+                "config": ripper.LinkRipperConfiguration("lxml", capture_sources=True),
+                "expected": _expected_links[:4] + ["/image.png", "/image-1x.png", "/image-2x.png"] + _expected_links[4:],
+            },
+            {
+                "name": "filtered link rels",
+                "config": ripper.LinkRipperConfiguration("lxml", link_rels=["canonical"]),
+                "expected": _expected_links[1:],
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            self.assertEqual(rip_in_chunks(content, 7, test_case["config"]), test_case["expected"])
+
+    async def test_unknown_backend(self):
+        test_out.log_starting_test_set("LinkRipper - test unknown backend")
+
+        with self.assertRaises(ripper.RipperBackendUnavailableException):
+            ripper.construct_link_ripper(ripper.LinkRipperConfiguration("not-a-backend"))
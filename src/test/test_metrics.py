@@ -0,0 +1,144 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawl_metrics.metrics import PAGE, PARSE, TTFB, CrawlMetrics, Histogram, MetricsConfiguration, MetricsReporter
+from orchestrator.orchestrator import Orchestrator
+from politeness.scheduler import PolitenessConfiguration
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    def test_histogram(self):
+        test_out.log_starting_test_set("CrawlMetrics - test histogram")
+
+        test_cases = [
+            {
+                "name": "empty",
+                "values": [],
+                "expected": {"count": 0, "p50": None, "p99": None},
+            },
+            {
+                "name": "single bucket",
+                "values": [0.02] * 10,
+                # interpolated within (0.01, 0.025] but never beyond the largest value seen
+                "expected": {"count": 10, "p50": 0.0175, "p99": 0.02},
+            },
+            {
+                "name": "spread",
+                "values": [0.002] * 90 + [0.4] * 9 + [2.0],
+                "expected": {"count": 100, "p50": 0.001 + 0.0015 * 50 / 90, "p99": 0.5},
+            },
+            {
+                "name": "beyond the largest bucket",
+                "values": [0.5, 120.0],
+                "expected": {"count": 2, "p50": 0.5, "p99": 120.0},
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            histogram = Histogram()
+            for value in test_case["values"]:
+                histogram.observe(value)
+
+            summary = histogram.summary()
+            for key, expected in test_case["expected"].items():
+                if expected is None:
+                    self.assertIsNone(summary[key])
+                else:
+                    self.assertAlmostEqual(summary[key], expected)
+
+    async def test_crawl_metrics(self):
+        test_out.log_starting_test_set("CrawlMetrics - test crawl metrics")
+
+        async def page(request: web.Request) -> web.Response:
+            index = int(request.match_info.get("index") or 0)
+            links = "".join(f"<a href='/page/{(index + offset) % 10}'>page</a>" for offset in range(1, 3))
+            return web.Response(text=f"<html><body>{links}<a href='/missing'>gone</a><a href='/feed'>feed</a></body></html>",
+                                content_type="text/html")
+
+        async def feed(_: web.Request) -> web.Response:
+            return web.Response(text="{}", content_type="application/json")
+
+        app = web.Application()
+        app.router.add_get("/", page)
+        app.router.add_get("/page/{index}", page)
+        app.router.add_get("/feed", feed)
+
+        server = TestServer(app, host="127.0.0.1")
+        await server.start_server()
+
+        with tempfile.TemporaryDirectory() as directory:
+            stats_path = os.path.join(directory, "stats.json")
+            summaries = io.StringIO()
+
+            try:
+                metrics_config = MetricsConfiguration(summary_interval=60, stats_path=stats_path, summary_stream=summaries)
+                orchestrator = Orchestrator("", "127.0.0.1", -1, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                                            politeness_config=PolitenessConfiguration(0, max_retries=0), metrics_config=metrics_config)
+                await orchestrator.crawl(str(server.make_url("/")))
+            finally:
+                await server.close()
+
+            with open(stats_path, encoding="utf-8") as file:
+                stats = json.load(file)
+
+        test_cases = [
+            {"name": "pages - the index, 10 pages and the missing page", "actual": stats["counters"]["pages"], "expected": 12},
+            {"name": "failed pages", "actual": stats["counters"]["pages_failed"], "expected": 1},
+            {"name": "skipped pages", "actual": stats["counters"]["pages_skipped"], "expected": 1},
+            {"name": "requests", "actual": stats["counters"]["requests"], "expected": 13},
+            {"name": "responses by status", "actual": stats["responses"], "expected": {"200": 12, "404": 1}},
+            {"name": "ttfb per response", "actual": stats["timings"][TTFB]["count"], "expected": 13},
+            {"name": "parse per page", "actual": stats["timings"][PARSE]["count"], "expected": 11},
+            {"name": "page per link taken", "actual": stats["timings"][PAGE]["count"], "expected": 13},
+            {"name": "nothing left in flight", "actual": stats["gauges"]["in_flight"], "expected": 0},
+            {"name": "nothing left queued", "actual": stats["gauges"]["queue_depth"], "expected": 0},
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+            self.assertEqual(test_case["actual"], test_case["expected"])
+
+        test_out.log_starting_test("final summary")
+        self.assertIn("pages 12", summaries.getvalue())
+
+    async def test_prometheus_endpoint(self):
+        test_out.log_starting_test_set("CrawlMetrics - test prometheus endpoint")
+
+        metrics = CrawlMetrics()
+        metrics.increment("pages", 3)
+        metrics.record_status(200)
+        metrics.observe(TTFB, 0.03)
+        metrics.register_gauge("queue_depth", lambda: 7)
+        metrics.register_gauge("unknown", lambda: None)
+
+        reporter = MetricsReporter(MetricsConfiguration(prometheus_port=0), metrics)
+
+        async with reporter, aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{reporter.port}/metrics") as response:
+                text = await response.text()
+
+        test_cases = [
+            {"name": "counter", "expected": "krawler_pages_total 3\n"},
+            {"name": "labelled counter", "expected": 'krawler_responses_total{status="200"} 1\n'},
+            {"name": "histogram bucket", "expected": 'krawler_ttfb_seconds_bucket{le="0.05"} 1\n'},
+            {"name": "histogram count", "expected": "krawler_ttfb_seconds_count 1\n"},
+            {"name": "gauge", "expected": "krawler_queue_depth 7\n"},
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+            self.assertIn(test_case["expected"], text)
+
+        test_out.log_starting_test("unknown gauges are left out")
+        self.assertNotIn("krawler_unknown", text)
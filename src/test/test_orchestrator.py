@@ -0,0 +1,111 @@
+import unittest
+
+from orchestrator.orchestrator import Orchestrator
+from test.common import test_out
+from test.mocks.mock_link_processor import MockLinkProcessor, construct_mock_link_processor
+from test.mocks.mock_pooler import MockPooler
+
+
+def construct_orchestrator(site_map: dict, recursion_limit: int, concurrency: int = 10) -> Orchestrator:
+    orchestrator = Orchestrator("www", "example-domain.com", recursion_limit, concurrency=concurrency)
+    orchestrator.link_processor_pool = MockPooler(construct_mock_link_processor, site_map)
+
+    return orchestrator
+
+
+def construct_wide_site_map(width: int) -> dict:
+    children = [f"https://www.example-domain.com/page-{index}" for index in range(width)]
+    return {"https://www.example-domain.com/": children}
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def test_crawl(self):
+        test_out.log_starting_test_set("Orchestrator - test crawl")
+
+        site_map = {
+            "https://www.example-domain.com/": ["https://www.example-domain.com/a", "https://www.example-domain.com/b"],
+            "https://www.example-domain.com/a": ["https://www.example-domain.com/", "https://www.example-domain.com/a/1"],
+            "https://www.example-domain.com/b": ["https://www.example-domain.com/a"],
+            "https://www.example-domain.com/a/1": ["https://www.example-domain.com/a/1/x"],
+        }
+
+        test_cases = [
+            {
+                "name": "recursion limit 3",
+                "recursion_limit": 3,
+                "expected": {
+                    "https://www.example-domain.com/": site_map["https://www.example-domain.com/"],
+                    "https://www.example-domain.com/a": site_map["https://www.example-domain.com/a"],
+                    "https://www.example-domain.com/b": site_map["https://www.example-domain.com/b"],
+                    "https://www.example-domain.com/a/1": "not processed - recursion limit reached",
+                }
+            },
+            {
+                "name": "unlimited recursion",
+                "recursion_limit": -1,
+                "expected": {
+                    "https://www.example-domain.com/": site_map["https://www.example-domain.com/"],
+                    "https://www.example-domain.com/a": site_map["https://www.example-domain.com/a"],
+                    "https://www.example-domain.com/b": site_map["https://www.example-domain.com/b"],
+                    "https://www.example-domain.com/a/1": site_map["https://www.example-domain.com/a/1"],
+                    "https://www.example-domain.com/a/1/x": [],
+                }
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            orchestrator = construct_orchestrator(site_map, test_case["recursion_limit"])
+            await orchestrator.crawl("https://www.example-domain.com/")
+
+            self.assertEqual(orchestrator.registered_links, test_case["expected"])
+
+    async def test_breadth_first(self):
+        test_out.log_starting_test_set("Orchestrator - test breadth first order")
+
+        site_map = {
+            "https://www.example-domain.com/": ["https://www.example-domain.com/a", "https://www.example-domain.com/b"],
+            "https://www.example-domain.com/a": ["https://www.example-domain.com/a/1"],
+            "https://www.example-domain.com/b": ["https://www.example-domain.com/b/1"],
+        }
+
+        orchestrator = construct_orchestrator(site_map, -1, concurrency=1)
+        await orchestrator.crawl("https://www.example-domain.com/")
+
+        link_processor: MockLinkProcessor = orchestrator.link_processor_pool.instance
+        self.assertEqual(link_processor.processed_links, [
+            "https://www.example-domain.com/",
+            "https://www.example-domain.com/a",
+            "https://www.example-domain.com/b",
+            "https://www.example-domain.com/a/1",
+            "https://www.example-domain.com/b/1",
+        ])
+
+    async def test_concurrency_limit(self):
+        test_out.log_starting_test_set("Orchestrator - test concurrency limit")
+
+        for concurrency in [1, 4, 16]:
+            test_out.log_starting_test(f"concurrency {concurrency}")
+
+            orchestrator = construct_orchestrator(construct_wide_site_map(200), -1, concurrency=concurrency)
+            await orchestrator.crawl("https://www.example-domain.com/")
+
+            link_processor: MockLinkProcessor = orchestrator.link_processor_pool.instance
+            self.assertEqual(len(link_processor.processed_links), 201)
+            self.assertEqual(link_processor.max_in_flight, concurrency)
+
+    async def test_bare_domain_alias(self):
+        test_out.log_starting_test_set("Orchestrator - test bare domain alias")
+
+        site_map = {
+            "https://www.example-domain.com/": ["https://www.example-domain.com/a"],
+        }
+
+        orchestrator = construct_orchestrator(site_map, -1)
+        await orchestrator.crawl("https://example-domain.com")
+
+        self.assertEqual(list(orchestrator.registered_links), [
+            "https://www.example-domain.com/",
+            "https://www.example-domain.com/a",
+        ])
@@ -1,12 +1,14 @@
 import unittest
 
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from http_transport.transport import Transport, TransportConfiguration
+from orchestrator.orchestrator import Orchestrator
 from page_loader import loader
+from politeness.scheduler import PolitenessConfiguration
 from test.common import test_out
-
-"""
-The test html link used here isn't guaranteed to work forever but it'll do for now - saves the effort of implementing a mockable http client pattern
-https://www3.pioneer.com/argentina/PETWS/test.html
-"""
+from url_normaliser.normaliser import UrlNormaliserConfiguration
 
 _test_page_html_content = [
     "<html>\r\n",
@@ -21,29 +23,193 @@ _test_page_html_content = [
 ]
 
 class Testing(unittest.IsolatedAsyncioTestCase):
+    """
+    Loads from a local server standing in for a small site - a static page, an icon and a missing page
+    """
+    async def asyncSetUp(self):
+        async def page(_: web.Request) -> web.Response:
+            return web.Response(body="".join(_test_page_html_content).encode("utf-8"), content_type="text/html")
+
+        async def icon(_: web.Request) -> web.Response:
+            return web.Response(body=b"\0" * 1024, content_type="image/x-icon")
+
+        app = web.Application()
+        app.router.add_get("/argentina/PETWS/test.html", page)
+        # served without an extension so the Content-Type decides, not the content filter
+        app.router.add_get("/favicon", icon)
+
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+        self.transport = Transport(TransportConfiguration())
+        await self.transport.open()
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+        await self.server.close()
+
+    def construct_page_loader(self) -> loader.PageLoader:
+        return loader.construct_page_loader(loader.PageLoaderConfiguration(self.transport))
+
     async def test_load_html(self):
         test_out.log_starting_test_set("PageLoader - test load html")
 
         expected = [line.encode(encoding="utf-8") for line in _test_page_html_content]
 
-        page_loader = loader.construct_page_loader()
-        html_response = await page_loader.load_html("https://www3.pioneer.com/argentina/PETWS/test.html")
+        page_loader = self.construct_page_loader()
+        html_response = await page_loader.load_html(str(self.server.make_url("/argentina/PETWS/test.html")))
 
         self.assertEqual(expected, html_response)
 
     async def test_invalid_content_type(self):
         test_out.log_starting_test_set("PageLoader - test invalid content type")
 
-        page_loader = loader.construct_page_loader()
+        page_loader = self.construct_page_loader()
 
         with self.assertRaises(loader.InvalidContentTypeException):
-            await page_loader.load_html("https://github.com/favicon.ico")
+            await page_loader.load_html(str(self.server.make_url("/favicon")))
 
     async def test_request_failed(self):
         test_out.log_starting_test_set("PageLoader - test request failed")
 
-        page_loader = loader.construct_page_loader()
+        page_loader = self.construct_page_loader()
 
         with self.assertRaises(loader.RequestFailedException):
-            await page_loader.load_html("https://fuery.co.uk/not/a/real/link")
-            
\ No newline at end of file
+            await page_loader.load_html(str(self.server.make_url("/not/a/real/link")))
+            
+
+class StreamingTesting(unittest.IsolatedAsyncioTestCase):
+    """
+    Streams from a local server rather than the internet
+    """
+    async def asyncSetUp(self):
+        async def handler(request: web.Request) -> web.Response:
+            size = int(request.match_info["size"])
+            return web.Response(body=b"x" * size, content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{size}", handler)
+
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        self.transport = Transport(TransportConfiguration())
+        await self.transport.open()
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+        await self.server.close()
+
+    async def test_stream_chunks(self):
+        test_out.log_starting_test_set("PageLoader - test stream chunks")
+
+        config = loader.PageLoaderConfiguration(self.transport, chunk_size=1024)
+        page_loader = loader.construct_page_loader(config)
+
+        async with page_loader.open_html(str(self.server.make_url("/10000"))) as page:
+            chunks = [chunk async for chunk in page.iter_chunks()]
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 10000)
+        self.assertFalse(page.truncated)
+
+    async def test_max_body_size(self):
+        test_out.log_starting_test_set("PageLoader - test max body size")
+
+        test_cases = [
+            {"name": "under limit", "size": 1000, "expected_bytes": 1000, "expected_truncated": False},
+            {"name": "at limit", "size": 4096, "expected_bytes": 4096, "expected_truncated": False},
+            {"name": "over limit", "size": 1000000, "expected_bytes": 4096, "expected_truncated": True},
+        ]
+
+        config = loader.PageLoaderConfiguration(self.transport, max_body_size=4096, chunk_size=1000)
+        page_loader = loader.construct_page_loader(config)
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            async with page_loader.open_html(str(self.server.make_url(f"/{test_case['size']}"))) as page:
+                body = b"".join([chunk async for chunk in page.iter_chunks()])
+
+            self.assertEqual(len(body), test_case["expected_bytes"])
+            self.assertEqual(page.bytes_read, test_case["expected_bytes"])
+            self.assertEqual(page.truncated, test_case["expected_truncated"])
+
+
+class ClientErrorTesting(unittest.IsolatedAsyncioTestCase):
+    """
+    Responses aiohttp raises for rather than returns - each fails its own page and never the krawl
+    """
+    async def asyncSetUp(self):
+        async def dropped(request: web.Request) -> web.StreamResponse:
+            # promises more body than it sends, then closes the connection
+            response = web.StreamResponse(headers={"Content-Type": "text/html", "Content-Length": "100000"})
+            await response.prepare(request)
+            await response.write(b"<html><a href='/'>home</a>")
+            request.transport.close()
+            return response
+
+        async def redirect_loop(_: web.Request) -> web.Response:
+            raise web.HTTPFound("/redirect-loop")
+
+        async def non_http_redirect(_: web.Request) -> web.Response:
+            raise web.HTTPFound("ftp://127.0.0.1/file")
+
+        async def home(_: web.Request) -> web.Response:
+            html = "".join(f"<a href='{path}'>link</a>" for path in ("/dropped", "/redirect-loop", "/non-http-redirect", "/fine"))
+            return web.Response(text=f"<html>{html}</html>", content_type="text/html")
+
+        async def fine(_: web.Request) -> web.Response:
+            return web.Response(text="<html></html>", content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/", home)
+        app.router.add_get("/fine", fine)
+        app.router.add_get("/dropped", dropped)
+        app.router.add_get("/redirect-loop", redirect_loop)
+        app.router.add_get("/non-http-redirect", non_http_redirect)
+
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_client_errors(self):
+        test_out.log_starting_test_set("PageLoader - test client errors")
+
+        test_cases = [
+            {"name": "connection dropped mid body", "path": "/dropped"},
+            {"name": "redirect loop", "path": "/redirect-loop"},
+            {"name": "redirect to a non http link", "path": "/non-http-redirect"},
+        ]
+
+        async with Transport(TransportConfiguration()) as transport:
+            page_loader = loader.construct_page_loader(loader.PageLoaderConfiguration(transport))
+
+            for test_case in test_cases:
+                test_out.log_starting_test(test_case["name"])
+
+                with self.assertRaises(loader.RequestFailedException):
+                    await page_loader.load_html(str(self.server.make_url(test_case["path"])))
+
+    async def test_client_errors_fail_the_page(self):
+        test_out.log_starting_test_set("PageLoader - test client errors fail the page, not the krawl")
+
+        pages = {}
+
+        async def record(link: str, _: list, metadata: dict):
+            pages[link] = metadata.get("status")
+
+        orchestrator = Orchestrator("", "127.0.0.1", -1, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                                    politeness_config=PolitenessConfiguration(0, max_retries=1), page_hooks=[record])
+        await orchestrator.crawl(str(self.server.make_url("/")))
+
+        url = lambda path: str(self.server.make_url(path))
+        self.assertEqual(pages[url("/fine")], 200)
+        # the body was dropped after the headers
+        self.assertEqual(pages[url("/dropped")], 200)
+        self.assertEqual(orchestrator.registered_links[url("/dropped")], [])
+        self.assertEqual(orchestrator.metrics.counters["pages_failed"], 3)
+        # refused without retrying, they would fail the same way again
+        self.assertEqual(orchestrator.metrics.counters["retries"], 0)
@@ -0,0 +1,97 @@
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from link_ripper.ripper import LinkRipperConfiguration
+from orchestrator.orchestrator import Orchestrator
+from parse_pool.pool import ParsePool, ParsePoolConfiguration
+from politeness.scheduler import PolitenessConfiguration
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+_test_page = (
+    b"<html><head><base href='https://www.example-domain.com/base/'><link href='/style.css'></head><body>"
+    b"<a href='relative/path'>relative</a><a href='../up/./a/level'>dot segments</a>"
+    b"<a href='example-domain.com/path'>alias</a><a href='//third-party.com'>third party</a>"
+    b"<a href='relative/path#fragment'>duplicate</a><img src='/image.png'></body></html>"
+)
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def test_parse(self):
+        test_out.log_starting_test_set("ParsePool - test parse")
+
+        test_cases = [
+            {
+                "name": "defaults",
+                "ripper_config": LinkRipperConfiguration(),
+                "expected": [
+                    "https://www.example-domain.com/style.css",
+                    "https://www.example-domain.com/base/relative/path",
+                    "https://www.example-domain.com/up/a/level",
+                    "https://www.example-domain.com/path",
+                    "https://third-party.com/",
+                ]
+            },
+            {
+                "name": "capture sources",
+                "ripper_config": LinkRipperConfiguration(capture_sources=True),
+                "expected": [
+                    "https://www.example-domain.com/style.css",
+                    "https://www.example-domain.com/base/relative/path",
+                    "https://www.example-domain.com/up/a/level",
+                    "https://www.example-domain.com/path",
+                    "https://third-party.com/",
+                    "https://www.example-domain.com/image.png",
+                ]
+            },
+        ]
+
+        normaliser_config = UrlNormaliserConfiguration(host_aliases={"example-domain.com": "www.example-domain.com"})
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            parse_pool = ParsePool(ParsePoolConfiguration(2, test_case["ripper_config"], normaliser_config))
+            parse_pool.open()
+
+            try:
+                links = await parse_pool.parse(_test_page, "https://www.example-domain.com/page")
+            finally:
+                parse_pool.close()
+
+            self.assertEqual(links, test_case["expected"])
+
+    async def test_crawl(self):
+        test_out.log_starting_test_set("ParsePool - test crawl")
+
+        async def handler(request: web.Request) -> web.Response:
+            index = int(request.match_info.get("index") or 0)
+            links = "".join(f"<a href='/page/{(index * 3 + offset) % 40}'>page</a>" for offset in range(1, 4))
+            return web.Response(text=f"<html><body>{links}<a href='https://third-party.com/'>x</a></body></html>", content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/", handler)
+        app.router.add_get("/page/{index}", handler)
+
+        server = TestServer(app, host="127.0.0.1")
+        await server.start_server()
+
+        results = []
+
+        try:
+            for workers in (0, 2):
+                test_out.log_starting_test(f"{workers} workers")
+
+                orchestrator = Orchestrator("", "127.0.0.1", -1, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                                            politeness_config=PolitenessConfiguration(0), workers=workers)
+                await orchestrator.crawl(str(server.make_url("/")))
+
+                results.append(orchestrator.registered_links)
+        finally:
+            await server.close()
+
+        # parsing in worker processes finds exactly what parsing on the event loop finds
+        self.assertEqual(len(results[0]), 41)
+        self.assertEqual(results[0], results[1])
@@ -0,0 +1,160 @@
+import asyncio
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from http_transport.transport import Transport, TransportConfiguration
+from page_loader import loader
+from politeness.scheduler import PolitenessConfiguration, PolitenessScheduler, parse_retry_after
+from test.common import test_out
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # responses served for each path, in order - the last one repeats
+        self.responses = {}
+        self.request_times = []
+
+        async def handler(request: web.Request) -> web.Response:
+            self.request_times.append(time.monotonic())
+
+            responses = self.responses[request.path]
+            status, headers = responses.pop(0) if len(responses) > 1 else responses[0]
+
+            return web.Response(status=status, headers=headers, text="<a href='/a'>a</a>", content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+        self.transport = Transport(TransportConfiguration())
+        await self.transport.open()
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+        await self.server.close()
+
+    def construct_page_loader(self, politeness_config: PolitenessConfiguration) -> loader.PageLoader:
+        config = loader.PageLoaderConfiguration(self.transport, scheduler=PolitenessScheduler(politeness_config))
+        return loader.construct_page_loader(config)
+
+    async def test_retries(self):
+        test_out.log_starting_test_set("Politeness - test retries")
+
+        test_cases = [
+            {
+                "name": "recovers after throttling",
+                "responses": [(429, {"Retry-After": "0"}), (503, {}), (200, {})],
+                "expected_requests": 3,
+                "expected_exception": None,
+            },
+            {
+                "name": "gives up after max retries",
+                "responses": [(502, {})],
+                "expected_requests": 3,
+                "expected_exception": loader.RequestFailedException,
+            },
+            {
+                "name": "does not retry a missing page",
+                "responses": [(404, {})],
+                "expected_requests": 1,
+                "expected_exception": loader.RequestFailedException,
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            self.responses["/page"] = list(test_case["responses"])
+            self.request_times = []
+
+            page_loader = self.construct_page_loader(PolitenessConfiguration(0, max_retries=2, retry_base_delay=0.01))
+
+            if test_case["expected_exception"] is None:
+                lines = await page_loader.load_html(str(self.server.make_url("/page")))
+                self.assertEqual(lines, [b"<a href='/a'>a</a>"])
+            else:
+                with self.assertRaises(test_case["expected_exception"]):
+                    await page_loader.load_html(str(self.server.make_url("/page")))
+
+            self.assertEqual(len(self.request_times), test_case["expected_requests"])
+
+    async def test_retry_after(self):
+        test_out.log_starting_test_set("Politeness - test retry after")
+
+        self.responses["/page"] = [(429, {"Retry-After": "1"}), (200, {})]
+
+        page_loader = self.construct_page_loader(PolitenessConfiguration(0, max_retries=1, retry_base_delay=0.01))
+        await page_loader.load_html(str(self.server.make_url("/page")))
+
+        self.assertGreaterEqual(self.request_times[1] - self.request_times[0], 0.9)
+
+    async def test_connection_error(self):
+        test_out.log_starting_test_set("Politeness - test connection error")
+
+        url = str(self.server.make_url("/page"))
+        await self.server.close()
+
+        page_loader = self.construct_page_loader(PolitenessConfiguration(0, max_retries=1, retry_base_delay=0.01))
+
+        with self.assertRaises(loader.RequestFailedException):
+            await page_loader.load_html(url)
+
+    async def test_rate_limit(self):
+        test_out.log_starting_test_set("Politeness - test rate limit")
+
+        scheduler = PolitenessScheduler(PolitenessConfiguration(requests_per_second=20, burst=2))
+
+        started = time.monotonic()
+        await asyncio.gather(*[scheduler.wait_turn("www.example-domain.com") for _ in range(6)])
+        elapsed = time.monotonic() - started
+
+        # two requests go straight away from the burst, the other four are paced at 20 a second
+        self.assertGreaterEqual(elapsed, 0.19)
+        self.assertLess(elapsed, 0.6)
+
+        # other hosts have their own bucket
+        started = time.monotonic()
+        await scheduler.wait_turn("other.example-domain.com")
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    async def test_adaptive_rate(self):
+        test_out.log_starting_test_set("Politeness - test adaptive rate")
+
+        scheduler = PolitenessScheduler(PolitenessConfiguration(requests_per_second=8, min_requests_per_second=1, latency_threshold=1))
+        host = scheduler.host_state("www.example-domain.com")
+
+        test_out.log_starting_test("throttled")
+        scheduler.record_response("www.example-domain.com", 429, 0.1)
+        self.assertEqual(host.rate, 4)
+
+        test_out.log_starting_test("floor")
+        for _ in range(10):
+            scheduler.record_response("www.example-domain.com", 503, 0.1)
+        self.assertEqual(host.rate, 1)
+
+        test_out.log_starting_test("recovery")
+        for _ in range(40):
+            scheduler.record_response("www.example-domain.com", 200, 0.1)
+        self.assertEqual(host.rate, 8)
+
+        test_out.log_starting_test("slow host")
+        scheduler.record_response("www.example-domain.com", 200, 20)
+        self.assertEqual(host.rate, 6)
+
+    async def test_parse_retry_after(self):
+        test_out.log_starting_test_set("Politeness - test parse retry after")
+
+        in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertAlmostEqual(parse_retry_after(in_a_minute), 60, delta=2)
+        self.assertEqual(parse_retry_after("Sun, 01 Jan 2000 00:00:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
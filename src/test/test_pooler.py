@@ -0,0 +1,161 @@
+import asyncio
+import itertools
+import unittest
+
+from instance_pooler.pooler import Pooler, PoolerConfiguration
+from test.common import test_out
+
+
+class Instance:
+    def __init__(self, number: int):
+        self.number = number
+        self.healthy = True
+
+
+def construct_counting_pool(config: PoolerConfiguration = None) -> Pooler:
+    numbers = itertools.count()
+    return Pooler(lambda _: Instance(next(numbers)), None, config)
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def test_bounded(self):
+        test_out.log_starting_test_set("Pooler - test bounded")
+
+        test_cases = [
+            {"name": "unbounded", "max_size": None, "users": 20, "expected_size": 20},
+            {"name": "bounded below the users", "max_size": 4, "users": 20, "expected_size": 4},
+            {"name": "bounded above the users", "max_size": 50, "users": 20, "expected_size": 20},
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            pool = construct_counting_pool(PoolerConfiguration(max_size=test_case["max_size"]))
+            in_use = [0, 0]
+
+            async def use():
+                async with pool.acquire():
+                    in_use[0] += 1
+                    in_use[1] = max(in_use[1], in_use[0])
+                    await asyncio.sleep(0.001)
+                    in_use[0] -= 1
+
+            await asyncio.gather(*[use() for _ in range(test_case["users"])])
+
+            self.assertEqual(in_use[1], test_case["expected_size"])
+            self.assertEqual(pool.stats()["size"], test_case["expected_size"])
+            self.assertEqual(pool.stats()["created"], test_case["expected_size"])
+            self.assertEqual(pool.stats()["in_use"], 0)
+            self.assertEqual(pool.stats()["free"], test_case["expected_size"])
+
+    async def test_fair_waiters(self):
+        test_out.log_starting_test_set("Pooler - test fair waiters")
+
+        pool = construct_counting_pool(PoolerConfiguration(max_size=1))
+        instance = await pool.get_instance()
+        served = []
+
+        async def wait(name: str):
+            async with pool.acquire():
+                served.append(name)
+
+        waiters = [asyncio.create_task(wait(name)) for name in ["first", "second", "third"]]
+        await asyncio.sleep(0)
+
+        test_out.log_starting_test("waiting while every instance is in use")
+        self.assertEqual(pool.stats()["waiting"], 3)
+
+        test_out.log_starting_test("a newcomer queues behind the waiters")
+        pool.return_instance(instance)
+        newcomer = asyncio.create_task(wait("newcomer"))
+        await asyncio.gather(*waiters, newcomer)
+
+        self.assertEqual(served, ["first", "second", "third", "newcomer"])
+        self.assertEqual(pool.stats()["created"], 1)
+
+    async def test_cancelled_waiter(self):
+        test_out.log_starting_test_set("Pooler - test cancelled waiter")
+
+        pool = construct_counting_pool(PoolerConfiguration(max_size=1))
+        instance = await pool.get_instance()
+
+        cancelled = asyncio.create_task(pool.get_instance())
+        waiting = asyncio.create_task(pool.get_instance())
+        await asyncio.sleep(0)
+
+        test_out.log_starting_test("cancelled before being served")
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        pool.return_instance(instance)
+        self.assertIs(await waiting, instance)
+
+        test_out.log_starting_test("cancelled after being handed an instance")
+        handed = asyncio.create_task(pool.get_instance())
+        after = asyncio.create_task(pool.get_instance())
+        await asyncio.sleep(0)
+
+        pool.return_instance(instance)
+        handed.cancel()
+        self.assertIs(await after, instance)
+        self.assertEqual(pool.stats()["in_use"], 1)
+        self.assertEqual(pool.stats()["waiting"], 0)
+
+    async def test_dropped_instances(self):
+        test_out.log_starting_test_set("Pooler - test dropped instances")
+
+        closed = []
+        config = PoolerConfiguration(max_size=2, idle_timeout=0.01, health_check=lambda instance: instance.healthy,
+                                     close_instance=closed.append)
+        pool = construct_counting_pool(config)
+
+        test_out.log_starting_test("unhealthy instances are closed rather than reused")
+        async with pool.acquire() as instance:
+            instance.healthy = False
+        self.assertEqual(closed, [instance])
+
+        async with pool.acquire() as replacement:
+            self.assertIsNot(replacement, instance)
+
+        test_out.log_starting_test("idle instances are closed")
+        await asyncio.sleep(0.02)
+        async with pool.acquire() as fresh:
+            self.assertIsNot(fresh, replacement)
+        self.assertEqual(closed, [instance, replacement])
+
+        test_out.log_starting_test("a dropped instance makes room for a waiter")
+        first = await pool.get_instance()
+        second = await pool.get_instance()
+        waiting = asyncio.create_task(pool.get_instance())
+        await asyncio.sleep(0)
+
+        first.healthy = False
+        pool.return_instance(first)
+        # the slot is counted for the waiter straight away, so a newcomer can't take it first
+        self.assertEqual(pool.stats()["size"], 2)
+        self.assertFalse(pool.has_capacity())
+        self.assertNotIn(await waiting, [first, second])
+        self.assertEqual(pool.stats()["size"], 2)
+
+        test_out.log_starting_test("closing drops every instance")
+        pool.return_instance(second)
+        pool.close()
+        self.assertIn(second, closed)
+        with self.assertRaises(RuntimeError):
+            await pool.get_instance()
+
+    async def test_repeated_use(self):
+        test_out.log_starting_test_set("Pooler - test repeated use")
+
+        # the original pool shrank by popping half its instance count from the free list without updating the count
+        pool = construct_counting_pool()
+
+        for users in [1, 7, 3, 16, 2, 1, 9]:
+            instances = [await pool.get_instance() for _ in range(users)]
+            for instance in instances:
+                pool.return_instance(instance)
+
+            stats = pool.stats()
+            self.assertEqual(stats["size"], stats["free"])
+            self.assertEqual(stats["in_use"], 0)
+
+        self.assertEqual(pool.stats()["created"], 16)
@@ -0,0 +1,179 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from frontier.frontier import FrontierConfiguration
+from frontier.priority import DepthScorer, FreshnessScorer, InlinkScorer, PathScorer, PriorityFrontier, SitemapPriorityScorer, default_scorers
+from orchestrator.orchestrator import CrawlBudgetConfiguration, Orchestrator
+from sitemap.sitemap import SitemapEntry
+from test.common import test_out
+from test.mocks.mock_link_processor import MockLinkProcessor, construct_mock_link_processor
+from test.mocks.mock_pooler import MockPooler
+
+
+def construct_orchestrator(site_map: dict, budget_config: CrawlBudgetConfiguration, frontier_config: FrontierConfiguration = None,
+                           recursion_limit: int = -1) -> Orchestrator:
+    orchestrator = Orchestrator("www", "example-domain.com", recursion_limit, concurrency=1, frontier_config=frontier_config, budget_config=budget_config)
+    orchestrator.link_processor_pool = MockPooler(construct_mock_link_processor, site_map)
+
+    return orchestrator
+
+
+async def drain(frontier: PriorityFrontier) -> list[str]:
+    links = []
+    while frontier.depth():
+        link, _ = await frontier.get()
+        links.append(link)
+        await frontier.done(link)
+    return links
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def test_scorers(self):
+        test_out.log_starting_test_set("Priority frontier - test scorers")
+
+        recent = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+
+        test_cases = [
+            {
+                "name": "no scorers keeps the order links were queued in",
+                "scorers": [],
+                "queued": [(["/c", "/a", "/b"], 1, None)],
+                "expected": ["/c", "/a", "/b"],
+            },
+            {
+                "name": "depth",
+                "scorers": [DepthScorer()],
+                "queued": [(["/deep"], 3, None), (["/shallow"], 1, None), (["/middle"], 2, None)],
+                "expected": ["/shallow", "/middle", "/deep"],
+            },
+            {
+                "name": "path weights",
+                "scorers": [PathScorer([("/blog/*", 2.0), ("/tag/*", -3.0)])],
+                "queued": [(["/tag/x", "/about", "/blog/post"], 1, None)],
+                "expected": ["/blog/post", "/about", "/tag/x"],
+            },
+            {
+                "name": "sitemap priority",
+                "scorers": [SitemapPriorityScorer()],
+                "queued": [
+                    (["/low"], 1, {"/low": SitemapEntry("/low", priority=0.1)}),
+                    (["/unlisted"], 1, None),
+                    (["/high"], 1, {"/high": SitemapEntry("/high", priority=0.9)}),
+                ],
+                "expected": ["/high", "/unlisted", "/low"],
+            },
+            {
+                "name": "freshness",
+                "scorers": [FreshnessScorer()],
+                "queued": [
+                    (["/old"], 1, {"/old": SitemapEntry("/old", lastmod="2001-01-01")}),
+                    (["/unparseable"], 1, {"/unparseable": SitemapEntry("/unparseable", lastmod="yesterday")}),
+                    (["/recent"], 1, {"/recent": SitemapEntry("/recent", lastmod=recent)}),
+                ],
+                "expected": ["/recent", "/old", "/unparseable"],
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            frontier = PriorityFrontier(test_case["scorers"])
+            for links, depth, hints in test_case["queued"]:
+                await frontier.add(links, depth, hints)
+
+            self.assertEqual(await drain(frontier), test_case["expected"])
+
+    async def test_rescoring(self):
+        test_out.log_starting_test_set("Priority frontier - test rescoring")
+
+        frontier = PriorityFrontier([InlinkScorer()])
+
+        test_out.log_starting_test("links found again while waiting move up")
+        self.assertEqual(await frontier.add(["/a", "/b", "/c"], 1), ["/a", "/b", "/c"])
+        self.assertEqual(await frontier.add(["/c", "/b"], 2), [])
+        self.assertEqual(await frontier.add(["/c"], 2), [])
+        self.assertEqual(frontier.depth(), 3)
+        self.assertEqual(await drain(frontier), ["/c", "/b", "/a"])
+
+        test_out.log_starting_test("crawled links aren't queued again")
+        self.assertEqual(await frontier.add(["/a", "/d"], 1), ["/d"])
+        self.assertEqual(await drain(frontier), ["/d"])
+
+        test_out.log_starting_test("stale heap entries are compacted")
+        links = [f"/page-{index}" for index in range(100)]
+        await frontier.add(links, 1)
+        for _ in range(50):
+            await frontier.add(links, 1)
+        self.assertLessEqual(len(frontier.heap), 4 * len(frontier.candidates) + 1024)
+        self.assertEqual(sorted(await drain(frontier)), sorted(links))
+
+    async def test_budget(self):
+        test_out.log_starting_test_set("Orchestrator - test crawl budget")
+
+        site_map = {
+            "https://www.example-domain.com/": [f"https://www.example-domain.com/page-{index}" for index in range(20)],
+        }
+
+        test_cases = [
+            {"name": "unlimited", "budget": CrawlBudgetConfiguration(), "expected_pages": 21},
+            {"name": "max pages", "budget": CrawlBudgetConfiguration(max_pages=5), "expected_pages": 5},
+            {"name": "max pages above the site", "budget": CrawlBudgetConfiguration(max_pages=50), "expected_pages": 21},
+            {"name": "max duration spent", "budget": CrawlBudgetConfiguration(max_duration=0), "expected_pages": 0},
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            orchestrator = construct_orchestrator(site_map, test_case["budget"])
+            await orchestrator.crawl("https://www.example-domain.com/")
+
+            link_processor: MockLinkProcessor = orchestrator.link_processor_pool.instance
+            self.assertEqual(len(link_processor.processed_links), test_case["expected_pages"])
+            # links the budget stopped are left out of the results rather than registered unfinished
+            self.assertEqual(set(orchestrator.registered_links), set(link_processor.processed_links))
+            self.assertNotIn(None, orchestrator.registered_links.values())
+
+    async def test_priority_budget(self):
+        test_out.log_starting_test_set("Orchestrator - test priority crawl on a budget")
+
+        base = "https://www.example-domain.com"
+        site_map = {
+            f"{base}/": [f"{base}/tag/{index}" for index in range(10)] + [f"{base}/docs/{index}" for index in range(3)],
+            f"{base}/docs/0": [f"{base}/docs/0/a"],
+        }
+
+        frontier_config = FrontierConfiguration(scorers=default_scorers([("/docs/*", 3.0), ("/tag/*", -5.0)]))
+        orchestrator = construct_orchestrator(site_map, CrawlBudgetConfiguration(max_pages=5), frontier_config)
+        await orchestrator.crawl("https://www.example-domain.com/")
+
+        # the docs pages a level down still come before any tag page
+        link_processor: MockLinkProcessor = orchestrator.link_processor_pool.instance
+        self.assertEqual(link_processor.processed_links, [f"{base}/", f"{base}/docs/0", f"{base}/docs/1", f"{base}/docs/2", f"{base}/docs/0/a"])
+
+    async def test_shallower_link(self):
+        test_out.log_starting_test_set("Priority frontier - test a link found again from a shallower page")
+
+        test_out.log_starting_test("the shallowest depth is kept and rescored")
+        frontier = PriorityFrontier([DepthScorer()])
+        await frontier.add(["/deep"], 4)
+        await frontier.add(["/middle"], 3)
+        await frontier.add(["/deep"], 2)
+        self.assertEqual(await frontier.get(), ("/deep", 2))
+
+        test_out.log_starting_test("a page within the recursion limit isn't cut off")
+        base = "https://www.example-domain.com"
+        # /z is found at depth 4 down the heavily weighted /a pages before /b finds it at depth 3
+        site_map = {
+            f"{base}/": [f"{base}/a/1", f"{base}/b"],
+            f"{base}/a/1": [f"{base}/a/2"],
+            f"{base}/a/2": [f"{base}/a/3", f"{base}/z"],
+            f"{base}/b": [f"{base}/z"],
+        }
+
+        frontier_config = FrontierConfiguration(scorers=[DepthScorer(), PathScorer([("/a/*", 10.0)])])
+        orchestrator = construct_orchestrator(site_map, CrawlBudgetConfiguration(), frontier_config, recursion_limit=4)
+        await orchestrator.crawl("https://www.example-domain.com/")
+
+        link_processor: MockLinkProcessor = orchestrator.link_processor_pool.instance
+        self.assertEqual(link_processor.processed_links, [f"{base}/", f"{base}/a/1", f"{base}/a/2", f"{base}/b", f"{base}/z"])
+        self.assertEqual(orchestrator.registered_links[f"{base}/a/3"], "not processed - recursion limit reached")
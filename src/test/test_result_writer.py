@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+from orchestrator.orchestrator import Orchestrator
+from result_writer import assemble, writer
+from test.common import test_out
+from test.mocks.mock_link_processor import construct_mock_link_processor
+from test.mocks.mock_pooler import MockPooler
+
+_site_map = {
+    "https://www.example-domain.com/": ["https://www.example-domain.com/a", "https://www.example-domain.com/b"],
+    "https://www.example-domain.com/a": ["https://www.example-domain.com/a/1", "https://www.example-domain.com/"],
+    "https://www.example-domain.com/b": ["https://www.example-domain.com/b/1"],
+    "https://www.example-domain.com/a/1": ["https://www.example-domain.com/a/1/x"],
+}
+
+
+async def crawl(writer_config: writer.ResultWriterConfiguration = None) -> Orchestrator:
+    orchestrator = Orchestrator("www", "example-domain.com", 3, writer_config=writer_config)
+    orchestrator.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+    await orchestrator.crawl("www.example-domain.com/")
+
+    return orchestrator
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_ndjson_output(self):
+        test_out.log_starting_test_set("ResultWriter - test ndjson output")
+
+        expected = (await crawl()).registered_links
+
+        for compress in [False, True]:
+            test_out.log_starting_test(f"compress: {compress}")
+
+            path = os.path.join(self.directory.name, "krawl.ndjson" + (".gz" if compress else ""))
+            orchestrator = await crawl(writer.ResultWriterConfiguration(path, writer.NDJSON, compress))
+
+            # page links are written out rather than kept
+            self.assertEqual(set(orchestrator.registered_links.values()), {True})
+
+            records = list(writer.read_records(path))
+            self.assertEqual(len(records), len(expected))
+            self.assertEqual(assemble.assemble(path), expected)
+
+    async def test_json_output(self):
+        test_out.log_starting_test_set("ResultWriter - test json output")
+
+        path = os.path.join(self.directory.name, "krawl.json")
+        orchestrator = await crawl(writer.ResultWriterConfiguration(path, writer.JSON))
+
+        with open(path) as file:
+            self.assertEqual(file.read(), json.dumps(orchestrator.registered_links, indent=2))
+
+    async def test_partial_record(self):
+        test_out.log_starting_test_set("ResultWriter - test partial record")
+
+        path = os.path.join(self.directory.name, "krawl.ndjson")
+        with open(path, "w") as file:
+            file.write('{"url": "https://www.example-domain.com/", "links": []}\n{"url": "https://www.exam')
+
+        self.assertEqual(assemble.assemble(path), {"https://www.example-domain.com/": []})
@@ -0,0 +1,158 @@
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from http_transport.transport import Transport, TransportConfiguration
+from politeness.scheduler import PolitenessConfiguration, PolitenessScheduler
+from robots_txt.robots import RobotsCache, RobotsConfiguration, parse_robots
+from test.common import test_out
+
+robots_txt = """
+# comments are ignored
+User-agent: *
+Disallow: /private
+Allow: /private/public
+Disallow: /*.pdf$
+Disallow: /search*q=
+Crawl-delay: 2
+
+User-agent: OtherBot
+User-agent: Krawler
+Disallow: /krawler-only
+Crawl-delay: 0.5
+
+User-agent: BadBot
+Disallow: /
+
+Sitemap: https://www.example-domain.com/sitemap.xml
+"""
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    def test_parse_robots(self):
+        test_out.log_starting_test_set("Robots - test parse robots")
+
+        test_cases = [
+            {
+                "name": "default group",
+                "user_agent": "SomeBot",
+                "allowed": ["/", "/public", "/private/public/page", "/file.pdf?x=1", "/search?page=1"],
+                "disallowed": ["/private", "/private/page", "/file.pdf", "/docs/file.pdf", "/search?page=1&q=x"],
+                "crawl_delay": 2,
+            },
+            {
+                "name": "named group, shared between agents",
+                "user_agent": "Krawler/1.0",
+                "allowed": ["/", "/private", "/file.pdf"],
+                "disallowed": ["/krawler-only", "/krawler-only/page"],
+                "crawl_delay": 0.5,
+            },
+            {
+                "name": "disallow everything",
+                "user_agent": "BadBot",
+                "allowed": [],
+                "disallowed": ["/", "/page"],
+                "crawl_delay": None,
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            rules = parse_robots(robots_txt, test_case["user_agent"])
+
+            for path in test_case["allowed"]:
+                self.assertTrue(rules.allowed(path), path)
+            for path in test_case["disallowed"]:
+                self.assertFalse(rules.allowed(path), path)
+
+            self.assertEqual(rules.crawl_delay, test_case["crawl_delay"])
+            self.assertEqual(rules.sitemaps, ["https://www.example-domain.com/sitemap.xml"])
+
+    def test_group_matching(self):
+        test_out.log_starting_test_set("Robots - test group matching")
+
+        test_cases = [
+            {"name": "case insensitive", "robots": "User-agent: KRAWLER\nDisallow: /\n", "user_agent": "Krawler/1.0", "allowed": False},
+            {"name": "versioned user-agent line", "robots": "User-agent: krawler/2.0\nDisallow: /\n", "user_agent": "Krawler/1.0", "allowed": False},
+            {"name": "empty user-agent line", "robots": "User-agent:\nDisallow: /\n", "user_agent": "Krawler/1.0", "allowed": True},
+            {"name": "part of the token", "robots": "User-agent: Krawl\nDisallow: /\n", "user_agent": "Krawler/1.0", "allowed": True},
+            {"name": "token that contains ours", "robots": "User-agent: KrawlerPlus\nDisallow: /\n", "user_agent": "Krawler", "allowed": True},
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+            rules = parse_robots(test_case["robots"], test_case["user_agent"])
+            self.assertEqual(rules.allowed("/page"), test_case["allowed"])
+
+    def test_longest_match(self):
+        test_out.log_starting_test_set("Robots - test longest match")
+
+        rules = parse_robots("User-agent: *\nAllow: /page\nDisallow: /page\nDisallow: /pa\nAllow: /p*e/x", "Krawler")
+
+        # allow wins a tie, otherwise the longest rule wins whichever order the rules are in
+        self.assertTrue(rules.allowed("/page"))
+        self.assertFalse(rules.allowed("/pan"))
+        self.assertTrue(rules.allowed("/pa/e/x"))
+
+    async def test_robots_cache(self):
+        test_out.log_starting_test_set("Robots - test robots cache")
+
+        # the statuses robots.txt is served with in turn, the last one is repeated
+        statuses = []
+        requests = []
+        user_agents = set()
+
+        async def handler(request: web.Request) -> web.Response:
+            requests.append(request.path)
+            user_agents.add(request.headers.get("User-Agent"))
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            return web.Response(status=status, text=robots_txt, content_type="text/plain")
+
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+
+        server = TestServer(app, host="127.0.0.1")
+        await server.start_server()
+
+        transport = Transport(TransportConfiguration())
+
+        async with transport:
+            test_cases = [
+                {"name": "robots.txt", "statuses": [200], "allowed": True, "disallowed": False, "min_delay": 0.5, "requests": 1},
+                {"name": "missing robots.txt allows everything", "statuses": [404], "allowed": True, "disallowed": True, "min_delay": 0, "requests": 1},
+                {"name": "transient failure is retried", "statuses": [503, 429, 200], "allowed": True, "disallowed": False, "min_delay": 0.5, "requests": 3},
+                {"name": "failing server disallows everything once retries run out", "statuses": [503], "allowed": False, "disallowed": False, "min_delay": 0, "requests": 3},
+            ]
+
+            for test_case in test_cases:
+                test_out.log_starting_test(test_case["name"])
+
+                statuses[:] = test_case["statuses"]
+                requests.clear()
+
+                scheduler = PolitenessScheduler(PolitenessConfiguration(0, max_retries=2, retry_base_delay=0.01))
+                robots = RobotsCache(RobotsConfiguration(), transport, scheduler)
+
+                with self.assertNoLogs("robots_txt.robots") if test_case["allowed"] else self.assertLogs("robots_txt.robots", "WARNING"):
+                    self.assertEqual(await robots.allowed(str(server.make_url("/page"))), test_case["allowed"])
+                self.assertEqual(await robots.allowed(str(server.make_url("/krawler-only"))), test_case["disallowed"])
+
+                # fetched once per origin, retries aside
+                self.assertEqual(requests, ["/robots.txt"] * test_case["requests"])
+                self.assertEqual(scheduler.host_state("127.0.0.1").min_delay, test_case["min_delay"])
+
+            test_out.log_starting_test("requests are made as the agent robots.txt is read for")
+            self.assertEqual(user_agents, {"Krawler/1.0"})
+
+            test_out.log_starting_test("unreachable server is retried, then disallows everything")
+            scheduler = PolitenessScheduler(PolitenessConfiguration(0, max_retries=1, retry_base_delay=0.01))
+            robots = RobotsCache(RobotsConfiguration(), transport, scheduler)
+            port = server.port
+            await server.close()
+
+            with self.assertLogs("robots_txt.robots", "WARNING"):
+                self.assertFalse(await robots.allowed(f"http://127.0.0.1:{port}/page"))
+
+        await server.close()
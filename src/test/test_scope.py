@@ -0,0 +1,212 @@
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawl_scope.scope import InvalidScopeRuleException, PathTrie, ScopeConfiguration, construct_scope, parse_rule
+from orchestrator.orchestrator import Orchestrator
+from politeness.scheduler import PolitenessConfiguration
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+
+def construct_site(pages: dict) -> web.Application:
+    # {path: [links]}, anything else is a 404
+    async def handler(request: web.Request) -> web.Response:
+        if request.path not in pages:
+            raise web.HTTPNotFound()
+
+        html = "".join(f"<a href='{link}'>link</a>" for link in pages[request.path])
+        return web.Response(text=f"<html>{html}</html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    return app
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def test_parse_rule(self):
+        test_out.log_starting_test_set("Scope - test parse rule")
+
+        test_cases = [
+            {"name": "exact host", "rule": "Blog.Example-Domain.com", "expected": ("host", "blog.example-domain.com", "blog.example-domain.com")},
+            {"name": "host suffix", "rule": ".example-domain.com", "expected": ("suffix", "example-domain.com", "example-domain.com")},
+            {"name": "path on any host", "rule": "/docs/", "expected": ("path", None, "/docs/")},
+            {"name": "path on one host", "rule": "example-domain.com/docs", "expected": ("path", "example-domain.com", "/docs")},
+            {"name": "regex", "rule": r"re:\?page=\d+", "expected": ("regex", None, r"\?page=\d+")},
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+            self.assertEqual(parse_rule(test_case["rule"]), test_case["expected"])
+
+        test_out.log_starting_test("invalid rules")
+        for rule in ("", ".", "re:(", "https://example-domain.com", ".example-domain.com/docs"):
+            with self.assertRaises(InvalidScopeRuleException):
+                parse_rule(rule)
+
+    async def test_path_trie(self):
+        test_out.log_starting_test_set("Scope - test path trie")
+
+        trie = PathTrie()
+        for prefix in ("/docs/", "/blog/2024"):
+            trie.add(prefix)
+
+        test_cases = {
+            "/docs": True,
+            "/docs/": True,
+            "/docs/api/index.html": True,
+            "/blog/2024/post": True,
+            "/blog/2023/post": False,
+            "/blog": False,
+            "/docsearch": False,
+            "/": False,
+        }
+
+        for path, expected in test_cases.items():
+            test_out.log_starting_test(path)
+            self.assertEqual(trie.matches(path), expected)
+
+        test_out.log_starting_test("the root covers every path")
+        trie.add("/")
+        self.assertTrue(trie.matches("/anything/at/all"))
+
+    async def test_in_scope(self):
+        test_out.log_starting_test_set("Scope - test in scope")
+
+        test_cases = [
+            {
+                "name": "seeds",
+                "subdomain": "www",
+                "host": "example-domain.com",
+                "config": ScopeConfiguration(["https://blog.example-domain.com/", "shop.example-domain.co.uk/start"]),
+                "links": {
+                    "https://www.example-domain.com/": True,
+                    "https://example-domain.com/": True,
+                    "https://blog.example-domain.com/post": True,
+                    "https://shop.example-domain.co.uk/basket": True,
+                    "https://other.example-domain.com/": False,
+                    "https://blog.example-domain.com.thirdparty.com/": False,
+                    "https://example-domain.co.uk/": False,
+                },
+            },
+            {
+                "name": "allowed hosts and suffixes",
+                "subdomain": "www",
+                "host": "example-domain.com",
+                "config": ScopeConfiguration(allow=[".example-domain.net", "cdn.example-domain.org"]),
+                "links": {
+                    "https://example-domain.net/": True,
+                    "https://a.b.example-domain.net/": True,
+                    "https://cdn.example-domain.org/": True,
+                    "https://not-example-domain.net/": False,
+                    "https://example-domain.net.thirdparty.com/": False,
+                    "https://www.cdn.example-domain.org/": False,
+                },
+            },
+            {
+                "name": "allowed paths",
+                "subdomain": "www",
+                "host": "example-domain.com",
+                "config": ScopeConfiguration(["https://blog.example-domain.com/"], allow=["/docs/", "blog.example-domain.com/2024/"]),
+                "links": {
+                    "https://www.example-domain.com/docs/start": True,
+                    "https://www.example-domain.com/about": False,
+                    "https://blog.example-domain.com/docs/": True,
+                    "https://blog.example-domain.com/2024/post": True,
+                    "https://www.example-domain.com/2024/post": False,
+                    "https://thirdparty.com/docs/": False,
+                },
+            },
+            {
+                "name": "allowed path on another host",
+                "subdomain": "www",
+                "host": "example-domain.com",
+                "config": ScopeConfiguration(allow=["other.com/blog/"]),
+                "links": {
+                    # the seed's host isn't limited by another host's paths
+                    "https://www.example-domain.com/a": True,
+                    "https://other.com/blog/x": True,
+                    "https://other.com/x": False,
+                    "https://www.other.com/blog/x": False,
+                },
+            },
+            {
+                "name": "links that aren't http",
+                "subdomain": "www",
+                "host": "example-domain.com",
+                "config": ScopeConfiguration(allow=[".example-domain.net"]),
+                "links": {
+                    "http://www.example-domain.com/x": True,
+                    "ftp://www.example-domain.com/x": False,
+                    "ws://example-domain.net/x": False,
+                    "mailto:someone@example-domain.com": False,
+                },
+            },
+            {
+                "name": "denied",
+                "subdomain": "",
+                "host": "example-domain.com",
+                "config": ScopeConfiguration(allow=[".example-domain.com"],
+                                             deny=["admin.example-domain.com", "/private/", r"re:[?&]sessionid="]),
+                "links": {
+                    "https://shop.example-domain.com/": True,
+                    "https://admin.example-domain.com/": False,
+                    "https://www.example-domain.com/private/page": False,
+                    "https://www.example-domain.com/privateer": True,
+                    "https://www.example-domain.com/page?sessionid=1": False,
+                },
+            },
+            {
+                "name": "allowed regex on any host",
+                "subdomain": "www",
+                "host": "example-domain.com",
+                "config": ScopeConfiguration(allow=[r"re:^https://partner\.com/example-domain/", r"re:/feeds?/"]),
+                "links": {
+                    "https://partner.com/example-domain/page": True,
+                    "https://partner.com/other/page": False,
+                    "https://thirdparty.com/feed/latest": True,
+                },
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            scope = construct_scope(test_case["subdomain"], test_case["host"], test_case["config"])
+            for link, expected in test_case["links"].items():
+                self.assertEqual(scope.in_scope(link), expected, link)
+
+    async def test_crawl_seeds(self):
+        test_out.log_starting_test_set("Scope - test crawl from several seeds")
+
+        # two sites on different hosts (127.0.0.1 and localhost) linking to each other and to a site that isn't in scope
+        first_pages, second_pages = {}, {}
+        first = TestServer(construct_site(first_pages), host="127.0.0.1")
+        second = TestServer(construct_site(second_pages), host="localhost")
+        for server in (first, second):
+            await server.start_server()
+
+        first_url, second_url = f"http://127.0.0.1:{first.port}", f"http://localhost:{second.port}"
+        first_pages.update({"/": ["/a", f"{second_url}/b", "http://thirdparty.invalid/"], "/a": ["/private/x"]})
+        second_pages.update({"/b": [f"{first_url}/a"], "/c": ["/private/y", "/d"], "/d": []})
+
+        try:
+            pages = {}
+
+            async def record(link: str, _: list, metadata: dict):
+                pages[link] = metadata.get("status")
+
+            seeds = [f"{second_url}/c"]
+            orchestrator = Orchestrator("", "127.0.0.1", -1,
+                                        normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                                        politeness_config=PolitenessConfiguration(0, max_retries=0), page_hooks=[record],
+                                        scope_config=ScopeConfiguration(seeds, deny=["/private/"]))
+            await orchestrator.crawl(f"{first_url}/")
+        finally:
+            for server in (first, second):
+                await server.close()
+
+        test_out.log_starting_test("both hosts are krawled from every seed, nothing else is")
+        self.assertEqual(set(pages.values()), {200})
+        self.assertEqual(sorted(pages), sorted([f"{first_url}/", f"{first_url}/a", f"{second_url}/b", f"{second_url}/c", f"{second_url}/d"]))
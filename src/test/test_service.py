@@ -0,0 +1,235 @@
+import asyncio
+import json
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from crawl_service.scheduler import FairScheduler
+from crawl_service.service import CrawlService, CrawlServiceConfiguration, parse_options
+from test.common import test_out
+
+
+def construct_site(pages: int, latency: float = 0.0, loads: dict = None) -> web.Application:
+    # page n links to pages 2n + 1 and 2n + 2 - a binary tree of pages
+    # loads tracks the pages being served at once, across every site sharing it
+    async def handler(request: web.Request) -> web.Response:
+        index = int(request.match_info.get("index") or 0)
+        if index >= pages:
+            raise web.HTTPNotFound()
+
+        if loads is not None:
+            loads["now"] += 1
+            loads["max"] = max(loads["max"], loads["now"])
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            if loads is not None:
+                loads["now"] -= 1
+
+        links = "".join(f"<a href='/page/{child}'>page</a>" for child in (2 * index + 1, 2 * index + 2))
+        return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    app.router.add_get("/page/{index}", handler)
+    return app
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.loads = {"now": 0, "max": 0}
+        self.site = TestServer(construct_site(15, latency=0.01, loads=self.loads), host="127.0.0.1")
+        await self.site.start_server()
+
+        self.service = CrawlService(CrawlServiceConfiguration(concurrency=3, progress_interval=0.05))
+        self.client = TestClient(TestServer(self.service.app(), host="127.0.0.1"))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.site.close()
+
+    def body(self, site: TestServer = None, **overrides) -> dict:
+        site = site if site is not None else self.site
+        return {"host": "127.0.0.1", "subdomain": "", "scheme": "http", "port": site.port, "recursion_limit": -1,
+                "rate_limit": 0, "respect_robots": False, **overrides}
+
+    async def events(self, job_id: str) -> list[dict]:
+        response = await self.client.get(f"/krawler/crawl/{job_id}/events")
+        self.assertEqual(response.headers["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in (await response.text()).splitlines()]
+
+    async def test_crawl(self):
+        test_out.log_starting_test_set("Service - test crawl")
+
+        test_out.log_starting_test("a krawl is started")
+        response = await self.client.post("/krawler/crawl", json=self.body())
+        self.assertEqual(response.status, 202)
+        job = await response.json()
+        self.assertEqual(job["status"], "running")
+        self.assertEqual(response.headers["Location"], f"/krawler/crawl/{job['id']}")
+
+        test_out.log_starting_test("its pages and end are streamed")
+        events = await self.events(job["id"])
+        pages = [event for event in events if event["event"] == "page"]
+
+        # 15 pages and the 16 missing pages they link to
+        self.assertEqual(len(pages), 31)
+        self.assertEqual(len({page["url"] for page in pages}), 31)
+        self.assertEqual(sorted(page["status"] for page in pages), [200] * 15 + [404] * 16)
+        self.assertEqual(events[-1], {"event": "done", "status": "finished", "error": None, "pages": 31})
+
+        test_out.log_starting_test("a stream opened later starts from the beginning")
+        # progress is sent while a stream waits, it isn't kept
+        self.assertIn("progress", [event["event"] for event in events])
+        kept = [event for event in events if event["event"] != "progress"]
+        self.assertEqual(await self.events(job["id"]), kept)
+
+        test_out.log_starting_test("status")
+        status = await (await self.client.get(f"/krawler/crawl/{job['id']}")).json()
+        self.assertEqual((status["status"], status["pages"], status["queued"]), ("finished", 31, 0))
+        self.assertEqual(status["stats"]["counters"]["pages"], 31)
+        # requests through the shared transport are traced to the krawl that made them
+        self.assertEqual(status["stats"]["responses"], {"200": 15, "404": 16})
+
+        listing = await (await self.client.get("/krawler/crawl")).json()
+        self.assertEqual([listed["id"] for listed in listing["jobs"]], [job["id"]])
+
+        test_out.log_starting_test("the krawl's events as the response to the post")
+        response = await self.client.post("/krawler/crawl", json=self.body(max_pages=3), headers={"Accept": "text/event-stream"})
+        self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+
+        blocks = (await response.text()).strip().split("\n\n")
+        self.assertEqual([block.split("\n")[0] for block in blocks].count("event: page"), 3)
+        self.assertEqual(json.loads(blocks[-1].split("\n")[1].removeprefix("data: "))["status"], "finished")
+
+    async def test_replay_truncated(self):
+        test_out.log_starting_test_set("Service - test replay is bounded")
+
+        self.service.config.replay_events = 5
+        job = await (await self.client.post("/krawler/crawl", json=self.body())).json()
+        await self.service.jobs[job["id"]].task
+
+        test_out.log_starting_test("only the latest events are kept")
+        self.assertEqual(len(self.service.jobs[job["id"]].events), 5)
+
+        test_out.log_starting_test("a later stream is told what it missed")
+        events = await self.events(job["id"])
+        # 31 pages and the end were published
+        self.assertEqual(events[0], {"event": "truncated", "skipped": 27})
+        self.assertEqual([event["event"] for event in events[1:]], ["page"] * 4 + ["done"])
+        self.assertEqual(events[-1]["pages"], 31)
+
+    async def test_shared_limit(self):
+        test_out.log_starting_test_set("Service - test krawls share the fetch limit")
+
+        other = TestServer(construct_site(15, latency=0.01, loads=self.loads), host="127.0.0.1")
+        await other.start_server()
+
+        try:
+            jobs = [await (await self.client.post("/krawler/crawl", json=body)).json()
+                    for body in (self.body(concurrency=10), self.body(other, concurrency=10))]
+            ends = [(await self.events(job["id"]))[-1] for job in jobs]
+        finally:
+            await other.close()
+
+        self.assertEqual([end["pages"] for end in ends], [31, 31])
+        # the service allows 3 page loads at once, whatever each krawl asks for
+        self.assertLessEqual(self.loads["max"], 3)
+        self.assertEqual(self.service.scheduler.stats()["in_use"], 0)
+
+    async def test_cancel(self):
+        test_out.log_starting_test_set("Service - test cancel")
+
+        slow = TestServer(construct_site(1000, latency=0.2), host="127.0.0.1")
+        await slow.start_server()
+
+        try:
+            job = await (await self.client.post("/krawler/crawl", json=self.body(slow))).json()
+            await asyncio.sleep(0.3)
+
+            response = await self.client.delete(f"/krawler/crawl/{job['id']}")
+            self.assertEqual((await response.json())["status"], "cancelled")
+
+            events = await self.events(job["id"])
+            self.assertEqual(events[-1]["event"], "done")
+            self.assertEqual(events[-1]["status"], "cancelled")
+            self.assertEqual(self.service.scheduler.stats()["in_use"], 0)
+
+            test_out.log_starting_test("cancelled before it started")
+            job = self.service.start_job(*parse_options(self.body(slow)))
+            await self.client.delete(f"/krawler/crawl/{job.id}")
+            self.assertEqual(job.status, "cancelled")
+        finally:
+            await slow.close()
+
+    async def test_bad_requests(self):
+        test_out.log_starting_test_set("Service - test bad requests")
+
+        test_cases = [
+            {"name": "not json", "data": "{", "status": 400},
+            {"name": "not an object", "data": "[]", "status": 400},
+            {"name": "no host", "data": json.dumps({"subdomain": "www"}), "status": 400},
+            {"name": "unknown option", "data": json.dumps({"host": "example.com", "output": "/etc/passwd"}), "status": 400},
+            {"name": "wrong type", "data": json.dumps({"host": "example.com", "max_pages": "ten"}), "status": 400},
+            {"name": "bool for an int", "data": json.dumps({"host": "example.com", "concurrency": True}), "status": 400},
+            {"name": "bad scheme", "data": json.dumps({"host": "example.com", "scheme": "ftp"}), "status": 400},
+            {"name": "bad path weights", "data": json.dumps({"host": "example.com", "path_weights": [1]}), "status": 400},
+            {"name": "bad seeds", "data": json.dumps({"host": "example.com", "seeds": [1]}), "status": 400},
+            {"name": "bad scope rule", "data": json.dumps({"host": "example.com", "deny": ["re:("]}), "status": 400},
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+            response = await self.client.post("/krawler/crawl", data=test_case["data"], headers={"Content-Type": "application/json"})
+            self.assertEqual(response.status, test_case["status"])
+            self.assertIn("error", await response.json())
+
+        test_out.log_starting_test("unknown krawl")
+        for method in ("GET", "DELETE"):
+            response = await self.client.request(method, "/krawler/crawl/missing")
+            self.assertEqual(response.status, 404)
+
+        test_out.log_starting_test("domain and extension")
+        response = await self.client.post("/krawler/crawl", json={"domain": "example-domain", "extension": ".co.uk", "max_pages": 0})
+        self.assertEqual((await response.json())["base_link"], "http://www.example-domain.co.uk/")
+
+        test_out.log_starting_test("scheme")
+        self.assertEqual(parse_options({"host": "example.com"})[0].base_link(), "http://www.example.com/")
+        self.assertEqual(parse_options({"host": "example.com", "scheme": "https"})[0].base_link(), "https://www.example.com/")
+
+        test_out.log_starting_test("too many krawls")
+        self.service.config.max_jobs = 0
+        response = await self.client.post("/krawler/crawl", json=self.body())
+        self.assertEqual(response.status, 503)
+
+    async def test_fair_scheduler(self):
+        test_out.log_starting_test_set("Service - test fair scheduler")
+
+        scheduler = FairScheduler(1)
+        order = []
+        release = asyncio.Event()
+
+        async def fetch(tenant: str, number: int):
+            async with scheduler.acquire(tenant):
+                order.append(f"{tenant}{number}")
+                await release.wait()
+
+        # a holds the only slot, a has three more waiting before b and c ask
+        tasks = [asyncio.create_task(fetch("a", number)) for number in range(4)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(fetch(tenant, 0)) for tenant in ("b", "c")]
+        await asyncio.sleep(0)
+
+        test_out.log_starting_test("waiting tenants take turns")
+        self.assertEqual(order, ["a0"])
+        self.assertEqual(scheduler.stats(), {"total": 1, "in_use": 1, "waiting": 5, "tenants": {"a": 1}})
+
+        test_out.log_starting_test("a cancelled waiter gives up its place")
+        tasks[2].cancel()
+
+        release.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(order, ["a0", "a1", "b0", "c0", "a3"])
+        self.assertEqual(scheduler.stats(), {"total": 1, "in_use": 0, "waiting": 0, "tenants": {}})
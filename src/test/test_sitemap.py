@@ -0,0 +1,145 @@
+import gzip
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from http_transport.transport import Transport, TransportConfiguration
+from orchestrator.orchestrator import Orchestrator
+from robots_txt.robots import RobotsConfiguration
+from sitemap.sitemap import SitemapConfiguration, SitemapParser, SitemapReader
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+
+def urlset(links: list[str], priority: str = None) -> bytes:
+    priority = f"<priority>{priority}</priority>" if priority is not None else ""
+    urls = "".join(f"<url><loc>{link}</loc>{priority}<lastmod>2024-01-01</lastmod></url>" for link in links)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'.encode()
+
+
+def sitemap_index(links: list[str]) -> bytes:
+    sitemaps = "".join(f"<sitemap><loc>{link}</loc></sitemap>" for link in links)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{sitemaps}</sitemapindex>'.encode()
+
+
+def feed_in_chunks(parser: SitemapParser, content: bytes, chunk_size: int) -> tuple[list, list]:
+    entries = []
+    sitemaps = []
+
+    for index in range(0, len(content), chunk_size):
+        found_entries, found_sitemaps = parser.feed(content[index:index + chunk_size])
+        entries.extend(found_entries)
+        sitemaps.extend(found_sitemaps)
+
+    found_entries, found_sitemaps = parser.close()
+    return entries + found_entries, sitemaps + found_sitemaps
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.routes = {}
+
+        async def handler(request: web.Request) -> web.Response:
+            if request.path not in self.routes:
+                return web.Response(status=404)
+
+            content_type, body = self.routes[request.path]
+            return web.Response(body=body, content_type=content_type)
+
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(path))
+
+    def test_parser(self):
+        test_out.log_starting_test_set("Sitemap - test parser")
+
+        links = [f"https://www.example-domain.com/page-{index}" for index in range(100)]
+
+        test_cases = [
+            {"name": "plain", "content": urlset(links, "0.8")},
+            {"name": "gzipped", "content": gzip.compress(urlset(links, "0.8"))},
+        ]
+
+        for test_case in test_cases:
+            for chunk_size in (7, 1024):
+                test_out.log_starting_test(f"{test_case['name']} - {chunk_size} byte chunks")
+
+                entries, sitemaps = feed_in_chunks(SitemapParser(), test_case["content"], chunk_size)
+
+                self.assertEqual([entry.url for entry in entries], links)
+                self.assertEqual({entry.priority for entry in entries}, {0.8})
+                self.assertEqual({entry.lastmod for entry in entries}, {"2024-01-01"})
+                self.assertEqual(sitemaps, [])
+
+        test_out.log_starting_test("index")
+        entries, sitemaps = feed_in_chunks(SitemapParser(), sitemap_index(links[:2]), 16)
+        self.assertEqual(entries, [])
+        self.assertEqual(sitemaps, links[:2])
+
+    async def test_reader(self):
+        test_out.log_starting_test_set("Sitemap - test reader")
+
+        self.routes = {
+            "/sitemap.xml": ("application/xml", sitemap_index([self.url("/a.xml.gz"), self.url("/b.xml"), self.url("/missing.xml")])),
+            "/a.xml.gz": ("application/gzip", gzip.compress(urlset(["https://www.example-domain.com/a"]))),
+            "/b.xml": ("application/xml", sitemap_index([self.url("/c.xml"), self.url("/sitemap.xml")])),
+            "/c.xml": ("application/xml", urlset(["https://www.example-domain.com/c-1", "https://www.example-domain.com/c-2"])),
+        }
+
+        test_cases = [
+            {
+                "name": "follows indexes",
+                "config": SitemapConfiguration(),
+                "expected": ["https://www.example-domain.com/a", "https://www.example-domain.com/c-1", "https://www.example-domain.com/c-2"],
+            },
+            {
+                "name": "max urls",
+                "config": SitemapConfiguration(max_urls=2),
+                "expected": ["https://www.example-domain.com/a", "https://www.example-domain.com/c-1"],
+            },
+            {
+                "name": "max depth",
+                "config": SitemapConfiguration(max_depth=1),
+                "expected": ["https://www.example-domain.com/a"],
+            },
+        ]
+
+        async with Transport(TransportConfiguration()) as transport:
+            for test_case in test_cases:
+                test_out.log_starting_test(test_case["name"])
+
+                reader = SitemapReader(test_case["config"], transport)
+                entries = [entry.url async for entry in reader.iter_entries([self.url("/sitemap.xml")])]
+
+                self.assertEqual(entries, test_case["expected"])
+
+    async def test_seeding(self):
+        test_out.log_starting_test_set("Sitemap - test seeding")
+
+        base = self.url("/")
+
+        self.routes = {
+            "/": ("text/html", b"<a href='/linked'>linked</a><a href='/private/linked'>private</a>"),
+            "/linked": ("text/html", b"<p>no links</p>"),
+            "/orphan": ("text/html", b"<a href='/from-orphan'>from orphan</a>"),
+            "/from-orphan": ("text/html", b"<p>no links</p>"),
+            "/robots.txt": ("text/plain", f"User-agent: *\nDisallow: /private\nSitemap: {self.url('/pages.xml')}".encode()),
+            "/pages.xml": ("application/xml", urlset([self.url("/orphan"), self.url("/private/listed"), "https://third-party.com/page"])),
+        }
+
+        orchestrator = Orchestrator("", "127.0.0.1", -1, normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                                    robots_config=RobotsConfiguration(), sitemap_config=SitemapConfiguration())
+        await orchestrator.crawl(base)
+
+        # orphan is only reachable through the sitemap, private pages are disallowed whether linked or listed
+        self.assertEqual(set(orchestrator.registered_links), {base, self.url("/linked"), self.url("/orphan"), self.url("/from-orphan")})
+        self.assertEqual(orchestrator.skip_links, {self.url("/private/linked"), self.url("/private/listed")})
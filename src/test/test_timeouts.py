@@ -0,0 +1,160 @@
+import asyncio
+import time
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from http_transport.transport import (CONNECT_TIMEOUT, DEADLINE_TIMEOUT, FIRST_BYTE_TIMEOUT, READ_IDLE_TIMEOUT,
+                                      TOTAL_TIMEOUT, WATCHDOG_TIMEOUT, TimeoutConfiguration, Transport,
+                                      TransportConfiguration, timeout_kind)
+from orchestrator.orchestrator import CrawlBudgetConfiguration, Orchestrator
+from page_loader import loader
+from politeness.scheduler import PolitenessConfiguration
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliserConfiguration
+
+
+def construct_slow_site(links: list) -> web.Application:
+    # the home page links to links, set by each test
+    async def page(_: web.Request) -> web.Response:
+        html = "".join(f"<a href='{path}'>link</a>" for path in links)
+        return web.Response(text=f"<html>{html}</html>", content_type="text/html")
+
+    async def slow_headers(_: web.Request) -> web.Response:
+        await asyncio.sleep(2)
+        return web.Response(text="<html></html>", content_type="text/html")
+
+    async def stall(request: web.Request) -> web.StreamResponse:
+        # the headers and some of the body, then nothing
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        await response.prepare(request)
+        await response.write(b"<html><a href='/'>home</a>")
+        await asyncio.sleep(2)
+        return response
+
+    async def trickle(request: web.Request) -> web.StreamResponse:
+        # never idle for long, but never finished either
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        await response.prepare(request)
+        for _ in range(40):
+            await response.write(b"<p>slow</p>")
+            await asyncio.sleep(0.05)
+        return response
+
+    async def slow_page(request: web.Request) -> web.Response:
+        # a tree of slow pages, each with three children
+        index = int(request.match_info["index"])
+        await asyncio.sleep(0.3)
+        html = "".join(f"<a href='/slow/{3 * index + child}'>page</a>" for child in (1, 2, 3))
+        return web.Response(text=f"<html>{html}</html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", page)
+    app.router.add_get("/slow-headers", slow_headers)
+    app.router.add_get("/stall", stall)
+    app.router.add_get("/trickle", trickle)
+    app.router.add_get("/slow/{index}", slow_page)
+    return app
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.links = []
+        self.server = TestServer(construct_slow_site(self.links), host="127.0.0.1")
+        await self.server.start_server()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(path))
+
+    def construct_orchestrator(self, timeouts: TimeoutConfiguration, budget_config: CrawlBudgetConfiguration = None) -> Orchestrator:
+        pages = self.pages = {}
+
+        async def record(link: str, _: list, metadata: dict):
+            pages[link] = metadata
+
+        return Orchestrator("", "127.0.0.1", -1, TransportConfiguration(timeouts=timeouts), concurrency=2,
+                            normaliser_config=UrlNormaliserConfiguration(default_scheme="http"),
+                            politeness_config=PolitenessConfiguration(0, max_retries=0), budget_config=budget_config,
+                            page_hooks=[record])
+
+    async def test_page_loader_timeouts(self):
+        test_out.log_starting_test_set("Timeouts - test page loader timeouts")
+
+        timeouts = TimeoutConfiguration(first_byte=0.3, read_idle=0.3, total=0.6)
+        test_cases = [
+            {"name": "slow response headers", "path": "/slow-headers", "kind": FIRST_BYTE_TIMEOUT},
+            {"name": "stalled body", "path": "/stall", "kind": READ_IDLE_TIMEOUT},
+            {"name": "body that trickles in", "path": "/trickle", "kind": TOTAL_TIMEOUT},
+        ]
+
+        async with Transport(TransportConfiguration(timeouts=timeouts)) as transport:
+            for test_case in test_cases:
+                test_out.log_starting_test(test_case["name"])
+
+                page_loader = loader.construct_page_loader(loader.PageLoaderConfiguration(transport))
+                started = time.monotonic()
+
+                with self.assertRaises(loader.FetchTimeoutException) as raised:
+                    await page_loader.load_html(self.url(test_case["path"]))
+
+                self.assertEqual(raised.exception.kind, test_case["kind"])
+                self.assertLess(time.monotonic() - started, 1.5)
+
+                # recorded with the url that hit the limit
+                self.assertEqual(dict(page_loader.metrics.timeouts), {test_case["kind"]: 1})
+                timed_out = page_loader.metrics.snapshot()["timed_out"]
+                self.assertEqual([(entry["url"], entry["kind"]) for entry in timed_out], [(self.url(test_case["path"]), test_case["kind"])])
+
+        test_out.log_starting_test("which limit an error is")
+        self.assertEqual(timeout_kind(aiohttp.ConnectionTimeoutError()), CONNECT_TIMEOUT)
+        self.assertEqual(timeout_kind(aiohttp.SocketTimeoutError()), READ_IDLE_TIMEOUT)
+        self.assertEqual(timeout_kind(asyncio.TimeoutError()), TOTAL_TIMEOUT)
+        self.assertIsNone(timeout_kind(aiohttp.ClientConnectionError()))
+
+    async def test_slow_pages_fail(self):
+        test_out.log_starting_test_set("Timeouts - test slow pages fail rather than stall the krawl")
+
+        self.links.extend(["/slow-headers", "/stall", "/trickle"])
+        orchestrator = self.construct_orchestrator(TimeoutConfiguration(first_byte=0.3, read_idle=0.3, total=0.6))
+        await orchestrator.crawl(self.url("/"))
+
+        self.assertEqual({self.url(path): self.pages[self.url(path)].get("timeout") for path in self.links},
+                         {self.url("/slow-headers"): FIRST_BYTE_TIMEOUT, self.url("/stall"): READ_IDLE_TIMEOUT, self.url("/trickle"): TOTAL_TIMEOUT})
+        self.assertEqual(orchestrator.registered_links[self.url("/stall")], [])
+        self.assertEqual(orchestrator.metrics.counters["pages_failed"], 3)
+
+    async def test_watchdog(self):
+        test_out.log_starting_test_set("Timeouts - test watchdog")
+
+        # the request limits are off, only the watchdog stops the stalled pages
+        self.links.extend(["/slow-headers", "/stall"])
+        orchestrator = self.construct_orchestrator(TimeoutConfiguration(None, None, None, None, watchdog=0.3))
+
+        started = time.monotonic()
+        await orchestrator.crawl(self.url("/"))
+
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(self.pages[self.url("/stall")]["timeout"], WATCHDOG_TIMEOUT)
+        self.assertEqual(self.pages[self.url("/slow-headers")]["timeout"], WATCHDOG_TIMEOUT)
+        self.assertNotIn("timeout", self.pages[self.url("/")])
+        self.assertEqual(dict(orchestrator.metrics.timeouts), {WATCHDOG_TIMEOUT: 2})
+
+    async def test_deadline(self):
+        test_out.log_starting_test_set("Timeouts - test deadline")
+
+        # every slow page takes 0.3s and links to three more - the krawl would go on for a long time
+        self.links.append("/slow/0")
+        orchestrator = self.construct_orchestrator(TimeoutConfiguration(), CrawlBudgetConfiguration(deadline=0.5))
+
+        started = time.monotonic()
+        await orchestrator.crawl(self.url("/"))
+
+        self.assertLess(time.monotonic() - started, 1.0)
+        # the pages being fetched at the deadline are cut off
+        self.assertGreaterEqual(orchestrator.metrics.timeouts[DEADLINE_TIMEOUT], 1)
+        self.assertIn(DEADLINE_TIMEOUT, [metadata.get("timeout") for metadata in self.pages.values()])
@@ -0,0 +1,61 @@
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from http_transport.transport import Transport, TransportConfiguration, TransportClosedException
+from page_loader import loader
+from test.common import test_out
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client_addresses = []
+
+        async def handler(request: web.Request) -> web.Response:
+            # record the client side of the socket - a reused connection keeps the same port
+            self.client_addresses.append(request.transport.get_extra_info("peername"))
+            return web.Response(text="<a href='/other'>other</a>", content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_connection_reuse(self):
+        test_out.log_starting_test_set("Transport - test connection reuse")
+
+        async with Transport(TransportConfiguration()) as transport:
+            config = loader.PageLoaderConfiguration(transport)
+            page_loaders = [loader.construct_page_loader(config) for _ in range(3)]
+
+            for index, page_loader in enumerate(page_loaders):
+                await page_loader.load_html(str(self.server.make_url(f"/page-{index}")))
+
+        self.assertEqual(len(self.client_addresses), 3)
+        self.assertEqual(len(set(self.client_addresses)), 1)
+
+    async def test_connection_limit_per_host(self):
+        test_out.log_starting_test_set("Transport - test connection limit per host")
+
+        async with Transport(TransportConfiguration(connection_limit_per_host=2)) as transport:
+            connector = transport.get_session().connector
+
+            self.assertEqual(connector.limit_per_host, 2)
+            self.assertEqual(connector.limit, 100)
+
+    async def test_closed_transport(self):
+        test_out.log_starting_test_set("Transport - test closed transport")
+
+        transport = Transport(TransportConfiguration())
+        async with transport:
+            pass
+
+        page_loader = loader.construct_page_loader(loader.PageLoaderConfiguration(transport))
+
+        with self.assertRaises(TransportClosedException):
+            await page_loader.load_html(str(self.server.make_url("/")))
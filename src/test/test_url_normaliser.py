@@ -0,0 +1,123 @@
+import unittest
+
+from test.common import test_out
+from url_normaliser.normaliser import UrlNormaliser, UrlNormaliserConfiguration, remove_dot_segments
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    async def test_normalise(self):
+        test_out.log_starting_test_set("UrlNormaliser - test normalise")
+
+        test_cases = [
+            {
+                "name": "scheme and host",
+                "normaliser_config": {},
+                "parent_link": None,
+                "link_input_expected_output_pairs": {
+                    "example-domain.com": "http://example-domain.com/",
+                    "HTTP://WWW.Example-Domain.COM/Path": "http://www.example-domain.com/Path",
+                    "https://www.example-domain.com:443/": "https://www.example-domain.com/",
+                    "http://www.example-domain.com:80/": "http://www.example-domain.com/",
+                    "http://www.example-domain.com:8080/": "http://www.example-domain.com:8080/",
+                    "www.example-domain.com./path": "http://www.example-domain.com/path",
+                    "localhost:8080/path": "http://localhost:8080/path",
+                    "  www.example-domain.com/path  ": "http://www.example-domain.com/path",
+                }
+            },
+            {
+                "name": "path",
+                "normaliser_config": {},
+                "parent_link": None,
+                "link_input_expected_output_pairs": {
+                    "demo.cyotek.com//about.php": "http://demo.cyotek.com/about.php",
+                    "https://demo.cyotek.com/about.php": "https://demo.cyotek.com/about.php",
+                    "example-domain.com/a/./b/../c": "http://example-domain.com/a/c",
+                    "example-domain.com/a/b/..": "http://example-domain.com/a/",
+                    "example-domain.com/../../a": "http://example-domain.com/a",
+                    "example-domain.com/a b": "http://example-domain.com/a%20b",
+                    "example-domain.com/a%2fb": "http://example-domain.com/a%2Fb",
+                    "example-domain.com/path#fragment": "http://example-domain.com/path",
+                }
+            },
+            {
+                "name": "relative to parent",
+                "normaliser_config": {},
+                "parent_link": "http://www.example-domain.com/existing/page.php?query=1",
+                "link_input_expected_output_pairs": {
+                    "relative/path": "http://www.example-domain.com/existing/relative/path",
+                    "../relative/path": "http://www.example-domain.com/relative/path",
+                    "?query=2": "http://www.example-domain.com/existing/page.php?query=2",
+                    "#fragment": "http://www.example-domain.com/existing/page.php?query=1",
+                    "//cdn.example-domain.com/script.js": "http://cdn.example-domain.com/script.js",
+                    "about.php": "http://www.example-domain.com/existing/about.php",
+                    "thirdparty.com/path": "http://thirdparty.com/path",
+                }
+            },
+            {
+                "name": "non http links",
+                "normaliser_config": {},
+                "parent_link": "https://www.example-domain.com/",
+                "link_input_expected_output_pairs": {
+                    "mailto:someone@example-domain.com": "mailto:someone@example-domain.com",
+                    "javascript:void(0)": "javascript:void(0)",
+                    "tel:0123456789": "tel:0123456789",
+                    "http://www.example-domain.com:99999/": None,
+                }
+            },
+            {
+                "name": "host aliases",
+                "normaliser_config": {"host_aliases": {"fuery.co.uk": "www.fuery.co.uk"}},
+                "parent_link": None,
+                "link_input_expected_output_pairs": {
+                    "https://fuery.co.uk": "https://www.fuery.co.uk/",
+                    "fuery.co.uk/path": "http://www.fuery.co.uk/path",
+                    "www.fuery.co.uk/path": "http://www.fuery.co.uk/path",
+                    "sub.fuery.co.uk/path": "http://sub.fuery.co.uk/path",
+                }
+            },
+            {
+                "name": "query parameter filtering",
+                "normaliser_config": {"strip_query_params": ["utm_*", "session"], "sort_query": True},
+                "parent_link": None,
+                "link_input_expected_output_pairs": {
+                    "example-domain.com/?utm_source=x&utm_medium=y": "http://example-domain.com/",
+                    "example-domain.com/?b=2&session=abc&a=1": "http://example-domain.com/?a=1&b=2",
+                    "example-domain.com/?a=&b=2": "http://example-domain.com/?a=&b=2",
+                }
+            },
+            {
+                "name": "default scheme",
+                "normaliser_config": {"default_scheme": "https"},
+                "parent_link": None,
+                "link_input_expected_output_pairs": {
+                    "www.example-domain.com": "https://www.example-domain.com/",
+                    "//www.example-domain.com": "https://www.example-domain.com/",
+                    "http://www.example-domain.com": "http://www.example-domain.com/",
+                }
+            },
+        ]
+
+        for test_case in test_cases:
+            test_out.log_starting_test(test_case["name"])
+
+            normaliser = UrlNormaliser(UrlNormaliserConfiguration(**test_case["normaliser_config"]))
+
+            for input_link, expected in test_case["link_input_expected_output_pairs"].items():
+                out = normaliser.normalise(input_link, test_case["parent_link"])
+                self.assertEqual(out, expected, input_link)
+
+    async def test_remove_dot_segments(self):
+        test_out.log_starting_test_set("UrlNormaliser - test remove dot segments")
+
+        path_input_expected_output_pairs = {
+            "": "/",
+            "/": "/",
+            "/a/b/c/./../../g": "/a/g",
+            "/a/./b/.": "/a/b/",
+            "/..": "/",
+            "/a/b/../..": "/",
+            "/a.b/c..d": "/a.b/c..d",
+        }
+
+        for input_path, expected in path_input_expected_output_pairs.items():
+            self.assertEqual(remove_dot_segments(input_path), expected, input_path)
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+
+from orchestrator.orchestrator import Orchestrator
+from result_writer import writer
+from test.common import test_out
+from test.mocks.mock_link_processor import construct_mock_link_processor
+from test.mocks.mock_pooler import MockPooler
+from visited_set.visited import BLOOM, EXACT, FINGERPRINT, VisitedSetConfiguration, construct_visited_set
+
+_site_map = {
+    "https://www.example-domain.com/": ["https://www.example-domain.com/a", "https://www.example-domain.com/b"],
+    "https://www.example-domain.com/a": ["https://www.example-domain.com/a/1", "https://www.example-domain.com/"],
+    "https://www.example-domain.com/b": ["https://www.example-domain.com/b/1", "https://www.example-domain.com/a"],
+    "https://www.example-domain.com/a/1": ["https://www.example-domain.com/a/1/x"],
+}
+
+
+class Testing(unittest.IsolatedAsyncioTestCase):
+    def test_membership(self):
+        test_out.log_starting_test_set("VisitedSet - test membership")
+
+        links = [f"https://www.example-domain.com/section-{index % 97}/page-{index}" for index in range(20000)]
+        unseen_links = [f"https://www.example-domain.com/other/page-{index}" for index in range(20000)]
+
+        for mode in [EXACT, FINGERPRINT, BLOOM]:
+            test_out.log_starting_test(mode)
+
+            # a small initial capacity so the set has to grow several times
+            visited = construct_visited_set(VisitedSetConfiguration(mode, initial_capacity=1000, error_rate=1e-4))
+
+            added = sum(visited.add(link) for link in links)
+            self.assertFalse(any(visited.add(link) for link in links))
+            self.assertTrue(all(link in visited for link in links))
+            self.assertEqual(len(visited), added)
+
+            # a bloom filter can mistake a new link for a seen one, fingerprints practically never do at this size
+            false_positives = len(links) - added + sum(link in visited for link in unseen_links)
+            self.assertLessEqual(false_positives, 10 if mode == BLOOM else 0)
+
+    async def test_compact_crawl(self):
+        test_out.log_starting_test_set("VisitedSet - test compact crawl")
+
+        expected = None
+
+        with tempfile.TemporaryDirectory() as directory:
+            for mode in [EXACT, FINGERPRINT, BLOOM]:
+                test_out.log_starting_test(mode)
+
+                path = os.path.join(directory, f"krawl-{mode}.json")
+                orchestrator = Orchestrator("www", "example-domain.com", 3, writer_config=writer.ResultWriterConfiguration(path),
+                                            visited_config=VisitedSetConfiguration(mode))
+                orchestrator.link_processor_pool = MockPooler(construct_mock_link_processor, _site_map)
+                await orchestrator.crawl("www.example-domain.com/")
+
+                with open(path) as file:
+                    output = file.read()
+
+                if mode == EXACT:
+                    expected = orchestrator.registered_links
+                else:
+                    # nothing is kept per url, and the spilled pages (in completion order) come out as the same json
+                    self.assertEqual(orchestrator.registered_links, {})
+                    self.assertEqual(json.loads(output), expected)
+                    self.assertFalse(os.path.exists(path + ".spill"))
+
+    def test_spilled_json(self):
+        test_out.log_starting_test_set("VisitedSet - test spilled json")
+
+        test_cases = [
+            {"name": "empty", "pages": {}},
+            {"name": "pages", "pages": {"https://a/": ["https://a/1", "https://b/"], "https://a/1": [], "https://a/2": "not processed"}},
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            for test_case in test_cases:
+                test_out.log_starting_test(test_case["name"])
+
+                path = os.path.join(directory, "krawl.json")
+                result_writer = writer.JsonResultWriter(writer.ResultWriterConfiguration(path, spill=True))
+
+                result_writer.open()
+                for link, contained_links in test_case["pages"].items():
+                    result_writer.write_page(link, contained_links)
+                result_writer.close(None)
+
+                with open(path) as file:
+                    self.assertEqual(file.read(), json.dumps(test_case["pages"], indent=2))
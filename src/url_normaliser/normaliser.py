@@ -0,0 +1,210 @@
+import re
+from functools import lru_cache
+from urllib.parse import SplitResult, parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+
+_default_ports = {"http": 80, "https": 443}
+
+_scheme_pattern = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*):")
+# `host.ext`, `sub.host.ext:8080` etc. - the leading segment of a scheme-less link that names a host
+_host_segment_pattern = re.compile(r"^[a-zA-Z0-9-]+(\.[a-zA-Z0-9-]+)*\.?(:\d*)?$")
+_percent_escape_pattern = re.compile(r"%[0-9a-fA-F]{2}")
+_duplicate_slash_pattern = re.compile(r"/{2,}")
+
+# a leading segment ending in one of these is a relative file (`about.php`) rather than a host (`example.com`)
+_file_extensions = frozenset([
+    "htm", "html", "xhtml", "shtml", "php", "asp", "aspx", "jsp", "cgi", "pl", "cfm",
+    "css", "js", "json", "xml", "txt", "pdf", "png", "jpg", "jpeg", "gif", "svg", "ico", "webp", "zip",
+])
+
+# characters left alone when percent-encoding a path or query - everything else unsafe is escaped
+_path_safe_characters = "/%:@!$&'()*+,;=-._~"
+_query_safe_characters = _path_safe_characters + "?"
+
+
+class UrlNormaliserConfiguration:
+    def __init__(self, default_scheme: str = "http", host_aliases: dict = None, strip_query_params: list = None,
+                 sort_query: bool = False, collapse_slashes: bool = True, cache_size: int = 1 << 16):
+        # scheme given to links that don't have one and can't inherit one from their parent
+        self.default_scheme = default_scheme
+        # hosts that serve the same site, i.e. {"example.com": "www.example.com"}
+        self.host_aliases = host_aliases if host_aliases is not None else {}
+        # query parameters to drop, a trailing * matches a prefix i.e. `utm_*`
+        self.strip_query_params = strip_query_params if strip_query_params is not None else []
+        self.sort_query = sort_query
+        # `/a//b` -> `/a/b`
+        self.collapse_slashes = collapse_slashes
+        self.cache_size = cache_size
+
+
+class UrlNormaliser:
+    """
+    Converts links into a single canonical form so that every spelling of a url dedups to the same string:
+    - relative links are resolved against their parent (or <base href>) with `.` and `..` segments removed
+    - scheme-less host links (`example.com/path`, `//example.com/path`) are given a scheme
+    - the scheme and host are lower-cased, default ports and fragments are dropped
+    - host aliases are applied and optionally filtered query parameters are removed
+
+    Links using a non http(s) scheme (mailto:, javascript: ...) are returned unchanged, links that can't be parsed
+    return None.
+    Results are cached, the same links turn up on almost every page of a site.
+    """
+    def __init__(self, config: UrlNormaliserConfiguration = None):
+        self.config = config if config is not None else UrlNormaliserConfiguration()
+
+        self.default_scheme = self.config.default_scheme.lower()
+        self.host_aliases = {host.lower(): alias.lower() for host, alias in self.config.host_aliases.items()}
+
+        self.stripped_params = set()
+        self.stripped_param_prefixes = []
+        for param in self.config.strip_query_params:
+            if param.endswith("*"):
+                self.stripped_param_prefixes.append(param[:-1])
+            else:
+                self.stripped_params.add(param)
+        self.stripped_param_prefixes = tuple(self.stripped_param_prefixes)
+
+        self.normalise = lru_cache(maxsize=self.config.cache_size)(self._normalise)
+
+    @staticmethod
+    def is_host_link(link: str) -> bool:
+        """
+        Scheme-less links are ambiguous, `example.com/path` is treated as a host + path and `path/file.php` as relative
+        """
+        segment = link.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0]
+
+        if segment in ("", ".", "..") or not _host_segment_pattern.match(segment):
+            return False
+
+        hostname, _, port = segment.partition(":")
+        labels = hostname.rstrip(".").split(".")
+
+        # `localhost:8080` is a host, `tel:123` isn't
+        if len(labels) == 1:
+            return port != "" and hostname.lower() == "localhost"
+
+        return port != "" or labels[-1].lower() not in _file_extensions
+
+    def _normalise(self, link: str, parent_link: str = None) -> str | None:
+        link = link.strip()
+
+        scheme_match = _scheme_pattern.match(link)
+        if scheme_match and not self.is_host_link(link):
+            scheme = scheme_match.group(1).lower()
+
+            # mailto:, tel:, javascript: etc. aren't pages
+            if scheme not in _default_ports:
+                return link
+
+        elif link.startswith("//"):
+            link = f"{self.parent_scheme(parent_link)}:{link}"
+
+        elif self.is_host_link(link) or parent_link is None:
+            link = f"{self.parent_scheme(parent_link)}://{link}"
+
+        else:
+            # parent is canonical so urljoin only has to deal with the relative part
+            link = urljoin(self.normalise(parent_link), link)
+
+        try:
+            return self.canonicalise(urlsplit(link))
+        except ValueError:
+            # bad ports, unbalanced ipv6 brackets etc.
+            return None
+
+    def parent_scheme(self, parent_link: str) -> str:
+        if parent_link is not None:
+            parent_scheme = _scheme_pattern.match(parent_link)
+            if parent_scheme and parent_scheme.group(1).lower() in _default_ports:
+                return parent_scheme.group(1).lower()
+
+        return self.default_scheme
+
+    def canonicalise(self, parts: SplitResult) -> str | None:
+        scheme = parts.scheme.lower()
+
+        hostname = (parts.hostname or "").rstrip(".")
+        if hostname == "":
+            return None
+
+        hostname = self.host_aliases.get(hostname, hostname)
+        if ":" in hostname:
+            hostname = f"[{hostname}]"
+
+        netloc = hostname
+        port = parts.port
+        if port is not None and port != _default_ports.get(scheme):
+            netloc = f"{netloc}:{port}"
+
+        if parts.username is not None:
+            userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+            netloc = f"{userinfo}@{netloc}"
+
+        path = self.normalise_path(parts.path)
+        query = self.normalise_query(parts.query)
+
+        # fragments never reach the server
+        return urlunsplit((scheme, netloc, path, query, ""))
+
+    def normalise_path(self, path: str) -> str:
+        if self.config.collapse_slashes:
+            path = _duplicate_slash_pattern.sub("/", path)
+
+        path = remove_dot_segments(path)
+        path = quote(path, safe=_path_safe_characters)
+
+        return _percent_escape_pattern.sub(lambda escape: escape.group(0).upper(), path) if "%" in path else path
+
+    def normalise_query(self, query: str) -> str:
+        if query == "":
+            return ""
+
+        if self.stripped_params or self.stripped_param_prefixes or self.config.sort_query:
+            params = [
+                (name, value) for name, value in parse_qsl(query, keep_blank_values=True)
+                if name not in self.stripped_params and not name.startswith(self.stripped_param_prefixes)
+            ]
+
+            if self.config.sort_query:
+                params.sort()
+
+            return urlencode(params)
+
+        query = quote(query, safe=_query_safe_characters)
+        return _percent_escape_pattern.sub(lambda escape: escape.group(0).upper(), query) if "%" in query else query
+
+
+def remove_dot_segments(path: str) -> str:
+    """
+    RFC 3986 5.2.4 - resolves `.` and `..` segments, `..` never climbs above the root
+    """
+    if path == "":
+        return "/"
+
+    if "." not in path:
+        return path
+
+    output = []
+    segments = path.split("/")
+    for segment in segments[1:] if path.startswith("/") else segments:
+        if segment == "..":
+            if output:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+
+    # `/a/b/..` and `/a/.` refer to a directory
+    if segments[-1] in (".", ".."):
+        output.append("")
+
+    return "/" + "/".join(output)
+
+
+_default_normaliser = UrlNormaliser()
+
+
+def normalise_url(link: str, parent_link: str = None) -> str | None:
+    return _default_normaliser.normalise(link, parent_link)
+
+
+def construct_url_normaliser(config: UrlNormaliserConfiguration) -> UrlNormaliser:
+    return UrlNormaliser(config)
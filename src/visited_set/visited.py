@@ -0,0 +1,204 @@
+import hashlib
+import math
+from array import array
+
+# membership modes
+EXACT = "exact"
+FINGERPRINT = "fingerprint"
+BLOOM = "bloom"
+
+_mask_64 = (1 << 64) - 1
+
+
+class VisitedSetConfiguration:
+    def __init__(self, mode: str = EXACT, initial_capacity: int = 1 << 16, error_rate: float = 1e-6):
+        # exact keeps every url string, fingerprint and bloom trade a tiny chance of wrongly skipping a url for memory
+        self.mode = mode
+        # urls held before the first resize (fingerprint) or before the first extra filter is added (bloom)
+        self.initial_capacity = initial_capacity
+        # chance that a url that hasn't been seen is reported as seen, bloom only
+        self.error_rate = error_rate
+
+
+class ExactSet(set):
+    """
+    The url strings themselves - no false positives, roughly 100 bytes per url
+    """
+    def add(self, link: str) -> bool:
+        if link in self:
+            return False
+
+        super().add(link)
+        return True
+
+
+class FingerprintSet:
+    """
+    Open-addressing hash set of 64-bit url fingerprints held in one flat array('Q') - 8 bytes a slot, so roughly
+    11-23 bytes per url depending on how full the table is, against ~100 for a set of strings.
+    Fingerprints are the interpreter's string hash, which is cached on the string and only stable within a process.
+    Two urls sharing a fingerprint is a false positive: around 1 in 36 million at a million urls.
+    """
+    max_load = 0.7
+
+    def __init__(self, initial_capacity: int = 1 << 16):
+        capacity = 1 << max(4, math.ceil(math.log2(initial_capacity / self.max_load)))
+        # 0 marks an empty slot
+        self.slots = array("Q", bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.count = 0
+        self.limit = int(capacity * self.max_load)
+
+    @staticmethod
+    def fingerprint(link: str) -> int:
+        return (hash(link) & _mask_64) or 1
+
+    def add(self, link: str) -> bool:
+        if self.insert(self.fingerprint(link)):
+            self.count += 1
+            if self.count > self.limit:
+                self.grow()
+            return True
+
+        return False
+
+    def insert(self, fingerprint: int) -> bool:
+        slots = self.slots
+        mask = self.mask
+        # the fingerprint is already uniformly distributed, so its low bits make a good slot index
+        index = fingerprint & mask
+
+        while True:
+            current = slots[index]
+            if current == 0:
+                slots[index] = fingerprint
+                return True
+            if current == fingerprint:
+                return False
+            index = (index + 1) & mask
+
+    def grow(self):
+        old_slots = self.slots
+        capacity = len(old_slots) * 2
+
+        self.slots = array("Q", bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.limit = int(capacity * self.max_load)
+
+        for fingerprint in old_slots:
+            if fingerprint != 0:
+                self.insert(fingerprint)
+
+    def __contains__(self, link: str) -> bool:
+        slots = self.slots
+        mask = self.mask
+        fingerprint = self.fingerprint(link)
+        index = fingerprint & mask
+
+        while True:
+            current = slots[index]
+            if current == 0:
+                return False
+            if current == fingerprint:
+                return True
+            index = (index + 1) & mask
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        # optimal bit count and hash count for the capacity and error rate
+        self.bit_count = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, math.ceil(-math.log2(error_rate)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def contains(self, first: int, second: int) -> bool:
+        bits = self.bits
+        bit_count = self.bit_count
+        # double hashing - the k positions are first, first + second, first + 2 * second ... modulo the bit count
+        position = first % bit_count
+        step = second % bit_count
+
+        for _ in range(self.hash_count):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                # most urls that haven't been seen are ruled out by the first few bits
+                return False
+            position = (position + step) % bit_count
+
+        return True
+
+    def add(self, first: int, second: int):
+        bits = self.bits
+        bit_count = self.bit_count
+        position = first % bit_count
+        step = second % bit_count
+
+        for _ in range(self.hash_count):
+            bits[position >> 3] |= 1 << (position & 7)
+            position = (position + step) % bit_count
+
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that keeps its error rate as it grows (Almeida et al.): once a filter is full a filter twice its size
+    with half its error rate is added, so the combined error rate stays under error_rate however many urls are added.
+    Around 4 bytes per url when the newest filter is full and up to twice that just after one is added, at a 1 in a
+    million error rate - but every add and lookup sets or tests ~20 bits in Python, so it is ~10x slower than
+    fingerprint. A url that hasn't been seen is occasionally reported as seen (and so never crawled), a url that has
+    been seen never is.
+    """
+    growth = 2
+    tightening = 0.5
+
+    def __init__(self, initial_capacity: int = 1 << 16, error_rate: float = 1e-6):
+        self.initial_capacity = initial_capacity
+        # the error rates of the filters form a geometric series that sums to error_rate
+        self.first_error_rate = error_rate * (1 - self.tightening)
+        self.filters = [BloomFilter(initial_capacity, self.first_error_rate)]
+        self.count = 0
+
+    @staticmethod
+    def hashes(link: str) -> tuple[int, int]:
+        digest = hashlib.blake2b(link.encode("utf-8"), digest_size=16).digest()
+        # the second hash is odd so it never steps by a multiple of the filter size
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def add(self, link: str) -> bool:
+        first, second = self.hashes(link)
+
+        if any(bloom_filter.contains(first, second) for bloom_filter in self.filters):
+            return False
+
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            index = len(self.filters)
+            current = BloomFilter(self.initial_capacity * self.growth ** index, self.first_error_rate * self.tightening ** index)
+            self.filters.append(current)
+
+        current.add(first, second)
+        self.count += 1
+        return True
+
+    def __contains__(self, link: str) -> bool:
+        first, second = self.hashes(link)
+        return any(bloom_filter.contains(first, second) for bloom_filter in self.filters)
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def construct_visited_set(config: VisitedSetConfiguration = None):
+    config = config if config is not None else VisitedSetConfiguration()
+
+    if config.mode == FINGERPRINT:
+        return FingerprintSet(config.initial_capacity)
+    if config.mode == BLOOM:
+        return ScalableBloomFilter(config.initial_capacity, config.error_rate)
+
+    return ExactSet()